@@ -1,29 +1,27 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
 import sys
 import os
 
 # Add the src directory to the Python path for module imports
 sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
 
-from recommender import recommend_movies
+from model import load_model
+from title_index import EXACT_SCORE
 
-# Cache and load the required data files for the recommendation system.
-# The function caches the data to avoid reloading on every app interaction.
+# Load the recommendation model once per server process and share it between all
+# sessions and reruns. cache_resource hands every rerun the same object instead of
+# pickling a copy, the similarity matrices are read-only memory maps, and scoring only
+# ever reads them, so memory stays flat as sessions are added.
+# The model answers one query at startup to warm up, and every rerun checks whether the
+# artifacts on disk changed and reloads them in place (clearing the result cache).
 # Returns:
-#     movies_df (DataFrame): Cleaned movies dataset.
-#     genre_similarity (numpy array): Genre similarity matrix.
-#     tag_similarity (numpy array): Tag similarity matrix.
-#     ratings_similarity (numpy array): Ratings similarity matrix.
+#     model (RecommenderModel): Movies, similarity signals, title index, and result cache.
 
-@st.cache_data
-def load_data():
-    movies_df = pd.read_csv("data/cleaned_movies.csv")
-    genre_similarity = np.load("data/genre_similarity_matrix.npy")
-    tag_similarity = np.load("data/tag_similarity_matrix.npy")
-    ratings_similarity = np.load("data/ratings_similarity_matrix.npy")
-    return movies_df, genre_similarity, tag_similarity, ratings_similarity
+@st.cache_resource
+def load_model_resource():
+    model = load_model("data")
+    model.warm_up()
+    return model
 
 
 # The main function initializes and runs the Streamlit app.
@@ -32,8 +30,12 @@ def load_data():
 
 
 def main():    
-    # Load the preprocessed data
-    movies_df, genre_similarity, tag_similarity, ratings_similarity = load_data()
+    # Load the shared model and pick up artifacts rebuilt since the last rerun
+    model = load_model_resource()
+    model.reload_if_changed()
+    # Every widget and the recommendations of this rerun come from one consistent snapshot
+    snapshot = model.snapshot
+    title_index = snapshot.title_index
 
     # App title
     st.title("Movie Recommendation System")
@@ -41,6 +43,13 @@ def main():
     # Text input for movie title
     movie_title = st.text_input("Enter a movie title:", value="Toy Story (1995)")
 
+    # Suggest matching titles when the input is not an exact title
+    suggestions = title_index.search(movie_title, limit=10)
+    if suggestions and suggestions[0][1] < EXACT_SCORE:
+        movie_title = st.selectbox(
+            "Did you mean:", [title_index.titles[position] for position, _ in suggestions]
+        )
+
     # Sidebar for adjusting similarity weights
     st.sidebar.title("Similarity Weights")
     genre_weight = st.sidebar.slider("Genre Weight", 0.0, 1.0, 0.5, 0.1)
@@ -52,6 +61,28 @@ def main():
         st.warning("The weights should sum to 1.0.")
         return
 
+    # Popularity options need the statistics table built with the data
+    popularity_options = {}
+    if snapshot.stats is not None:
+        st.sidebar.title("Popularity")
+        popularity_options["min_ratings"] = st.sidebar.number_input("Minimum Ratings", 0, 1000, 0, 5)
+        popularity_options["popularity_weight"] = st.sidebar.slider("Popularity Boost", 0.0, 0.5, 0.0, 0.05)
+        popularity_options["fallback"] = st.sidebar.checkbox("Show popular movies of the same genres when "
+                                                             "nothing is similar enough", value=True)
+
+    # Attribute filters applied before the top recommendations are picked
+    st.sidebar.title("Filters")
+    filter_options = {}
+    genres = st.sidebar.multiselect("Only Genres", snapshot.attributes.genres)
+    if genres:
+        filter_options["genres"] = genres
+    known_years = snapshot.attributes.years[snapshot.attributes.years > 0]
+    if known_years.size and st.sidebar.checkbox("Filter by Release Year"):
+        first_year, last_year = int(known_years.min()), int(known_years.max())
+        filter_options["year_from"], filter_options["year_to"] = st.sidebar.slider(
+            "Release Years", first_year, last_year, (first_year, last_year)
+        )
+
     # Slider for the number of recommendations to display
     num_recommendations = st.slider("Number of Recommendations", 1, 20, 10)
 
@@ -59,16 +90,15 @@ def main():
     if st.button("Get Recommendations"):
         try:
             # Generate movie recommendations
-            recommendations = recommend_movies(
+            recommendations = snapshot.recommend(
                 movie_title,
-                movies_df,
-                genre_similarity,
-                tag_similarity,
-                ratings_similarity,
+                cache=model.cache,
                 genre_weight=genre_weight,
                 tag_weight=tag_weight,
                 ratings_weight=ratings_weight,
-                top_n=num_recommendations
+                top_n=num_recommendations,
+                **popularity_options,
+                **filter_options
             )
             
             # Display recommendations or a message if no results are found
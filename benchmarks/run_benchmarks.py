@@ -0,0 +1,200 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Add the src directory to the Python path for module imports
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from data_clean import clean_movies, clean_ratings, clean_tags
+from data_preprocessing import (
+    build_genre_features,
+    build_ratings_features,
+    build_tag_features,
+    precompute_genre_similarity,
+    precompute_ratings_similarity,
+    precompute_tag_similarity,
+)
+from genre_codebook import build_genre_codebook
+from instrumentation import peak_rss_bytes, reset_peak_rss
+from neighbor_index import build_neighbor_index
+from recommender import recommend_movies
+from synthetic_data import generate_dataset
+from title_index import TitleIndex
+
+# Dataset sizes of the predefined scales; "large" is about MovieLens 25M
+SCALES = {
+    "small": {"n_movies": 1000, "n_ratings": 100_000},
+    "medium": {"n_movies": 10_000, "n_ratings": 2_000_000},
+    "large": {"n_movies": 60_000, "n_ratings": 25_000_000},
+}
+
+"""
+Run one benchmark stage and record its wall time and peak memory
+Args:
+- results: dict the measurements are stored in under name
+- name: string, the stage name
+- function: the callable to run
+- args: its positional arguments
+Returns: the value returned by function
+"""
+
+def run_stage(results, name, function, *args):
+    reset_peak_rss()
+    start = time.perf_counter()
+    value = function(*args)
+    seconds = time.perf_counter() - start
+    results[name] = {"seconds": round(seconds, 4), "peak_rss_mb": round(peak_rss_bytes() / 1024 ** 2, 1)}
+    print(f"  {name:<32} {seconds:8.2f}s {results[name]['peak_rss_mb']:10.1f} MB")
+    return value
+
+"""
+Measure recommend_movies latency over random catalog titles
+Args:
+- movies_df: DataFrame of the cleaned movies
+- signals: tuple of the genre, tag, and ratings similarity signals
+- n_queries: int, the number of queries to time
+- rng: NumPy Generator choosing the queried titles
+Returns: a dict with the query count, p50/p99/mean latency in milliseconds, and peak RSS
+"""
+
+def benchmark_recommend(movies_df, signals, n_queries, rng):
+    title_index = TitleIndex(movies_df["title"])
+    titles = movies_df["title"].to_numpy()[rng.integers(0, len(movies_df), n_queries)]
+
+    reset_peak_rss()
+    latencies = np.empty(n_queries, dtype=np.float64)
+    for i, title in enumerate(titles):
+        start = time.perf_counter()
+        recommend_movies(title, movies_df, *signals, title_index=title_index)
+        latencies[i] = time.perf_counter() - start
+
+    latencies *= 1000
+    result = {
+        "queries": int(n_queries),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 4),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 4),
+        "mean_ms": round(float(latencies.mean()), 4),
+        "peak_rss_mb": round(peak_rss_bytes() / 1024 ** 2, 1),
+    }
+    print(f"  {'recommend_movies':<32} p50 {result['p50_ms']:.3f} ms, p99 {result['p99_ms']:.3f} ms")
+    return result
+
+"""
+Describe the code and environment a benchmark ran on, so result files can be compared
+Returns: a dict with the git commit and the Python, NumPy, and platform versions
+"""
+
+def environment_info():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+"""
+Generate (or reuse) a synthetic dataset and benchmark cleaning, similarity precomputation,
+and recommendation latency on it
+Args:
+- data_dir: string path to the directory holding (or receiving) the synthetic .dat files
+- n_movies: int, the number of movies
+- n_ratings: int, the number of ratings
+- n_tags: optional int, the number of tag applications (default: n_ratings / 10)
+- n_queries: int, the number of recommend_movies calls timed (default: 200)
+- top_k: optional int; build top-K neighbor indexes instead of dense similarity matrices,
+  which is the only practical mode at the large scale
+- regenerate: bool, whether to rewrite existing synthetic files (default: False)
+- seed: int, the random seed of the dataset and the queries (default: 0)
+Returns: a dict of results ready to be written as JSON
+"""
+
+def run_benchmarks(data_dir, n_movies, n_ratings, n_tags=None, n_queries=200, top_k=None, regenerate=False,
+                   seed=0):
+    scale = {"n_movies": n_movies, "n_ratings": n_ratings, "n_tags": n_tags, "top_k": top_k, "seed": seed}
+    results = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment_info(),
+        "scale": scale,
+        "stages": {},
+    }
+    stages = results["stages"]
+
+    paths = {name: os.path.join(data_dir, f"{name}.dat") for name in ("movies", "ratings", "tags")}
+    if regenerate or not all(os.path.exists(path) for path in paths.values()):
+        print(f"Generating {n_movies} movies and {n_ratings} ratings in {data_dir}...")
+        run_stage(stages, "generate", generate_dataset, data_dir, n_movies, n_ratings, n_tags, None, seed)
+
+    print("Benchmarking stages:")
+    movies_df = run_stage(stages, "clean_movies", clean_movies, paths["movies"])
+    ratings_df = run_stage(stages, "clean_ratings", clean_ratings, paths["ratings"])
+    tags_df = run_stage(stages, "clean_tags", clean_tags, paths["tags"])
+
+    # Genres are a combination codebook at every scale, as the pipeline saves them
+    genre_signal = run_stage(stages, "genre_codebook", lambda: build_genre_codebook(
+        movies_df, build_genre_features(movies_df)))
+    if top_k:
+        signals = (
+            genre_signal,
+            run_stage(stages, "tag_neighbor_index", lambda: build_neighbor_index(
+                build_tag_features(tags_df, movies_df), top_k)),
+            run_stage(stages, "ratings_neighbor_index", lambda: build_neighbor_index(
+                build_ratings_features(ratings_df, movies_df), top_k)),
+        )
+    else:
+        # The dense genre matrix is timed for comparison; recommendations use the codebook
+        run_stage(stages, "precompute_genre_similarity", precompute_genre_similarity, movies_df)
+        signals = (
+            genre_signal,
+            run_stage(stages, "precompute_tag_similarity", precompute_tag_similarity, tags_df, movies_df),
+            run_stage(stages, "precompute_ratings_similarity", precompute_ratings_similarity, ratings_df, movies_df),
+        )
+
+    results["recommend_movies"] = benchmark_recommend(movies_df, signals, n_queries, np.random.default_rng(seed))
+    return results
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic MovieLens-shaped data.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--movies", type=int, default=None, help="override the number of movies of the scale")
+    parser.add_argument("--ratings", type=int, default=None, help="override the number of ratings of the scale")
+    parser.add_argument("--tags", type=int, default=None)
+    parser.add_argument("--queries", type=int, default=200, help="recommend_movies calls to time")
+    parser.add_argument("--top-k", type=int, default=None,
+                        help="benchmark top-K neighbor indexes instead of dense matrices")
+    parser.add_argument("--data-dir", default=None, help="where the synthetic dataset is kept")
+    parser.add_argument("--output", default=None, help="path of the JSON results file")
+    parser.add_argument("--regenerate", action="store_true", help="rewrite an existing synthetic dataset")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    n_movies = args.movies or SCALES[args.scale]["n_movies"]
+    n_ratings = args.ratings or SCALES[args.scale]["n_ratings"]
+    benchmark_dir = os.path.dirname(os.path.abspath(__file__))
+    data_dir = args.data_dir or os.path.join(benchmark_dir, "data", f"{n_movies}m-{n_ratings}r-{args.seed}")
+
+    results = run_benchmarks(data_dir, n_movies, n_ratings, args.tags, args.queries, args.top_k,
+                             args.regenerate, args.seed)
+
+    output = args.output or os.path.join(
+        benchmark_dir, "results", f"{datetime.now():%Y%m%d-%H%M%S}-{n_movies}m-{n_ratings}r.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {output}.")
@@ -0,0 +1,221 @@
+import time
+import numpy as np
+from scipy import sparse
+
+from blocked_similarity import normalize_rows
+from neighbor_index import NeighborIndex
+from scoring import top_n_rows
+
+# Query movies probed together by build_neighbor_index
+DEFAULT_BUILD_BLOCK_ROWS = 1024
+
+"""
+Approximate nearest-neighbour index over movie feature vectors (IVF with a spherical
+k-means coarse quantizer). Movies are bucketed into n_lists clusters; a query only
+scores the movies in its n_probe closest clusters, so its cost is roughly
+N * n_probe / n_lists instead of N. Raising n_probe trades speed for recall.
+The index also works as a similarity signal for recommend_movies: rows() returns the
+cosine scores of the probed candidates and 0 for every other movie.
+Args:
+- n_lists: int, the number of clusters (default: about sqrt(N))
+- n_probe: int, the number of clusters scanned per query (default: 8)
+- n_iter: int, the number of k-means iterations used to fit the clusters (default: 10)
+- seed: int, the random seed for centroid initialization (default: 0)
+"""
+
+class IVFIndex:
+    def __init__(self, n_lists=None, n_probe=8, n_iter=10, seed=0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.seed = seed
+
+    @property
+    def shape(self):
+        return (self.n_items, self.n_items)
+
+    def fit(self, features):
+        # Cluster the normalized vectors and lay the inverted lists out in CSR form
+        self.vectors = normalize_rows(features)
+        self.n_items = self.vectors.shape[0]
+        n_lists = self.n_lists or max(int(np.sqrt(self.n_items)), 1)
+        n_lists = min(n_lists, self.n_items)
+        rng = np.random.default_rng(self.seed)
+
+        self.centroids = self._dense(self.vectors[rng.choice(self.n_items, n_lists, replace=False)])
+        for _ in range(self.n_iter):
+            assignments = self._assign(self.vectors)
+            self.centroids = self._update_centroids(assignments, n_lists, rng)
+        assignments = self._assign(self.vectors)
+
+        self.list_members = np.argsort(assignments, kind="stable").astype(np.int32)
+        self.list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=n_lists), out=self.list_offsets[1:])
+        return self
+
+    def probed_lists(self, movie_indices, n_probe=None):
+        # The n_probe clusters closest to each query movie, one row per query
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        centroid_scores = self._dense(self.vectors[movie_indices] @ self.centroids.T)
+        return np.argpartition(-centroid_scores, n_probe - 1, axis=1)[:, :n_probe]
+
+    def candidates(self, movie_index, n_probe=None):
+        # Movies stored in the n_probe clusters closest to the query movie
+        probed = self.probed_lists([movie_index], n_probe)[0]
+        return np.concatenate([
+            self.list_members[self.list_offsets[i]:self.list_offsets[i + 1]] for i in probed
+        ])
+
+    def query(self, movie_index, top_n=10, n_probe=None):
+        # Approximate top-N neighbors of one movie as (positions, scores), best first
+        candidates = self.candidates(movie_index, n_probe)
+        candidates = candidates[candidates != movie_index]
+        scores = self._dense(self.vectors[candidates] @ self.vectors[[movie_index]].T).ravel()
+        positions, top_scores = top_n_rows(scores[np.newaxis, :], top_n)
+        positions, top_scores = positions[0], top_scores[0]
+        keep = positions >= 0
+        return candidates[positions[keep]], top_scores[keep]
+
+    def rows(self, movie_indices, n_probe=None):
+        # Dense score rows holding the cosine scores of each query's probed candidates
+        movie_indices = np.atleast_1d(np.asarray(movie_indices, dtype=np.int64))
+        out = np.zeros((len(movie_indices), self.n_items), dtype=np.float32)
+        for row, movie_index in enumerate(movie_indices):
+            candidates = self.candidates(movie_index, n_probe)
+            out[row, candidates] = self._dense(self.vectors[candidates] @ self.vectors[[movie_index]].T).ravel()
+        return out
+
+    def build_neighbor_index(self, k, n_probe=None, block_rows=DEFAULT_BUILD_BLOCK_ROWS):
+        # Approximate top-K neighbor index for every movie without any all-pairs computation.
+        # Queries are probed one block of rows at a time, and every cluster scores all the
+        # block's queries that probe it with one matrix product.
+        indices_parts, scores_parts, lengths_parts = [], [], []
+        for start in range(0, self.n_items, block_rows):
+            queries = np.arange(start, min(start + block_rows, self.n_items))
+            indices, scores, lengths = self._block_neighbors(queries, k, n_probe)
+            indices_parts.append(indices)
+            scores_parts.append(scores)
+            lengths_parts.append(lengths)
+        offsets = np.zeros(self.n_items + 1, dtype=np.int64)
+        np.cumsum(np.concatenate(lengths_parts), out=offsets[1:])
+        return NeighborIndex(np.concatenate(indices_parts), np.concatenate(scores_parts), offsets, self.n_items)
+
+    def _block_neighbors(self, queries, k, n_probe):
+        # Top-K positively scored neighbors of a block of query movies as (indices, scores, lengths)
+        probed = self.probed_lists(queries, n_probe)
+        query_rows = np.repeat(np.arange(len(queries)), probed.shape[1])
+        clusters = probed.ravel()
+        order = np.argsort(clusters, kind="stable")
+        query_rows, clusters = query_rows[order], clusters[order]
+        bounds = np.flatnonzero(np.diff(clusters)) + 1
+
+        rows_parts, columns_parts, scores_parts = [], [], []
+        for group in np.split(np.arange(len(clusters)), bounds):
+            if not len(group):
+                continue
+            cluster = clusters[group[0]]
+            members = self.list_members[self.list_offsets[cluster]:self.list_offsets[cluster + 1]]
+            if not len(members):
+                continue
+            rows = query_rows[group]
+            scores = self._dense(self.vectors[queries[rows]] @ self.vectors[members].T)
+            # k + 1 per cluster, since the query itself may be among them
+            positions, top_scores = top_n_rows(scores, k + 1)
+            rows_parts.append(np.repeat(rows, positions.shape[1]))
+            columns_parts.append(members[positions].ravel())
+            scores_parts.append(top_scores.ravel())
+
+        rows = np.concatenate(rows_parts)
+        columns = np.concatenate(columns_parts).astype(np.int64)
+        scores = np.concatenate(scores_parts)
+        keep = (columns != queries[rows]) & (scores > 0)
+        rows, columns, scores = rows[keep], columns[keep], scores[keep]
+
+        # Best score first within every query, ties broken by movie position
+        order = np.lexsort((columns, -scores, rows))
+        rows, columns, scores = rows[order], columns[order], scores[order]
+        counts = np.bincount(rows, minlength=len(queries))
+        ranks = np.arange(len(rows)) - (np.cumsum(counts) - counts)[rows]
+        top = ranks < k
+        return columns[top].astype(np.int32), scores[top].astype(np.float32), np.minimum(counts, k)
+
+    def _assign(self, vectors):
+        return np.asarray(self._dense(vectors @ self.centroids.T).argmax(axis=1)).ravel()
+
+    def _update_centroids(self, assignments, n_lists, rng):
+        membership = sparse.csr_matrix(
+            (np.ones(self.n_items, dtype=np.float32), (assignments, np.arange(self.n_items))),
+            shape=(n_lists, self.n_items)
+        )
+        centroids = normalize_rows(self._dense(membership @ self.vectors))
+        # Re-seed empty clusters with random movies so every list stays in use
+        empty = np.flatnonzero(np.bincount(assignments, minlength=n_lists) == 0)
+        if empty.size:
+            centroids[empty] = self._dense(self.vectors[rng.choice(self.n_items, empty.size, replace=False)])
+        return centroids
+
+    @staticmethod
+    def _dense(matrix):
+        return matrix.toarray() if sparse.issparse(matrix) else np.asarray(matrix)
+
+"""
+Measure the recall and query time of an IVF index against the exact brute-force path
+Args:
+- index: a fitted IVFIndex
+- top_n: int, the number of neighbors compared per query (default: 10)
+- n_queries: int, the number of random query movies (default: 200)
+- n_probes: sequence of n_probe values to evaluate
+- seed: int, the random seed for choosing the query movies
+Returns: a list of dicts, one per n_probe, with recall and milliseconds per query for the
+approximate and exact paths
+"""
+
+def recall_report(index, top_n=10, n_queries=200, n_probes=(1, 2, 4, 8, 16), seed=0):
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(index.n_items, min(n_queries, index.n_items), replace=False)
+
+    start = time.perf_counter()
+    exact_scores = IVFIndex._dense(index.vectors[queries] @ index.vectors.T)
+    exact_scores[np.arange(len(queries)), queries] = -np.inf
+    exact_positions, _ = top_n_rows(exact_scores, top_n)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    report = []
+    for n_probe in n_probes:
+        start = time.perf_counter()
+        approximate = [index.query(movie_index, top_n, n_probe)[0] for movie_index in queries]
+        ann_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        hits = sum(len(np.intersect1d(found, expected)) for found, expected in zip(approximate, exact_positions))
+        report.append({
+            "n_probe": int(n_probe),
+            "recall": hits / exact_positions.size,
+            "ann_ms_per_query": ann_ms,
+            "exact_ms_per_query": exact_ms,
+        })
+    return report
+
+if __name__ == "__main__":
+    import argparse
+    import pandas as pd
+    from data_preprocessing import build_genre_features, build_tag_features, build_ratings_features
+
+    parser = argparse.ArgumentParser(description="Report ANN recall against exact similarity.")
+    parser.add_argument("--signal", choices=["genre", "tag", "ratings"], default="ratings")
+    parser.add_argument("--n-lists", type=int, default=None)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    movies_df = pd.read_csv("data/cleaned_movies.csv")
+    if args.signal == "genre":
+        features = build_genre_features(movies_df)
+    elif args.signal == "tag":
+        features = build_tag_features(pd.read_csv("data/cleaned_tags.csv"), movies_df)
+    else:
+        features = build_ratings_features(pd.read_csv("data/cleaned_ratings.csv"), movies_df)
+
+    index = IVFIndex(n_lists=args.n_lists).fit(features)
+    print(f"{'n_probe':>8} {'recall':>8} {'ann ms':>10} {'exact ms':>10}")
+    for row in recall_report(index, top_n=args.top_n, n_queries=args.queries):
+        print(f"{row['n_probe']:>8} {row['recall']:>8.3f} {row['ann_ms_per_query']:>10.3f} "
+              f"{row['exact_ms_per_query']:>10.3f}")
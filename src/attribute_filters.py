@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+from genre_codebook import genre_bitmasks
+
+# Release year at the end of a MovieLens title, e.g. "Heat (1995)" or "Lost (2004-2010)"
+YEAR_PATTERN = r"\((\d{4})(?:-\d{0,4})?\)\s*$"
+# Year of movies whose title carries none
+UNKNOWN_YEAR = 0
+
+"""
+Parse the release year of every movie from the year suffix of its title
+Args: titles is a sequence of movie titles
+Returns: an int16 NumPy array of years, UNKNOWN_YEAR where the title has no year
+"""
+
+def parse_release_years(titles):
+    years = pd.Series(titles, dtype=object).astype(str).str.extract(YEAR_PATTERN, expand=False)
+    return pd.to_numeric(years, errors="coerce").fillna(UNKNOWN_YEAR).to_numpy(dtype=np.int16)
+
+"""
+Precomputed per-attribute indexes of a catalog, combined into one boolean candidate mask
+per query. Every genre keeps its own boolean mask, and years are kept sorted, so a year
+range marks one contiguous slice of movies found with searchsorted. Rating count filters are
+MovieStats.support_mask, applied by the min_ratings option of recommend_movies.
+Attributes:
+- genres: list of genre strings
+- genre_sets: dict mapping each genre to the boolean mask of the movies having it
+- years: int16 array, the release year of every movie (UNKNOWN_YEAR when unknown)
+"""
+
+class AttributeIndex:
+    def __init__(self, genre_masks, genres, years):
+        genre_masks = np.asarray(genre_masks, dtype=np.int64)
+        self.genres = list(genres)
+        self.genre_sets = {genre: (genre_masks >> bit & 1).astype(bool) for bit, genre in enumerate(self.genres)}
+        self._genre_names = {genre.lower(): genre for genre in self.genres}
+        self.years = np.asarray(years, dtype=np.int16)
+        self._year_order = np.argsort(self.years, kind="stable")
+        self._sorted_years = self.years[self._year_order]
+
+    def __len__(self):
+        return len(self.years)
+
+    def genre_mask(self, genres, match_all=False):
+        # Movies having any (or, with match_all, every) of the genres; names ignore case
+        masks = []
+        for genre in genres:
+            name = self._genre_names.get(str(genre).strip().lower())
+            if name is None:
+                raise ValueError(f"Unknown genre '{genre}'.")
+            masks.append(self.genre_sets[name])
+        if not masks:
+            return np.ones(len(self), dtype=bool)
+        return np.logical_and.reduce(masks) if match_all else np.logical_or.reduce(masks)
+
+    def year_mask(self, year_from=None, year_to=None):
+        # Movies released in [year_from, year_to]; movies of unknown year never match
+        low = max(UNKNOWN_YEAR + 1, year_from if year_from is not None else UNKNOWN_YEAR + 1)
+        high = year_to if year_to is not None else np.iinfo(np.int16).max
+        return range_mask(self._sorted_years, self._year_order, low, high)
+
+    def candidate_mask(self, genres=None, year_from=None, year_to=None, match_all_genres=False):
+        # Combine the requested filters; None when nothing is filtered
+        masks = []
+        if genres:
+            masks.append(self.genre_mask(genres, match_all_genres))
+        if year_from is not None or year_to is not None:
+            masks.append(self.year_mask(year_from, year_to))
+        if not masks:
+            return None
+        return np.logical_and.reduce(masks)
+
+"""
+Mark the movies whose sorted attribute value lies in [low, high]
+Args:
+- sorted_values: the attribute values in ascending order
+- order: the movie positions in the same order
+- low, high: the inclusive bounds
+Returns: a boolean NumPy array with one entry per movie
+"""
+
+def range_mask(sorted_values, order, low, high):
+    mask = np.zeros(len(order), dtype=bool)
+    start = np.searchsorted(sorted_values, low, side="left")
+    stop = np.searchsorted(sorted_values, high, side="right")
+    mask[order[start:stop]] = True
+    return mask
+
+"""
+Build the attribute index of a catalog
+Args:
+- movies_df: a Pandas DataFrame containing the cleaned movies dataset
+- stats: optional MovieStats aligned with movies_df; its genre bitmasks are reused
+Returns: an AttributeIndex
+"""
+
+def build_attribute_index(movies_df, stats=None):
+    if stats is not None:
+        genre_masks, genres = stats.genre_masks, stats.genres
+    else:
+        genre_masks, genres = genre_bitmasks(movies_df)
+    return AttributeIndex(genre_masks, genres, parse_release_years(movies_df["title"]))
@@ -0,0 +1,220 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from instrumentation import span
+from recommender import find_movie_index
+from scoring import blend_rows, top_n_rows
+from title_index import TitleIndex
+
+# Requests scored together at most, and how long the first request of a batch waits for more
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT = 0.002
+
+# Queue marker telling the collector thread to stop
+_STOP = object()
+
+"""
+One queued recommendation request and the future its caller waits on
+Args:
+- n_items: int, the number of movies in the catalog the request is checked against
+- the other arguments are the options of MicroBatchScheduler.submit
+Raises: ValueError or TypeError if an option cannot be scored, so a bad request is refused
+before it can share a batch with others
+"""
+
+class BatchRequest:
+    def __init__(self, movie_title, weights, top_n, similarity_threshold, candidate_mask, n_items):
+        self.future = Future()
+        if not isinstance(movie_title, str):
+            raise TypeError("The movie title must be a string.")
+        self.movie_title = movie_title
+        self.weights = tuple(float(weight) for weight in weights)
+        self.top_n = int(top_n)
+        if self.top_n < 1:
+            raise ValueError("top_n must be at least 1.")
+        self.similarity_threshold = float(similarity_threshold)
+        if candidate_mask is not None:
+            candidate_mask = np.asarray(candidate_mask, dtype=bool)
+            if candidate_mask.shape != (n_items,):
+                raise ValueError(f"candidate_mask must hold one entry per movie ({n_items}).")
+        self.candidate_mask = candidate_mask
+
+"""
+Micro-batching scheduler in front of the recommender.
+Concurrent callers submit single-title requests; a collector thread gathers them for up to
+max_wait seconds after the first one arrives (or until max_batch_size are queued) and a
+thread pool scores each batch as one matrix: one row gather per signal, one blend, and one
+top-N selection for all its queries. Each request keeps its own weights, top_n, threshold,
+and candidate mask. A new batch is only collected once a scoring thread is free, so under
+load requests pile up in the queue and batches grow instead of latency.
+Args:
+- movies_df: DataFrame, the dataset containing movie information
+- genre_similarity, tag_similarity, ratings_similarity: the precomputed similarity signals
+- title_index: optional TitleIndex; built from movies_df when not given
+- max_batch_size: int, the most requests scored together (default: 64)
+- max_wait: float, seconds a batch waits for more requests after its first (default: 0.002)
+- workers: int, the number of batches scored concurrently (default: 1)
+"""
+
+class MicroBatchScheduler:
+    def __init__(self, movies_df, genre_similarity, tag_similarity, ratings_similarity, title_index=None,
+                 max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT, workers=1):
+        if max_batch_size < 1 or workers < 1:
+            raise ValueError("max_batch_size and workers must be at least 1.")
+        self.movies_df = movies_df
+        self.signals = (genre_similarity, tag_similarity, ratings_similarity)
+        self.title_index = title_index or TitleIndex(movies_df["title"])
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.requests = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.max_queue_depth = 0
+        self._queue = queue.Queue()
+        self._slots = threading.Semaphore(workers)  # Free scoring threads
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-scorer")
+        self._lock = threading.Lock()
+        self._closed = False
+        self._collector = threading.Thread(target=self._collect, name="batch-collector", daemon=True)
+        self._collector.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def submit(self, movie_title, genre_weight=0.5, tag_weight=0.3, ratings_weight=0.2, top_n=10,
+               similarity_threshold=0.1, candidate_mask=None):
+        # Queue one request; the future resolves to the recommend_movies DataFrame. A request
+        # with invalid options gets a failed future and never joins a batch.
+        try:
+            request = BatchRequest(movie_title, (genre_weight, tag_weight, ratings_weight), top_n,
+                                   similarity_threshold, candidate_mask, len(self.movies_df))
+        except (TypeError, ValueError) as e:
+            future = Future()
+            future.set_exception(e)
+            return future
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Cannot submit requests to a closed scheduler.")
+            self._queue.put(request)
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return request.future
+
+    def recommend(self, movie_title, **options):
+        # Blocking equivalent of recommend_movies, scored within a batch
+        return self.submit(movie_title, **options).result()
+
+    async def recommend_async(self, movie_title, **options):
+        # Awaitable equivalent of recommend_movies for asyncio callers
+        return await asyncio.wrap_future(self.submit(movie_title, **options))
+
+    def _collect(self):
+        # Wait for a free scoring thread, then gather one batch from the queue
+        stopping = False
+        while not stopping:
+            self._slots.acquire()
+            request = self._queue.get()
+            if request is _STOP:
+                break
+            batch = [request]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    # Past the deadline, still take whatever is already queued
+                    request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is _STOP:
+                    stopping = True
+                    break
+                batch.append(request)
+            with self._lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.largest_batch = max(self.largest_batch, len(batch))
+            self._executor.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch):
+        try:
+            self._score_batch(batch)
+        except Exception as e:
+            # An unexpected failure fails every request of the batch still pending
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def _score_batch(self, batch):
+        # Resolve every title; a title that is not found fails its own request only
+        requests, positions = [], []
+        for request in batch:
+            if not request.future.set_running_or_notify_cancel():
+                continue
+            try:
+                positions.append(find_movie_index(request.movie_title, self.movies_df, self.title_index))
+            except ValueError as e:
+                request.future.set_exception(e)
+                continue
+            requests.append(request)
+        if not requests:
+            return
+
+        positions = np.array(positions, dtype=np.int64)
+        rows = np.arange(len(requests))
+        # One weight per query and signal; skip signals whose weight is zero for the whole batch
+        weights = np.array([request.weights for request in requests], dtype=np.float32).T
+        weights = [weight if weight.any() else 0.0 for weight in weights]
+        top_n = max(request.top_n for request in requests)
+        with span("batch_scheduler.score", rows=len(requests)):
+            scores = blend_rows(positions, self.signals, weights)
+            scores[rows, positions] = -np.inf  # Never recommend the query movie itself
+            if any(request.candidate_mask is not None for request in requests):
+                excluded = np.zeros(scores.shape, dtype=bool)
+                for row, request in enumerate(requests):
+                    if request.candidate_mask is not None:
+                        excluded[row] = ~request.candidate_mask
+                scores[excluded] = -np.inf
+            recommended, top_scores = top_n_rows(scores, top_n)
+            thresholds = np.array([request.similarity_threshold for request in requests], dtype=scores.dtype)
+            recommended[~(top_scores >= thresholds[:, None])] = -1
+
+        for row, request in enumerate(requests):
+            # The top N of a larger N starts with the top N, so each request keeps its prefix
+            selected = recommended[row, :request.top_n]
+            selected = selected[selected >= 0]
+            if selected.size == 0:
+                request.future.set_result(pd.DataFrame(columns=["title", "genres"]))
+            else:
+                request.future.set_result(self.movies_df.iloc[selected][["title", "genres"]])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "requests": self.requests,
+                "batches": self.batches,
+                "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+                "largest_batch": self.largest_batch,
+                "max_batch_size": self.max_batch_size,
+                "max_wait": self.max_wait,
+            }
+
+    def close(self):
+        # Serve the requests already queued, then stop; safe to call more than once
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._collector.join()
+        self._executor.shutdown(wait=True)
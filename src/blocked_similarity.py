@@ -0,0 +1,136 @@
+import numpy as np
+from scipy import sparse
+
+from neighbor_index import NeighborIndex, top_k_rows
+from similarity_store import create_similarity_artifact, write_manifest
+
+# Default working-memory budget of a blocked similarity build
+DEFAULT_MEMORY_BUDGET = 1024 ** 3
+
+"""
+Scale every row of a feature matrix to unit L2 length so dot products are cosine similarities
+Args: features is a dense NumPy array or SciPy sparse matrix
+Returns: a float32 CSR matrix or NumPy array with normalized rows (all-zero rows stay zero)
+"""
+
+def normalize_rows(features):
+    if sparse.issparse(features):
+        features = sparse.csr_matrix(features, dtype=np.float32)
+        norms = np.sqrt(np.asarray(features.multiply(features).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return (sparse.diags((1 / norms).astype(np.float32)) @ features).tocsr()
+    features = np.asarray(features, dtype=np.float32)
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return features / norms
+
+"""
+Estimate the number of bytes a feature matrix occupies in memory
+Args: features is a dense NumPy array or SciPy sparse matrix
+Returns: int, the size in bytes
+"""
+
+def feature_bytes(features):
+    if sparse.issparse(features):
+        features = features.tocsr()
+        return features.data.nbytes + features.indices.nbytes + features.indptr.nbytes
+    return np.asarray(features).nbytes
+
+"""
+Choose how many rows to score per block so a build stays inside a memory budget
+Each block row costs about one float32 score per movie plus the temporaries used to
+select its top K (and, for sparse features, the sparse product before densifying).
+Args:
+- features: the normalized feature matrix the blocks are computed from
+- memory_budget: int, the total bytes the build may use, features included
+Returns: int, the number of rows per block (at least 1)
+Raises: MemoryError if the features alone exceed the budget
+"""
+
+def rows_for_memory_budget(features, memory_budget):
+    n_items = features.shape[0]
+    available = memory_budget - feature_bytes(features)
+    if available <= 0:
+        raise MemoryError("The feature matrix alone exceeds the similarity memory budget.")
+    bytes_per_cell = 32 if sparse.issparse(features) else 16
+    return int(max(1, min(n_items, available // (bytes_per_cell * max(n_items, 1)))))
+
+"""
+Compute cosine similarity one block of rows at a time
+Args:
+- normalized: a row-normalized feature matrix (see normalize_rows)
+- block_rows: int, the number of rows per block
+Yields: tuples (start, stop, block) where block is the dense float32 similarity of rows
+start:stop against every movie
+"""
+
+def iter_similarity_blocks(normalized, block_rows):
+    transposed = normalized.T.tocsc() if sparse.issparse(normalized) else normalized.T
+    for start in range(0, normalized.shape[0], block_rows):
+        stop = min(start + block_rows, normalized.shape[0])
+        block = normalized[start:stop] @ transposed
+        block = block.toarray() if sparse.issparse(block) else np.asarray(block)
+        yield start, stop, block.astype(np.float32, copy=False)
+
+"""
+Build a top-K cosine neighbor index block by block within a memory budget
+Each block is reduced to its top K before the next one is computed, so memory is bounded
+by the budget instead of growing with N*N.
+Args:
+- features: a dense NumPy array or SciPy sparse matrix with one row per movie
+- k: int, the number of neighbors to keep per movie
+- memory_budget: int, the bytes the build may use (default: 1 GiB)
+- block_rows: optional int that overrides the block size derived from the budget
+Returns: a NeighborIndex holding at most k positively scored neighbors per movie
+"""
+
+def blocked_top_k(features, k, memory_budget=DEFAULT_MEMORY_BUDGET, block_rows=None):
+    if k < 1:
+        raise ValueError("k must be at least 1.")
+    normalized = normalize_rows(features)
+    n_items = normalized.shape[0]
+    k = min(k, max(n_items - 1, 1))
+    block_rows = block_rows or rows_for_memory_budget(normalized, memory_budget)
+
+    indices_parts, scores_parts = [], []
+    lengths = np.zeros(n_items, dtype=np.int64)
+    for start, stop, block in iter_similarity_blocks(normalized, block_rows):
+        block_indices, block_scores, block_lengths = top_k_rows(block, k, row_offset=start)
+        indices_parts.append(block_indices)
+        scores_parts.append(block_scores)
+        lengths[start:stop] = block_lengths
+
+    offsets = np.zeros(n_items + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    indices = np.concatenate(indices_parts) if indices_parts else np.empty(0, dtype=np.int32)
+    scores = np.concatenate(scores_parts) if scores_parts else np.empty(0, dtype=np.float32)
+    return NeighborIndex(indices, scores, offsets, n_items)
+
+"""
+Compute the full cosine similarity matrix block by block straight into a memory-mapped
+similarity artifact, so the N*N result lives on disk rather than in memory
+Args:
+- features: a dense NumPy array or SciPy sparse matrix with one row per movie
+- base_path: string path without extension of the artifact to write
+- movie_ids: sequence of movieIds, the order of the matrix rows and columns
+- dtype: string, "float32" or "float16" (default: "float32")
+- params: optional dict of build parameters recorded in the manifest
+- memory_budget: int, the bytes the build may use (default: 1 GiB)
+- block_rows: optional int that overrides the block size derived from the budget
+Returns: the manifest dict of the written artifact
+"""
+
+def blocked_similarity_artifact(features, base_path, movie_ids, dtype="float32", params=None,
+                                memory_budget=DEFAULT_MEMORY_BUDGET, block_rows=None):
+    normalized = normalize_rows(features)
+    n_items = normalized.shape[0]
+    block_rows = block_rows or rows_for_memory_budget(normalized, memory_budget)
+
+    out = create_similarity_artifact(base_path, (n_items, n_items), dtype)
+    for start, stop, block in iter_similarity_blocks(normalized, block_rows):
+        out[start:stop] = block
+        out.flush()  # Hand finished pages back to the OS before the next block
+    del out
+
+    params = dict(params or {}, block_rows=int(block_rows))
+    return write_manifest(base_path, (n_items, n_items), dtype, movie_ids, params)
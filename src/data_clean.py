@@ -1,5 +1,121 @@
 import pandas as pd
+import numpy as np
+import csv
+import io
+import logging
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentation import span
+from similarity_store import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# Column layouts and compact dtypes of the MovieLens .dat files
+MOVIES_COLUMNS = ["movieId", "title", "genres"]
+MOVIES_DTYPES = {"movieId": np.int32, "title": str, "genres": str}
+RATINGS_COLUMNS = ["userId", "movieId", "rating", "timestamp"]
+RATINGS_DTYPES = {"userId": np.int32, "movieId": np.int32, "rating": np.float32, "timestamp": np.int64}
+TAGS_COLUMNS = ["userId", "movieId", "tag", "timestamp"]
+TAGS_DTYPES = {"userId": np.int32, "movieId": np.int32, "tag": str, "timestamp": np.int64}
+
+# "::" is rewritten to this single byte so the C parser can split the records
+FIELD_SEPARATOR = "\x1f"
+DEFAULT_CHUNK_BYTES = 32 * 1024 * 1024
+
+"""
+Split a file into byte ranges of roughly chunk_bytes that start and end on line boundaries
+Args:
+- file_path: string path to the file
+- chunk_bytes: int, the target size of each range in bytes
+Returns: a list of (start, stop) byte offsets covering the whole file
+"""
+
+def split_byte_ranges(file_path, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    file_size = os.path.getsize(file_path)
+    boundaries = [0]
+    with open(file_path, "rb") as f:
+        while boundaries[-1] + chunk_bytes < file_size:
+            # Move each cut forward to just after the next newline
+            f.seek(boundaries[-1] + chunk_bytes)
+            f.readline()
+            position = f.tell()
+            if position >= file_size:
+                break
+            boundaries.append(position)
+    boundaries.append(file_size)
+    return [(start, stop) for start, stop in zip(boundaries, boundaries[1:]) if stop > start]
+
+"""
+Parse one byte range of a "::" delimited file with the C-speed CSV engine
+Args:
+- file_path: string path to the .dat file
+- start, stop: ints, the byte range to parse (must start and end on line boundaries)
+- names: list of column names
+- dtypes: dict of column dtypes passed to pd.read_csv
+Returns: pd.DataFrame holding the records of the range
+"""
+
+def parse_byte_range(file_path, start, stop, names, dtypes=None):
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        data = f.read(stop - start)
+    data = data.replace(b"::", FIELD_SEPARATOR.encode())
+    if not data.strip():
+        return pd.DataFrame({name: pd.Series(dtype=(dtypes or {}).get(name, object)) for name in names})
+    return pd.read_csv(
+        io.BytesIO(data),
+        sep=FIELD_SEPARATOR,
+        header=None,
+        names=names,
+        dtype=dtypes,
+        quoting=csv.QUOTE_NONE,
+        engine="c"
+    )
+
+"""
+Stream a "::" delimited MovieLens file as DataFrame chunks, parsed in parallel
+The file is split into byte ranges that worker processes parse independently. Chunks
+are yielded in file order and at most `workers` chunks are in flight, so peak memory
+stays bounded no matter how large the file is.
+Args:
+- file_path: string path to the .dat file
+- names: list of column names
+- dtypes: dict of column dtypes passed to pd.read_csv
+- workers: int, the number of worker processes (default: number of CPUs)
+- chunk_bytes: int, the approximate size of each chunk in bytes
+Yields: pd.DataFrame chunks in file order
+"""
+
+def iter_dat_chunks(file_path, names, dtypes=None, workers=None, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    ranges = split_byte_ranges(file_path, chunk_bytes)
+    workers = min(workers or os.cpu_count() or 1, len(ranges))
+    if workers <= 1:
+        for start, stop in ranges:
+            yield parse_byte_range(file_path, start, stop, names, dtypes)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for start, stop in ranges:
+            pending.append(pool.submit(parse_byte_range, file_path, start, stop, names, dtypes))
+            if len(pending) >= workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+"""
+Read a whole "::" delimited file through the parallel chunked parser
+Args: see iter_dat_chunks
+Returns: pd.DataFrame with all records of the file
+"""
+
+def read_dat_file(file_path, names, dtypes=None, workers=None, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    chunks = list(iter_dat_chunks(file_path, names, dtypes, workers, chunk_bytes))
+    if not chunks:
+        return parse_byte_range(file_path, 0, 0, names, dtypes)
+    return pd.concat(chunks, ignore_index=True)
 
 """
 Clean movies data by reading file, handling missing data, and ensuring data is
@@ -9,34 +125,53 @@ Args: file_path a string path to the movies data file
 Returns: pd.DataFrame is a cleaned movies dataframe.
 """
 
-def clean_movies(file_path):
-    movies = pd.read_csv(
-        file_path,
-        sep="::",
-        engine="python",
-        header=None,
-        names=["movieId", "title", "genres"]
-    )
-    # Ensure genres are lists and handle missing genres
-    movies["genres"] = movies["genres"].fillna("unknown").str.split("|")
+def clean_movies(file_path, workers=None):
+    with span("clean_movies") as s:
+        movies = read_dat_file(file_path, MOVIES_COLUMNS, MOVIES_DTYPES, workers)
+        # Ensure genres are lists and handle missing genres
+        movies["genres"] = movies["genres"].fillna("unknown").str.split("|")
+        s.set_rows(len(movies))
     return movies
 
+"""
+Stream ratings data as DataFrame chunks with int32 ids and float32 ratings
+Args:
+- file_path: a string path to the ratings data file
+- workers: int, the number of parser processes (default: number of CPUs)
+- chunk_bytes: int, the approximate size of each chunk in bytes
+Yields: pd.DataFrame chunks of ratings in file order
+"""
+
+def iter_ratings_chunks(file_path, workers=None, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    return iter_dat_chunks(file_path, RATINGS_COLUMNS, RATINGS_DTYPES, workers, chunk_bytes)
+
 """
 Clean ratings data by turning file into DataFrame
 Args: file_path is a string path to the ratings data file
 Returns: pd.DataFrame is a cleaned ratings DataFrame
 """
 
-def clean_ratings(file_path):
-    ratings = pd.read_csv(
-        file_path,
-        sep="::",
-        engine="python",
-        header=None,
-        names=["userId", "movieId", "rating", "timestamp"]
-    )
+def clean_ratings(file_path, workers=None):
+    with span("clean_ratings") as s:
+        ratings = read_dat_file(file_path, RATINGS_COLUMNS, RATINGS_DTYPES, workers)
+        s.set_rows(len(ratings))
     return ratings
 
+"""
+Normalize free-text tags to stripped lowercase strings, with "unknown" for missing or
+empty tags
+Each distinct raw tag is normalized once and mapped back through its integer code, so the
+work per row is one hash lookup instead of several full-column string passes.
+Args: tags is a Pandas Series of raw tags
+Returns: a NumPy object array of normalized tags
+"""
+
+def normalize_tags(tags):
+    codes, uniques = pd.factorize(tags)
+    normalized = pd.Series(uniques, dtype=object).astype(str).str.strip().str.lower().replace("", "unknown")
+    # Code -1 marks a missing tag and picks the trailing "unknown"
+    return np.append(normalized.to_numpy(dtype=object), "unknown")[codes]
+
 """
 Clean tags data by reading file, handling missing data, and ensuring data is
 all formatted correctly and consistently
@@ -44,23 +179,12 @@ Args: file_path is a string path to the tags data file
 Returns: pd.DataFrame is a cleaned tags DataFrame
 """
 
-def clean_tags(file_path):
-    tags = pd.read_csv(
-        file_path,
-        sep="::",
-        engine="python",
-        header=None,
-        names=["userId", "movieId", "tag", "timestamp"]
-    )
-    # Ensure all tags are strings and handle missing/invalid values
-    tags["tag"] = tags["tag"].fillna("unknown").astype(str).str.lower().str.strip()
-    tags["tag"] = tags["tag"].replace("", "unknown")  # Handle empty strings explicitly
-
-    # Debugging: Print sample tags and counts of missing/invalid tags
-    print("Sample cleaned tags:", tags["tag"].head())
-    print(f"Total missing tags after cleaning: {tags['tag'].isna().sum()}")
-    print(f"Total empty tags after cleaning: {(tags['tag'] == 'unknown').sum()}")
-
+def clean_tags(file_path, workers=None):
+    with span("clean_tags") as s:
+        tags = read_dat_file(file_path, TAGS_COLUMNS, TAGS_DTYPES, workers)
+        # Ensure all tags are strings and handle missing/invalid values
+        tags["tag"] = normalize_tags(tags["tag"])
+        s.set_rows(len(tags))
     return tags
 
 """
@@ -79,17 +203,22 @@ def save_cleaned_data(movies, ratings, tags, output_dir="data"):
 
     # Debugging: Check for any issues before saving
     if tags["tag"].isna().any():
-        print("Warning: Missing tags detected before saving.")
+        logger.warning("Missing tags detected before saving.")
     if tags["tag"].str.strip().eq("").any():
-        print("Warning: Empty tags detected before saving.")
+        logger.warning("Empty tags detected before saving.")
 
     # Save the cleaned data to CSV files
-    movies.to_csv(os.path.join(output_dir, "cleaned_movies.csv"), index=False)
-    ratings.to_csv(os.path.join(output_dir, "cleaned_ratings.csv"), index=False)
-    tags.to_csv(os.path.join(output_dir, "cleaned_tags.csv"), index=False)
-    print("Cleaned data saved successfully.")
+    with span("save_cleaned_data", rows=len(movies) + len(ratings) + len(tags)):
+        # Each file replaces the previous one atomically, so a model reloading meanwhile never
+        # reads a half-written table
+        for df, name in ((movies, "cleaned_movies.csv"), (ratings, "cleaned_ratings.csv"), (tags, "cleaned_tags.csv")):
+            with atomic_write(os.path.join(output_dir, name)) as path:
+                df.to_csv(path, index=False)
+    logger.info("Cleaned data saved successfully.")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     # Define file paths for the input data
     base_dir = "data/ml-10M100K"  # Adjust this path as needed
     movies_file = os.path.join(base_dir, "movies.dat")
@@ -1,36 +1,45 @@
+import numpy as np
 import pandas as pd
 
+from movie_stats import load_movie_stats
+
 """
-Explore the cleaned movies dataset
-Args: file_path is a string specifying the path to the cleaned movies CSV file
-Prints: 
+Explore the movies of the precomputed statistics table
+Args: file_path is a string specifying the path to the movie_stats.npz file
+Prints:
     - Total number of movies
     - Distribution of genres
-    - A sample of the movies dataset
+    - A sample of the movie statistics
 """
 
 def explore_movies(file_path):
-    movies = pd.read_csv(file_path)
-    print(f"Total movies: {len(movies)}")
-    print(f"Genres Distribution:\n{movies['genres'].explode().value_counts()}")
-    print(f"Sample movies:\n{movies.head()}")
+    stats = load_movie_stats(file_path)
+    # Count the movies having each genre bit set
+    bits = (stats.genre_masks[:, None] >> np.arange(len(stats.genres))) & 1
+    genre_counts = pd.Series(bits.sum(axis=0), index=stats.genres, name="count").sort_values(ascending=False)
+    print(f"Total movies: {len(stats)}")
+    print(f"Genres Distribution:\n{genre_counts}")
+    print(f"Sample movies:\n{stats.to_frame().head()}")
 
 """
-Explore the cleaned ratings dataset
-Args: file_path is a string specifying the path to the cleaned ratings CSV file
-Prints: 
+Explore the ratings summarized in the precomputed statistics table, without reading the
+ratings themselves
+Args: file_path is a string specifying the path to the movie_stats.npz file
+Prints:
     - Total number of ratings
     - Average rating value
-    - A sample of the ratings dataset
+    - The most rated and the best rated movies
 """
 
 def explore_ratings(file_path):
-    ratings = pd.read_csv(file_path)
-    print(f"Total ratings: {len(ratings)}")
-    print(f"Average rating: {ratings['rating'].mean():.2f}")
-    print(f"Sample ratings:\n{ratings.head()}")
+    stats = load_movie_stats(file_path)
+    movies = stats.to_frame()
+    print(f"Total ratings: {int(stats.counts.sum())}")
+    print(f"Average rating: {stats.global_mean:.2f}")
+    print(f"Most rated movies:\n{movies.nlargest(5, 'count')}")
+    print(f"Best rated movies (Bayesian mean):\n{movies.nlargest(5, 'bayesian_mean')}")
 
 if __name__ == "__main__":
-    # Perform exploration on the cleaned movies and ratings datasets
-    explore_movies('data/cleaned_movies.csv')
-    explore_ratings('data/cleaned_ratings.csv')
+    # Perform exploration on the statistics table built with the cleaned datasets
+    explore_movies('data/movie_stats.npz')
+    explore_ratings('data/movie_stats.npz')
@@ -1,8 +1,49 @@
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+import logging
+import os
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer, TfidfTransformer, TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
+from ann_index import IVFIndex
+from blocked_similarity import blocked_similarity_artifact, DEFAULT_MEMORY_BUDGET
+from genre_codebook import build_genre_codebook, parse_genres, save_genre_codebook
+from instrumentation import span
+from latent_factors import build_factor_similarity, save_factor_similarity
+from movie_stats import build_movie_stats, save_movie_stats
+from neighbor_index import build_neighbor_index, save_neighbor_index
+from recommender import signal_files
+
+# Similarity signals in blending order and how each one is computed
+SIGNALS = ("genre", "tag", "ratings")
+SIGNAL_METHODS = {"genre": "tfidf_cosine", "tag": "tfidf_cosine", "ratings": "cosine"}
+
+logger = logging.getLogger(__name__)
+
+"""
+Build the genre TF-IDF feature matrix, one row per movie
+Args: 
+- movies_df: a Pandas DataFrame containing the cleaned movies dataset
+Returns: a SciPy sparse matrix of genre TF-IDF features
+"""
+
+def build_genre_features(movies_df):
+    # Convert genres into space-separated strings, with a placeholder for movies without any
+    genres_str = pd.Series(
+        [" ".join(parse_genres(genres)) for genres in movies_df["genres"]], index=movies_df.index
+    ).replace("", "unknown")
+
+    # Debugging: Validate genres and check for empty strings
+    logger.debug("Sample genre strings after processing:\n%s", genres_str.head())
+    if genres_str.str.strip().eq("").any():
+        raise ValueError("Found empty genre strings after processing. Check the input data.")
+
+    # Compute TF-IDF matrix and genre similarity
+    with span("build_genre_features", rows=len(movies_df)):
+        tfidf = TfidfVectorizer(stop_words="english")
+        return tfidf.fit_transform(genres_str)
+
 """
 Compute a genre similarity matrix using TF-IDF and cosine similarity
 Args: 
@@ -11,25 +52,71 @@ Returns: a NumPy array representing the genre similarity matrix
 """
 
 def precompute_genre_similarity(movies_df):
-    # Convert genres into space-separated strings
-    movies_df["genres_str"] = movies_df["genres"].apply(
-        lambda genres: " ".join(genres) if isinstance(genres, list) else ""
+    with span("precompute_genre_similarity", rows=len(movies_df)):
+        return cosine_similarity(build_genre_features(movies_df))
+
+"""
+Count how often each distinct tag was applied to each movie
+Tags are encoded to integer ids once and the counts are built straight from the
+(movie, tag id) pairs, so the cost grows with the number of tag rows.
+Args:
+- tags_df: a Pandas DataFrame containing the cleaned tags dataset
+- movies_df: a Pandas DataFrame containing the cleaned movies dataset
+Returns: a tuple (counts, tags) where counts is a SciPy CSR matrix (movies x distinct tags)
+and tags is the array of distinct tag strings, one per column
+Raises: KeyError if the tags dataframe has no 'tag' column
+"""
+
+def build_tag_counts(tags_df, movies_df):
+    # Ensure the tags column exists and filter invalid tags
+    if "tag" not in tags_df.columns:
+        raise KeyError("The 'tag' column is missing in the tags dataframe.")
+    tags_df = tags_df[tags_df["tag"] != "unknown"]
+
+    rows = pd.Index(movies_df["movieId"]).get_indexer(tags_df["movieId"])
+    known = rows >= 0  # Tags for movies missing from movies_df are dropped
+    tag_ids, tags = pd.factorize(tags_df["tag"].to_numpy()[known])
+    counts = sparse.csr_matrix(
+        (np.ones(len(tag_ids), dtype=np.float32), (rows[known], tag_ids)),
+        shape=(len(movies_df), len(tags))
     )
+    counts.sum_duplicates()
+    return counts, np.asarray(tags, dtype=object)
 
-    # Replace empty genre strings with a placeholder
-    movies_df["genres_str"] = movies_df["genres_str"].replace("", "unknown")
+"""
+Split each distinct tag into word counts, the terms the tag TF-IDF is computed over
+Args:
+- tags: sequence of distinct tag strings
+- hash_features: optional int; when set, words are hashed into this many columns so memory
+  stays bounded for an unbounded vocabulary
+Returns: a SciPy CSR matrix (tags x terms) of word counts
+"""
 
-    # Debugging: Validate genres and check for empty strings
-    print("Sample genre strings after processing:", movies_df["genres_str"].head())
-    if movies_df["genres_str"].str.strip().eq("").any():
-        raise ValueError("Found empty genre strings after processing. Check the input data.")
+def tag_term_matrix(tags, hash_features=None):
+    if hash_features:
+        vectorizer = HashingVectorizer(n_features=hash_features, stop_words="english", alternate_sign=False,
+                                       norm=None)
+        return vectorizer.transform(tags).tocsr()
+    return CountVectorizer(stop_words="english").fit_transform(tags).tocsr()
 
-    # Compute TF-IDF matrix and genre similarity
-    tfidf = TfidfVectorizer(stop_words="english")
-    tfidf_matrix = tfidf.fit_transform(movies_df["genres_str"])
-    genre_similarity = cosine_similarity(tfidf_matrix)
+"""
+Build the tag TF-IDF feature matrix, one row per movie
+Only the distinct tags are tokenized; the movie x tag counts are then mapped to words with
+one sparse product and TF-IDF weighted, which gives the same features as vectorizing one
+concatenated tag string per movie.
+Args: 
+- tags_df: a Pandas DataFrame containing the cleaned tags dataset
+- movies_df: a Pandas DataFrame containing the cleaned movies dataset
+- hash_features: optional int; hash the tag words into this many columns instead of
+  building a vocabulary
+Returns: a SciPy sparse matrix of tag TF-IDF features
+"""
 
-    return genre_similarity
+def build_tag_features(tags_df, movies_df, hash_features=None):
+    with span("build_tag_features", rows=len(tags_df)):
+        counts, tags = build_tag_counts(tags_df, movies_df)
+        term_counts = counts @ tag_term_matrix(tags, hash_features)
+        return TfidfTransformer().fit_transform(term_counts)
 
 """
 Compute a tag similarity matrix using TF-IDF and cosine similarity
@@ -40,25 +127,46 @@ Returns: a NumPy array representing the tag similarity matrix
 """
 
 def precompute_tag_similarity(tags_df, movies_df):
-    # Ensure the tags column exists and filter invalid tags
-    if "tag" not in tags_df.columns:
-        raise KeyError("The 'tag' column is missing in the tags dataframe.")
-    tags_df = tags_df[tags_df["tag"] != "unknown"]
+    with span("precompute_tag_similarity", rows=len(movies_df)):
+        return cosine_similarity(build_tag_features(tags_df, movies_df))
 
-    # Group tags by movieId and combine them into single strings
-    tag_data = tags_df.groupby("movieId")["tag"].apply(lambda tags: " ".join(tags)).reindex(
-        movies_df["movieId"], fill_value=""
-    )
+"""
+Build a sparse movie x user ratings matrix straight from the rating rows
+User ids are remapped to compact column numbers and rows follow the order of
+movies_df, so memory is proportional to the number of ratings.
+Args:
+- ratings_df: a Pandas DataFrame with userId, movieId, and rating columns
+- movies_df: a Pandas DataFrame containing the cleaned movies dataset
+Returns: a tuple (ratings_matrix, user_ids) where ratings_matrix is a SciPy CSR
+matrix and user_ids holds the original userId of every column
+"""
+
+def build_ratings_matrix(ratings_df, movies_df):
+    rows = pd.Index(movies_df["movieId"]).get_indexer(ratings_df["movieId"])
+    known = rows >= 0  # Ratings for movies missing from movies_df are dropped
+    user_codes, user_ids = pd.factorize(ratings_df["userId"].to_numpy()[known], sort=True)
 
-    # Debugging: Print sample processed tag data
-    print("Sample tag data after processing:", tag_data.head())
+    ratings_matrix = sparse.csr_matrix(
+        (
+            ratings_df["rating"].to_numpy(dtype=np.float32)[known],
+            (rows[known].astype(np.int32), user_codes.astype(np.int32))
+        ),
+        shape=(len(movies_df), len(user_ids))
+    )
+    return ratings_matrix, np.asarray(user_ids)
 
-    # Compute TF-IDF matrix and tag similarity
-    tfidf = TfidfVectorizer(stop_words="english")
-    tfidf_matrix = tfidf.fit_transform(tag_data)
-    tag_similarity = cosine_similarity(tfidf_matrix)
+"""
+Build the ratings feature matrix with one row of user ratings per movie
+Args:
+- ratings_df: a Pandas DataFrame containing the cleaned ratings dataset
+- movies_df: a Pandas DataFrame containing the cleaned movies dataset
+Returns: a SciPy sparse matrix with movies as rows and users as columns
+"""
 
-    return tag_similarity
+def build_ratings_features(ratings_df, movies_df):
+    with span("build_ratings_features", rows=len(ratings_df)):
+        ratings_matrix, _ = build_ratings_matrix(ratings_df, movies_df)
+    return ratings_matrix
 
 """
 Compute a ratings similarity matrix using user-movie ratings
@@ -69,60 +177,171 @@ Returns: a NumPy array representing the ratings similarity matrix
 """
 
 def precompute_ratings_similarity(ratings_df, movies_df):
-    # Create a pivot table with movieId as rows, userId as columns, and ratings as values
-    pivot_table = ratings_df.pivot(index="movieId", columns="userId", values="rating").fillna(0)
+    with span("precompute_ratings_similarity", rows=len(movies_df)):
+        return cosine_similarity(build_ratings_features(ratings_df, movies_df))
 
-    # Ensure alignment with the movies dataset
-    pivot_table = pivot_table.reindex(index=movies_df["movieId"], fill_value=0)
+"""
+Compute one similarity signal and save it to the output directory, either as a dense
+memory-mappable artifact or, when top_k is set, as a sparse top-K neighbor index; the genre
+signal is always saved as a genre combination codebook
+Args:
+- name: string, one of "genre", "tag", or "ratings"
+- movies_df: a Pandas DataFrame containing the cleaned movies dataset
+- tags_df: a Pandas DataFrame containing the cleaned tags dataset (tag signal only)
+- ratings_df: a Pandas DataFrame containing the cleaned ratings dataset (ratings signal only)
+- output_dir: string path to the directory the signal is saved in (default: "data")
+- top_k: optional int, the number of neighbors kept per movie in sparse index mode
+- dtype: string, "float32" or "float16", the storage dtype of dense artifacts
+- ann_probe: optional int; with top_k, build the index with an approximate IVF index
+- memory_budget: int, the bytes the similarity computation may use (default: 1 GiB); rows
+  are scored in blocks sized to fit it
+- ratings_factors: optional int; for the ratings signal, train ALS embeddings of this
+  dimension and save them as a small factor artifact instead of any similarity matrix
+- tag_hash_features: optional int; hash the tag words into this many columns
+Returns: the string path of the file that was written; files of the signal's other formats
+are removed
+"""
+
+def build_signal(name, movies_df, tags_df=None, ratings_df=None, output_dir="data", top_k=None,
+                 dtype="float32", ann_probe=None, memory_budget=DEFAULT_MEMORY_BUDGET, ratings_factors=None,
+                 tag_hash_features=None):
+    with span(f"build_signal.{name}", rows=len(movies_df)):
+        movie_ids = movies_df["movieId"]
+        if name == "ratings" and ratings_factors:
+            # k floats per movie replace the N*N ratings similarity
+            ratings_matrix, _ = build_ratings_matrix(ratings_df, movies_df)
+            output_path = os.path.join(output_dir, f"{name}_factors.npz")
+            save_factor_similarity(build_factor_similarity(ratings_matrix, factors=ratings_factors), output_path,
+                                   movie_ids)
+            written = [output_path]
+        elif name == "genre":
+            # A few hundred genre combinations replace the N*N genre similarity in every mode
+            output_path = os.path.join(output_dir, f"{name}_codebook.npz")
+            codebook = build_genre_codebook(movies_df, build_genre_features(movies_df))
+            save_genre_codebook(codebook, output_path, movie_ids)
+            written = [output_path]
+        else:
+            if name == "tag":
+                features = build_tag_features(tags_df, movies_df, hash_features=tag_hash_features)
+            elif name == "ratings":
+                features = build_ratings_features(ratings_df, movies_df)
+            else:
+                raise ValueError(f"Unknown similarity signal '{name}'.")
 
-    # Compute cosine similarity for ratings
-    ratings_similarity = cosine_similarity(pivot_table)
+            if top_k is not None:
+                # Keep only the top-K neighbors per movie so memory grows as N*K
+                if ann_probe is None:
+                    index = build_neighbor_index(features, top_k, memory_budget=memory_budget)
+                else:
+                    index = IVFIndex(n_probe=ann_probe).fit(features).build_neighbor_index(top_k)
+                output_path = os.path.join(output_dir, f"{name}_neighbors.npz")
+                save_neighbor_index(index, output_path, movie_ids)
+                written = [output_path]
+            else:
+                # Dense similarity is written block by block into a memory-mapped artifact
+                base_path = os.path.join(output_dir, f"{name}_similarity_matrix")
+                blocked_similarity_artifact(features, base_path, movie_ids.tolist(), dtype,
+                                            params={"signal": name, "method": SIGNAL_METHODS[name]},
+                                            memory_budget=memory_budget)
+                output_path = base_path + ".npy"
+                written = [output_path, base_path + ".json"]
 
-    return ratings_similarity
+        remove_stale_signal_files(name, output_dir, written)
+        return output_path
 
 """
-Preprocess the datasets and compute the similarity matrices for genres, tags, and ratings
+Remove the files of a signal's other storage formats once a new one is saved, so a rebuild
+in a different mode (e.g. --top-k after a dense build) is the one that gets loaded
+Args:
+- name: string, the signal name
+- output_dir: string path to the directory the signal is saved in
+- written: list of string paths of the files just saved, which are kept
+"""
+
+def remove_stale_signal_files(name, output_dir, written):
+    written = {os.path.abspath(path) for path in written}
+    for file_name in signal_files(name):
+        path = os.path.join(output_dir, file_name)
+        if os.path.abspath(path) not in written and os.path.exists(path):
+            os.remove(path)
+            logger.info("Removed stale %s similarity file %s.", name, path)
+
+"""
+Preprocess the datasets and compute the similarity data for genres, tags, and ratings,
+and the per-movie statistics table
+Args:
+- top_k: optional int; when set, only the top_k neighbors of every movie are kept for
+  each signal and saved as sparse neighbor indexes instead of dense N*N matrices
+- dtype: string, "float32" or "float16", the storage dtype of dense similarity artifacts
+- ann_probe: optional int; with top_k, build the neighbor indexes with an approximate IVF
+  index that scans ann_probe clusters per movie instead of scoring all pairs
+- memory_budget: int, the bytes each similarity computation may use (default: 1 GiB)
+- ratings_factors: optional int; when set, the ratings signal is saved as ALS embeddings of
+  this dimension instead of a similarity matrix or neighbor index
+- tag_hash_features: optional int; hash the tag words into this many columns
 Raises: an exception with an error message if any issue occurs during preprocessing
 """
 
-def preprocess_data():
+def preprocess_data(top_k=None, dtype="float32", ann_probe=None, memory_budget=DEFAULT_MEMORY_BUDGET,
+                    ratings_factors=None, tag_hash_features=None):
     try:
         # Load cleaned datasets
-        print("Loading cleaned data...")
+        logger.info("Loading cleaned data...")
         movies_df = pd.read_csv("data/cleaned_movies.csv")
         tags_df = pd.read_csv("data/cleaned_tags.csv")
         ratings_df = pd.read_csv("data/cleaned_ratings.csv")
 
         # Debugging: Validate genres and tags
-        print("Checking for missing genres...")
+        logger.info("Checking for missing genres...")
         if movies_df["genres"].isna().any():
             raise ValueError("Found missing genres in the movies data.")
 
-        print("Checking for missing tags...")
+        logger.info("Checking for missing tags...")
         if tags_df["tag"].isna().any() or tags_df["tag"].str.strip().eq("").any():
             raise ValueError("Found missing tags in the tags data.")
 
-        # Compute similarity matrices
-        print("Computing genre similarity matrix...")
-        genre_similarity = precompute_genre_similarity(movies_df)
+        logger.info("Computing movie statistics...")
+        save_movie_stats(build_movie_stats(ratings_df, movies_df), "data/movie_stats.npz")
 
-        print("Computing tag similarity matrix...")
-        tag_similarity = precompute_tag_similarity(tags_df, movies_df)
+        # Compute and save the similarity data of every signal
+        for name in SIGNALS:
+            if name == "ratings" and ratings_factors:
+                logger.info("Training %d-dimensional %s factors...", ratings_factors, name)
+            elif name == "genre":
+                logger.info("Computing %s combination codebook...", name)
+            elif top_k is not None:
+                logger.info("Computing top-%d %s neighbor index...", top_k, name)
+            else:
+                logger.info("Computing %s similarity matrix...", name)
+            build_signal(name, movies_df, tags_df, ratings_df, top_k=top_k, dtype=dtype, ann_probe=ann_probe,
+                         memory_budget=memory_budget, ratings_factors=ratings_factors,
+                         tag_hash_features=tag_hash_features)
 
-        print("Computing ratings similarity matrix...")
-        ratings_similarity = precompute_ratings_similarity(ratings_df, movies_df)
-
-        # Save the computed matrices
-        print("Saving similarity matrices...")
-        np.save("data/genre_similarity_matrix.npy", genre_similarity)
-        np.save("data/tag_similarity_matrix.npy", tag_similarity)
-        np.save("data/ratings_similarity_matrix.npy", ratings_similarity)
-
-        print("Similarity matrices saved successfully.")
+        logger.info("Similarity data saved successfully.")
     except Exception as e:
-        print(f"Error during preprocessing: {e}")
+        logger.error("Error during preprocessing: %s", e)
         raise
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Precompute movie similarity data.")
+    parser.add_argument("--top-k", type=int, default=None,
+                        help="keep only the top K neighbors per movie (sparse index mode)")
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32",
+                        help="storage dtype of the dense similarity artifacts")
+    parser.add_argument("--ann-probe", type=int, default=None,
+                        help="with --top-k, build neighbors approximately, scanning this many IVF clusters")
+    parser.add_argument("--memory-budget-mb", type=int, default=DEFAULT_MEMORY_BUDGET // 1024 ** 2,
+                        help="working memory the similarity computation may use")
+    parser.add_argument("--ratings-factors", type=int, default=None,
+                        help="save the ratings signal as ALS embeddings of this dimension (e.g. 64)")
+    parser.add_argument("--tag-hash-features", type=int, default=None,
+                        help="hash tag words into this many columns instead of building a vocabulary")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     # Execute preprocessing when the script is run directly
-    preprocess_data()
+    preprocess_data(top_k=args.top_k, dtype=args.dtype, ann_probe=args.ann_probe,
+                    memory_budget=args.memory_budget_mb * 1024 ** 2, ratings_factors=args.ratings_factors,
+                    tag_hash_features=args.tag_hash_features)
@@ -0,0 +1,75 @@
+import argparse
+import os
+import pandas as pd
+
+from recommender import load_similarity_data, recommend_movies_batch
+
+"""
+Write recommendations for every movie in the catalog to a CSV file
+The catalog is processed in chunks and each chunk is appended to the output before the
+next one is scored, so memory stays bounded by the chunk size rather than the catalog.
+Args:
+- output_path: string path of the CSV file to write
+- data_dir: string path to the directory holding the preprocessed files (default: "data")
+- genre_weight, tag_weight, ratings_weight: float similarity weights
+- top_n: int, the number of recommendations per movie
+- similarity_threshold: float, minimum similarity threshold for recommendations
+- chunk_size: int, the number of catalog movies scored per chunk
+Returns: int, the number of recommendation rows written
+"""
+
+def export_recommendations(output_path, data_dir="data", genre_weight=0.5, tag_weight=0.3,
+                           ratings_weight=0.2, top_n=10, similarity_threshold=0.1, chunk_size=1024):
+    movies_df = pd.read_csv(os.path.join(data_dir, "cleaned_movies.csv"))
+    genre_similarity, tag_similarity, ratings_similarity = load_similarity_data(
+        data_dir, movie_ids=movies_df["movieId"]
+    )
+
+    movie_ids = movies_df["movieId"].tolist()
+    rows_written = 0
+    for start in range(0, len(movie_ids), chunk_size):
+        recommendations = recommend_movies_batch(
+            movie_ids[start:start + chunk_size],
+            movies_df,
+            genre_similarity,
+            tag_similarity,
+            ratings_similarity,
+            genre_weight=genre_weight,
+            tag_weight=tag_weight,
+            ratings_weight=ratings_weight,
+            top_n=top_n,
+            similarity_threshold=similarity_threshold,
+            batch_size=chunk_size
+        )
+        recommendations.to_csv(output_path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+        rows_written += len(recommendations)
+        print(f"Exported {min(start + chunk_size, len(movie_ids))}/{len(movie_ids)} movies...")
+    return rows_written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export similar-title recommendations for the whole catalog.")
+    parser.add_argument("output", help="path of the CSV file to write")
+    parser.add_argument("--data-dir", default="data", help="directory holding the preprocessed files")
+    parser.add_argument("--genre-weight", type=float, default=0.5)
+    parser.add_argument("--tag-weight", type=float, default=0.3)
+    parser.add_argument("--ratings-weight", type=float, default=0.2)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--similarity-threshold", type=float, default=0.1)
+    parser.add_argument("--chunk-size", type=int, default=1024, help="movies scored per chunk")
+    args = parser.parse_args()
+
+    try:
+        total = export_recommendations(
+            args.output,
+            data_dir=args.data_dir,
+            genre_weight=args.genre_weight,
+            tag_weight=args.tag_weight,
+            ratings_weight=args.ratings_weight,
+            top_n=args.top_n,
+            similarity_threshold=args.similarity_threshold,
+            chunk_size=args.chunk_size
+        )
+        print(f"Wrote {total} recommendations to {args.output}.")
+    except FileNotFoundError as e:
+        print(f"Error: Required data file not found. Please run preprocessing first. ({e})")
+        exit(1)
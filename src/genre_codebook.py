@@ -0,0 +1,137 @@
+import ast
+import numpy as np
+
+from similarity_store import atomic_write
+
+"""
+Read the genres of one movie as a list, whatever form they were stored in
+Args: genres is a list, a "|" separated string, or the string form of a list as written to
+a CSV file (e.g. "['Action', 'Drama']")
+Returns: a list of genre strings (empty when there are none)
+"""
+
+def parse_genres(genres):
+    if isinstance(genres, (list, tuple, np.ndarray)):
+        return [str(genre) for genre in genres]
+    if not isinstance(genres, str) or not genres.strip():
+        return []
+    genres = genres.strip()
+    if genres.startswith("["):
+        try:
+            return [str(genre) for genre in ast.literal_eval(genres)]
+        except (ValueError, SyntaxError):
+            pass
+    return [genre for genre in genres.split("|") if genre]
+
+"""
+Genre similarity stored per genre combination instead of per movie pair.
+A catalog has a few hundred distinct genre combinations, so each movie keeps the id of its
+combination and the similarity of two movies is a lookup in a small combination x
+combination table: table[combo[i], combo[j]].
+Attributes:
+- combo_ids: int32 array, the combination id of every movie in movies dataset order
+- table: float32 array (combinations x combinations), the similarity of every pair
+- masks: int64 array, the genre bitmask of every combination (bit b is genres[b])
+- genres: list of genre strings, the meaning of each bit
+"""
+
+class GenreCodebook:
+    def __init__(self, combo_ids, table, masks, genres):
+        self.combo_ids = np.asarray(combo_ids, dtype=np.int32)
+        self.table = np.asarray(table, dtype=np.float32)
+        self.masks = np.asarray(masks, dtype=np.int64)
+        self.genres = list(genres)
+        if self.table.shape != (len(self.masks), len(self.masks)):
+            raise ValueError("Genre codebook table must have one row and column per combination.")
+
+    @property
+    def shape(self):
+        return (len(self.combo_ids), len(self.combo_ids))
+
+    def rows(self, movie_indices):
+        # Gather the query combinations' table rows, then expand them to every movie
+        movie_indices = np.atleast_1d(np.asarray(movie_indices, dtype=np.int64))
+        return self.table[self.combo_ids[movie_indices]][:, self.combo_ids]
+
+    def combination(self, combo_id):
+        # The genres of one combination
+        mask = int(self.masks[combo_id])
+        return [genre for bit, genre in enumerate(self.genres) if mask >> bit & 1]
+
+"""
+Encode every movie's genres as a bitmask over the catalog's genre vocabulary
+Args: movies_df is a Pandas DataFrame with a genres column (see parse_genres)
+Returns: a tuple (masks, genres) where masks is an int64 array with one bitmask per movie
+and genres is the sorted genre vocabulary
+Raises: ValueError if the catalog has more than 63 genres
+"""
+
+def genre_bitmasks(movies_df):
+    movie_genres = [parse_genres(genres) for genres in movies_df["genres"]]
+    genres = sorted({genre for names in movie_genres for genre in names})
+    if len(genres) > 63:
+        raise ValueError("Genre bitmasks support at most 63 distinct genres.")
+    bits = {genre: np.int64(1) << np.int64(bit) for bit, genre in enumerate(genres)}
+    masks = np.array([sum((bits[genre] for genre in set(names)), np.int64(0)) for names in movie_genres],
+                     dtype=np.int64)
+    return masks, genres
+
+"""
+Build the genre codebook of a catalog
+Each combination's row of the table is the cosine similarity of the feature row of one
+movie that has it, so a lookup equals the per-movie similarity of the same features.
+Args:
+- movies_df: a Pandas DataFrame with a genres column
+- features: sparse matrix with one row per movie (see data_preprocessing.build_genre_features)
+Returns: a GenreCodebook
+"""
+
+def build_genre_codebook(movies_df, features):
+    # SciPy is only needed to build a codebook, so serving processes never import it
+    from scipy import sparse
+
+    masks, genres = genre_bitmasks(movies_df)
+    combo_masks, representatives, combo_ids = np.unique(masks, return_index=True, return_inverse=True)
+    features = sparse.csr_matrix(features, dtype=np.float64)[representatives]
+    norms = np.sqrt(np.asarray(features.multiply(features).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    features = sparse.diags(1 / norms) @ features
+    table = (features @ features.T).toarray()
+    return GenreCodebook(combo_ids.ravel(), table, combo_masks, genres)
+
+"""
+Save a genre codebook as a small .npz artifact
+Args:
+- codebook: the GenreCodebook to save
+- file_path: string path of the .npz file
+- movie_ids: sequence of movieIds, the order of combo_ids
+"""
+
+def save_genre_codebook(codebook, file_path, movie_ids):
+    movie_ids = np.asarray(movie_ids, dtype=np.int64)
+    if len(movie_ids) != len(codebook.combo_ids):
+        raise ValueError("Genre codebook movies must match the number of movie ids.")
+    with atomic_write(file_path) as path:
+        np.savez(
+            path,
+            combo_ids=codebook.combo_ids,
+            table=codebook.table,
+            masks=codebook.masks,
+            genres=np.asarray(codebook.genres, dtype=str),
+            movie_ids=movie_ids,
+        )
+
+"""
+Load a genre codebook written by save_genre_codebook
+Args:
+- file_path: string path of the .npz file
+- movie_ids: optional sequence of movieIds the codebook must be aligned with
+Returns: a GenreCodebook
+Raises: ValueError if the codebook is not aligned with movie_ids
+"""
+
+def load_genre_codebook(file_path, movie_ids=None):
+    with np.load(file_path) as data:
+        if movie_ids is not None and not np.array_equal(data["movie_ids"], np.asarray(movie_ids)):
+            raise ValueError(f"Genre codebook '{file_path}' is not aligned with the movies dataset.")
+        return GenreCodebook(data["combo_ids"], data["table"], data["masks"], data["genres"].tolist())
@@ -0,0 +1,492 @@
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from data_clean import parse_byte_range, RATINGS_COLUMNS, RATINGS_DTYPES
+from neighbor_index import NeighborIndex, replace_neighbor_block, save_neighbor_index, load_neighbor_index
+from similarity_store import atomic_write
+
+# Overflow entries, as a fraction of the stored entries, that trigger a merge into the base
+DEFAULT_COMPACT_RATIO = 0.1
+# Movies whose neighbor lists are computed together, which bounds the memory of a full build
+NEIGHBOR_BLOCK_ROWS = 2048
+
+"""
+Sparse matrix that takes additions in place. Entries already stored in its base CSR matrix
+are updated where they are, and entries outside that structure collect in a small overflow
+matrix, merged into the base only once it outgrows a fraction of it. An update therefore
+costs time in proportion to its own size rather than to the whole matrix, and a base loaded
+from writable memory maps is persisted by the pages the update touched.
+Attributes:
+- base: SciPy CSR matrix with sorted indices
+- extra: SciPy CSR matrix of the entries outside the base structure
+- compact_ratio: float, the overflow size (as a fraction of base entries) that triggers a merge
+- data_map: the writable np.memmap holding base.data when the base was loaded from its saved
+  files, otherwise None
+"""
+
+class IncrementalMatrix:
+    def __init__(self, base, extra=None, compact_ratio=DEFAULT_COMPACT_RATIO, data_map=None):
+        self.base = base if sparse.isspmatrix_csr(base) else sparse.csr_matrix(base)
+        self.base.has_sorted_indices = True
+        self.extra = sparse.csr_matrix(self.base.shape) if extra is None else sparse.csr_matrix(extra)
+        self.compact_ratio = compact_ratio
+        self.data_map = data_map
+
+    @property
+    def shape(self):
+        return self.base.shape
+
+    def resize(self, n_rows):
+        # Growing the row count only extends the row pointers
+        self.base.resize((n_rows, self.shape[1]))
+        self.extra.resize((n_rows, self.shape[1]))
+
+    def positions(self, rows, columns):
+        # Position of every (row, column) entry in base.data, or -1 when it is not stored;
+        # all entries are binary-searched together within their rows
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = np.asarray(columns, dtype=np.int64)
+        if self.base.nnz == 0:
+            return np.full(len(rows), -1, dtype=np.int64)
+        indptr, indices = self.base.indptr, self.base.indices
+        low = indptr[rows].astype(np.int64)
+        high = indptr[rows + 1].astype(np.int64)
+        end = high.copy()
+        while True:
+            active = low < high
+            if not active.any():
+                break
+            middle = (low + high) // 2
+            right = active & (indices[np.minimum(middle, len(indices) - 1)] < columns)
+            low = np.where(right, middle + 1, low)
+            high = np.where(active & ~right, middle, high)
+        found = (low < end) & (indices[np.minimum(low, len(indices) - 1)] == columns)
+        return np.where(found, low, -1)
+
+    def values(self, rows, columns):
+        positions = self.positions(rows, columns)
+        values = np.zeros(len(positions), dtype=np.float64)
+        found = positions >= 0
+        values[found] = self.base.data[positions[found]]
+        if self.extra.nnz:
+            values += np.asarray(self.extra[rows, columns], dtype=np.float64).ravel()
+        return values
+
+    def diagonal(self):
+        diagonal = np.arange(min(self.shape))
+        return self.values(diagonal, diagonal)
+
+    def rows(self, rows):
+        block = self.base[rows]
+        if self.extra.nnz:
+            block = block + self.extra[rows]
+        return block.tocsr()
+
+    def add(self, rows, columns, values):
+        # Add values at unique (row, column) entries
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = np.asarray(columns, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        positions = self.positions(rows, columns)
+        found = positions >= 0
+        self.base.data[positions[found]] += values[found]
+        if not found.all():
+            new = ~found
+            self.extra = (self.extra + sparse.csr_matrix(
+                (values[new], (rows[new], columns[new])), shape=self.shape
+            )).tocsr()
+            if self.extra.nnz > self.compact_ratio * max(self.base.nnz, 1):
+                self.compact()
+
+    def compact(self):
+        # Merge the overflow into a new base, which the next save writes in full
+        self.base = (self.base + self.extra).tocsr()
+        self.base.sort_indices()
+        self.extra = sparse.csr_matrix(self.shape)
+        self.data_map = None
+
+    def to_csr(self):
+        return (self.base + self.extra).tocsr()
+
+"""
+Incremental state of the ratings similarity signal.
+It keeps the ratings as a user x movie matrix, the movie x movie co-rating dot products
+(whose diagonal holds the squared movie norms), and the top-K ratings neighbor index.
+A batch of new ratings then only touches the users and movies it involves.
+Attributes:
+- movie_ids: int array, the movieId of every row/column, in movies dataset order
+- user_ids: int array, the userId of every row of user_ratings
+- user_ratings: IncrementalMatrix, users as rows and movies as columns
+- gram: IncrementalMatrix, co-rating dot products between movies
+- neighbors: NeighborIndex, the top-k ratings neighbors of every movie
+- k: int, the number of neighbors kept per movie
+- ratings_offset: int, the number of bytes of ratings.dat already applied
+- state_dir: optional string path of the directory the state was loaded from
+"""
+
+class RatingsSimilarityState:
+    def __init__(self, movie_ids, user_ids, user_ratings, gram, neighbors, k, ratings_offset=0, state_dir=None):
+        self.movie_ids = np.asarray(movie_ids)
+        self.user_ids = np.asarray(user_ids)
+        self.user_ratings = user_ratings if isinstance(user_ratings, IncrementalMatrix) else \
+            IncrementalMatrix(sparse.csr_matrix(user_ratings, dtype=np.float64))
+        self.gram = gram if isinstance(gram, IncrementalMatrix) else \
+            IncrementalMatrix(sparse.csr_matrix(gram, dtype=np.float64))
+        self.neighbors = neighbors
+        self.k = int(k)
+        self.ratings_offset = int(ratings_offset)
+        self.state_dir = state_dir
+
+    @property
+    def norms(self):
+        return np.sqrt(np.maximum(self.gram.diagonal(), 0))
+
+"""
+Compute the top-K cosine neighbors of some movies from their co-rating dot products
+All rows are scored and ranked together with array operations.
+Args:
+- gram_rows: SciPy CSR matrix holding the co-rating dot product rows of the movies in rows
+- norms: 1D array, the L2 norm of every movie's ratings vector
+- rows: sequence of ints, the movies the rows of gram_rows belong to
+- k: int, the number of neighbors to keep per movie
+Returns: a tuple (indices, scores, lengths) of the neighbor lists, best first, concatenated
+in the order of rows
+"""
+
+def gram_neighbors(gram_rows, norms, rows, k):
+    rows = np.asarray(rows, dtype=np.int64)
+    entry_rows = np.repeat(np.arange(len(rows)), np.diff(gram_rows.indptr))
+    columns = gram_rows.indices
+    denominator = norms[rows][entry_rows] * norms[columns]
+    scores = np.divide(gram_rows.data, denominator, out=np.zeros(len(columns)), where=denominator > 0)
+    keep = (columns != rows[entry_rows]) & (scores > 0)
+    entry_rows, columns, scores = entry_rows[keep], columns[keep], scores[keep]
+
+    # Best score first within every row, ties broken by movie position
+    order = np.lexsort((columns, -scores, entry_rows))
+    entry_rows, columns, scores = entry_rows[order], columns[order], scores[order]
+    counts = np.bincount(entry_rows, minlength=len(rows))
+    ranks = np.arange(len(entry_rows)) - (np.cumsum(counts) - counts)[entry_rows]
+    top = ranks < k
+    return columns[top].astype(np.int32), scores[top].astype(np.float32), np.minimum(counts, k)
+
+"""
+Recompute the neighbor lists of some movies, one block of movies at a time
+Args:
+- state: the RatingsSimilarityState
+- movies: 1D int array of the movies to recompute
+Returns: the state's neighbor index with those movies' lists replaced
+"""
+
+def recompute_neighbors(state, movies):
+    norms = state.norms
+    neighbors = state.neighbors
+    for start in range(0, len(movies), NEIGHBOR_BLOCK_ROWS):
+        block = movies[start:start + NEIGHBOR_BLOCK_ROWS]
+        indices, scores, lengths = gram_neighbors(state.gram.rows(block), norms, block, state.k)
+        neighbors = replace_neighbor_block(neighbors, block, indices, scores, lengths)
+    return neighbors
+
+"""
+Build the incremental ratings state from the full ratings history
+Args:
+- ratings_df: a Pandas DataFrame with userId, movieId, and rating columns
+- movies_df: a Pandas DataFrame containing the cleaned movies dataset
+- k: int, the number of ratings neighbors kept per movie (default: 50)
+- ratings_offset: int, the number of bytes of ratings.dat covered by ratings_df
+Returns: a RatingsSimilarityState
+"""
+
+def build_ratings_state(ratings_df, movies_df, k=50, ratings_offset=0):
+    from data_preprocessing import build_ratings_matrix
+
+    ratings_matrix, user_ids = build_ratings_matrix(ratings_df, movies_df)
+    user_ratings = ratings_matrix.T.tocsr().astype(np.float64)
+    user_ratings.sort_indices()
+    gram = (user_ratings.T @ user_ratings).tocsr()
+    gram.sort_indices()
+
+    n_items = len(movies_df)
+    state = RatingsSimilarityState(movies_df["movieId"], user_ids, user_ratings, gram,
+                                   NeighborIndex([], [], np.zeros(n_items + 1, dtype=np.int64), n_items), k,
+                                   ratings_offset)
+    state.neighbors = recompute_neighbors(state, np.arange(n_items))
+    return state
+
+"""
+Find the movies whose cosine with a movie of changed norm can move it into, out of, or
+within their neighbor list
+Only the cosine with that movie changed for these movies, so a movie keeps its list unless
+the changed movie is on it or now scores at least as high as its last neighbor.
+Args:
+- state: the RatingsSimilarityState, with the gram already updated
+- norm_changed: 1D int array of the movies whose norm changed
+- norms: 1D array, the updated movie norms
+Returns: a 1D int array of the movies that need their list recomputed
+"""
+
+def lists_touched_by_norms(state, norm_changed, norms):
+    block = state.gram.rows(norm_changed)
+    changed = np.repeat(norm_changed, np.diff(block.indptr))
+    movies = block.indices.astype(np.int64)
+    denominator = norms[movies] * norms[changed]
+    scores = np.divide(block.data, denominator, out=np.zeros(len(movies)), where=denominator > 0)
+
+    neighbors = state.neighbors
+    lengths = np.diff(neighbors.offsets)[movies]
+    last = neighbors.offsets[movies + 1] - 1
+    full = lengths >= state.k
+    last_scores = np.where(full, neighbors.scores[np.maximum(last, 0)] if len(neighbors.scores) else 0.0, 0.0)
+    # Stored scores are float32, so compare at that precision
+    entering = (scores > 0) & (~full | (scores.astype(np.float32) >= last_scores))
+
+    # A changed movie already on a list always forces that list to be recomputed
+    listed = np.zeros(len(movies), dtype=bool)
+    for rank in range(state.k):
+        has_rank = lengths > rank
+        position = neighbors.offsets[movies[has_rank]] + rank
+        listed[np.flatnonzero(has_rank)[neighbors.indices[position] == changed[has_rank]]] = True
+    return np.unique(movies[entering | listed])
+
+"""
+Apply a batch of new or changed ratings to the incremental state
+With R the current user x movie ratings and D the change, the co-rating products grow by
+R_u^T D_u + D_u^T R_u + D_u^T D_u, where only the users u present in the batch contribute.
+Both matrices are updated in place, and neighbor lists are recomputed only for the movies
+whose dot products or norm changed and for the movies a norm change can re-rank.
+Args:
+- state: the RatingsSimilarityState to update in place
+- delta_df: a Pandas DataFrame with userId, movieId, and rating columns; a rating for an
+  existing (userId, movieId) pair replaces the old value
+Returns: a dict summarizing the update (ratings applied, skipped, new users, movies updated)
+"""
+
+def apply_ratings_delta(state, delta_df):
+    delta_df = delta_df.drop_duplicates(subset=["userId", "movieId"], keep="last")
+    movie_columns = pd.Index(state.movie_ids).get_indexer(delta_df["movieId"])
+    known = movie_columns >= 0  # Movies missing from the catalog need a full rebuild
+    delta_df, movie_columns = delta_df[known], movie_columns[known]
+    if delta_df.empty:
+        return {"ratings": 0, "skipped": int((~known).sum()), "new_users": 0, "movies_updated": 0}
+    if state.state_dir is not None:
+        # The saved matrices are about to change in place
+        write_state_meta(state, dirty=True)
+
+    # Give new users their own rows at the end of the ratings matrix
+    user_index = pd.Index(state.user_ids)
+    new_users = pd.unique(delta_df["userId"][user_index.get_indexer(delta_df["userId"]) < 0])
+    if len(new_users):
+        state.user_ids = np.concatenate([state.user_ids, new_users])
+        state.user_ratings.resize(len(state.user_ids))
+        user_index = pd.Index(state.user_ids)
+    user_rows = user_index.get_indexer(delta_df["userId"])
+
+    # The change matrix holds new rating minus old rating for every touched pair
+    changes = delta_df["rating"].to_numpy(dtype=np.float64) - state.user_ratings.values(user_rows, movie_columns)
+    affected_users, local_rows = np.unique(user_rows, return_inverse=True)
+    change = sparse.csr_matrix(
+        (changes, (local_rows, movie_columns)), shape=(len(affected_users), len(state.movie_ids))
+    )
+
+    current = state.user_ratings.rows(affected_users)
+    cross = (current.T @ change).tocsr()
+    gram_change = (cross + cross.T + change.T @ change).tocoo()
+    nonzero = gram_change.data != 0
+    change_rows, change_columns = gram_change.row[nonzero], gram_change.col[nonzero]
+    state.gram.add(change_rows, change_columns, gram_change.data[nonzero])
+    state.user_ratings.add(user_rows, movie_columns, changes)
+
+    # Lists change for movies whose dot products moved, and possibly for movies co-rated with
+    # a movie whose norm moved, since the norm scales all of that movie's cosines
+    norms = state.norms
+    norm_changed = np.unique(change_rows[change_rows == change_columns])
+    affected_movies = np.union1d(np.unique(change_rows), lists_touched_by_norms(state, norm_changed, norms))
+    state.neighbors = recompute_neighbors(state, affected_movies)
+    return {
+        "ratings": int(len(delta_df)),
+        "skipped": int((~known).sum()),
+        "new_users": int(len(new_users)),
+        "movies_updated": int(len(affected_movies)),
+    }
+
+"""
+Read the complete rating lines appended to ratings.dat after a byte offset
+A trailing partial line (still being written) is left for the next call.
+Args:
+- file_path: string path to the ratings.dat file
+- offset: int, the byte offset already applied
+Returns: a tuple (delta_df, new_offset)
+"""
+
+def read_appended_ratings(file_path, offset):
+    with open(file_path, "rb") as f:
+        f.seek(offset)
+        appended = f.read()
+    stop = offset + appended.rfind(b"\n") + 1
+    if stop <= offset:
+        return parse_byte_range(file_path, offset, offset, RATINGS_COLUMNS, RATINGS_DTYPES), offset
+    return parse_byte_range(file_path, offset, stop, RATINGS_COLUMNS, RATINGS_DTYPES), stop
+
+"""
+Write the metadata file of a saved ratings state
+Args:
+- state: the RatingsSimilarityState
+- dirty: bool, True while the saved matrices are being changed in place
+"""
+
+def write_state_meta(state, dirty=False):
+    meta = {"k": state.k, "ratings_offset": state.ratings_offset, "n_users": len(state.user_ids), "dirty": dirty}
+    with atomic_write(os.path.join(state.state_dir, "state.json")) as path, open(path, "w") as f:
+        json.dump(meta, f)
+
+"""
+Save an IncrementalMatrix to a state directory
+Base arrays are written only when the base is not already the memory map of its files (the
+first save, or after a merge); otherwise the values an update changed are already in the
+mapped data file and only the small overflow matrix is written.
+Args:
+- matrix: the IncrementalMatrix
+- state_dir: string path to the state directory
+- name: string, the file name prefix
+"""
+
+def save_incremental_matrix(matrix, state_dir, name):
+    if matrix.data_map is not None:
+        matrix.data_map.flush()
+    else:
+        for part in ("indptr", "indices", "data"):
+            with atomic_write(os.path.join(state_dir, f"{name}_{part}.npy")) as path:
+                np.save(path, getattr(matrix.base, part))
+    with atomic_write(os.path.join(state_dir, f"{name}_extra.npz")) as path:
+        sparse.save_npz(path, matrix.extra)
+
+"""
+Load an IncrementalMatrix saved by save_incremental_matrix, memory-mapping its base so the
+next update changes the saved values in place
+Args:
+- state_dir: string path to the state directory
+- name: string, the file name prefix
+- n_rows: int, the number of rows; rows added since the base was written are empty in it
+Returns: an IncrementalMatrix
+"""
+
+def load_incremental_matrix(state_dir, name, n_rows):
+    def array(part, mode):
+        return np.load(os.path.join(state_dir, f"{name}_{part}.npy"), mmap_mode=mode)
+
+    extra = sparse.load_npz(os.path.join(state_dir, f"{name}_extra.npz")).tocsr()
+    indptr = array("indptr", "r")
+    indptr = np.concatenate([indptr, np.full(n_rows + 1 - len(indptr), indptr[-1], dtype=indptr.dtype)])
+    data = array("data", "r+")
+    base = sparse.csr_matrix((data, array("indices", "r"), indptr), shape=(n_rows, extra.shape[1]))
+    return IncrementalMatrix(base, extra, data_map=data)
+
+"""
+Save the incremental ratings state to a directory
+After the first save, an update writes only what it changed: the touched pages of the
+memory-mapped matrices, the overflow matrices, the user ids, and the neighbor index.
+Args:
+- state: the RatingsSimilarityState to save
+- state_dir: string path to the output directory
+"""
+
+def save_ratings_state(state, state_dir):
+    os.makedirs(state_dir, exist_ok=True)
+    if state.state_dir is not None and os.path.abspath(state.state_dir) != os.path.abspath(state_dir):
+        # Memory-mapped bases belong to the directory they were loaded from
+        state.user_ratings.data_map = state.gram.data_map = None
+    state.state_dir = state_dir
+    save_incremental_matrix(state.user_ratings, state_dir, "user_ratings")
+    save_incremental_matrix(state.gram, state_dir, "gram")
+    save_neighbor_index(state.neighbors, os.path.join(state_dir, "neighbors.npz"), state.movie_ids)
+    for name in ("movie_ids", "user_ids"):
+        with atomic_write(os.path.join(state_dir, f"{name}.npy")) as path:
+            np.save(path, getattr(state, name))
+    write_state_meta(state)
+
+"""
+Load an incremental ratings state saved by save_ratings_state
+Args: state_dir is a string path to the state directory
+Returns: a RatingsSimilarityState
+Raises: ValueError if an update of the state was interrupted, leaving it inconsistent
+"""
+
+def load_ratings_state(state_dir):
+    with open(os.path.join(state_dir, "state.json")) as f:
+        meta = json.load(f)
+    if meta.get("dirty"):
+        raise ValueError(f"An update of the ratings state in '{state_dir}' was interrupted; rebuild it with init.")
+    user_ids = np.load(os.path.join(state_dir, "user_ids.npy"))
+    movie_ids = np.load(os.path.join(state_dir, "movie_ids.npy"))
+    return RatingsSimilarityState(
+        movie_ids,
+        user_ids,
+        load_incremental_matrix(state_dir, "user_ratings", len(user_ids)),
+        load_incremental_matrix(state_dir, "gram", len(movie_ids)),
+        load_neighbor_index(os.path.join(state_dir, "neighbors.npz"), movie_ids=movie_ids),
+        meta["k"],
+        meta["ratings_offset"],
+        state_dir,
+    )
+
+"""
+Make the state's neighbor index the ratings signal that the recommender loads from a data
+directory: it replaces data_dir/ratings_neighbors.npz atomically, and the ratings signal's
+other formats are removed so load_signal cannot pick a stale dense matrix or factors.
+Args:
+- state_dir: string path to the saved state
+- data_dir: string path to the directory the recommender loads from
+Returns: the string path of the published neighbor index
+Raises: ValueError if the state was built for another catalog than data_dir's movies
+"""
+
+def publish_ratings_neighbors(state_dir, data_dir):
+    from data_preprocessing import remove_stale_signal_files
+
+    movies_df = pd.read_csv(os.path.join(data_dir, "cleaned_movies.csv"), usecols=["movieId"])
+    source = os.path.join(state_dir, "neighbors.npz")
+    target = os.path.join(data_dir, "ratings_neighbors.npz")
+    load_neighbor_index(source, movie_ids=movies_df["movieId"])
+    with atomic_write(target) as path:
+        # The state replaces its files atomically too, so sharing the inode is safe
+        try:
+            os.link(source, path)
+        except OSError:
+            shutil.copyfile(source, path)
+    remove_stale_signal_files("ratings", data_dir, [target])
+    return target
+
+if __name__ == "__main__":
+    import argparse
+    from data_clean import clean_ratings
+
+    parser = argparse.ArgumentParser(description="Incrementally maintain the ratings neighbor index.")
+    parser.add_argument("command", choices=["init", "update"])
+    parser.add_argument("--data-dir", default="data",
+                        help="directory holding cleaned_movies.csv, where ratings_neighbors.npz is published")
+    parser.add_argument("--ratings", default="data/ml-10M100K/ratings.dat", help="path to ratings.dat")
+    parser.add_argument("--delta", default=None, help="apply this delta file instead of appended ratings.dat rows")
+    parser.add_argument("--state-dir", default="data/ratings_state")
+    parser.add_argument("--k", type=int, default=50, help="neighbors kept per movie (init only)")
+    args = parser.parse_args()
+
+    if args.command == "init":
+        print("Building ratings state from the full history...")
+        movies_df = pd.read_csv(os.path.join(args.data_dir, "cleaned_movies.csv"))
+        state = build_ratings_state(clean_ratings(args.ratings), movies_df, args.k,
+                                    ratings_offset=os.path.getsize(args.ratings))
+    else:
+        state = load_ratings_state(args.state_dir)
+        if args.delta:
+            delta_df = clean_ratings(args.delta)
+        else:
+            delta_df, state.ratings_offset = read_appended_ratings(args.ratings, state.ratings_offset)
+        summary = apply_ratings_delta(state, delta_df)
+        print(f"Applied ratings delta: {summary}")
+
+    save_ratings_state(state, args.state_dir)
+    print(f"Ratings neighbor index published to {publish_ratings_neighbors(args.state_dir, args.data_dir)}.")
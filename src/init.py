@@ -1,36 +1,49 @@
-import subprocess
-import os
+import logging
 
-"""
-Run a python script as a subprocess and handle any errors
-Args: script_name is a string that is the relative path to the script to run
-"""
-
-def run_script(script_name):
-    try:
-        print(f"Running {script_name}...")
-        subprocess.run(["python3", script_name], check=True)
-    # Re-raise the exception to halt execution in case of failure
-    except subprocess.CalledProcessError as e:
-        print(f"Error while running {script_name}: {e}")
-        raise
+import instrumentation
+from pipeline import run_pipeline
 
 """
-Prepare the project by executing the required set-up scripts in correct order
-data_clean: cleans and saves movies, ratings, and tags datasets
-data_preprocessing: precomputes similarity matrices for genres, tags, ratings
+Prepare the project by running the in-process build pipeline
+clean: cleans and saves movies, ratings, and tags datasets
+similarity: precomputes similarity data for genres, tags, ratings in parallel
+Args: the keyword arguments of pipeline.run_pipeline
+Returns: a dict mapping each stage name to its wall time in seconds
 """
 
-def initialize_project():
-    scripts = [
-        "src/data_clean.py",
-        "src/data_preprocessing.py"
-    ]
-
-    for script in scripts:
-        run_script(script)
+def initialize_project(**pipeline_options):
+    return run_pipeline(**pipeline_options)
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Clean the raw data and precompute similarity data.")
+    parser.add_argument("--raw-dir", default="data/ml-10M100K", help="directory holding the MovieLens .dat files")
+    parser.add_argument("--output-dir", default="data")
+    parser.add_argument("--workers", type=int, default=None, help="processes for the similarity stage")
+    parser.add_argument("--top-k", type=int, default=None,
+                        help="keep only the top K neighbors per movie (sparse index mode)")
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    parser.add_argument("--ann-probe", type=int, default=None,
+                        help="with --top-k, build neighbors approximately, scanning this many IVF clusters")
+    parser.add_argument("--memory-budget-mb", type=int, default=1024,
+                        help="working memory the similarity stage may use")
+    parser.add_argument("--ratings-factors", type=int, default=None,
+                        help="save the ratings signal as ALS embeddings of this dimension (e.g. 64)")
+    parser.add_argument("--tag-hash-features", type=int, default=None,
+                        help="hash tag words into this many columns instead of building a vocabulary")
+    parser.add_argument("--metrics", default=None,
+                        help="record instrumentation spans and write their metrics snapshot to this JSON file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.metrics:
+        instrumentation.enable()
+
     # Start the initialization process
-    initialize_project()
+    initialize_project(raw_dir=args.raw_dir, output_dir=args.output_dir, workers=args.workers,
+                       top_k=args.top_k, dtype=args.dtype, ann_probe=args.ann_probe,
+                       memory_budget=args.memory_budget_mb * 1024 ** 2,
+                       ratings_factors=args.ratings_factors, tag_hash_features=args.tag_hash_features)
+    if args.metrics:
+        instrumentation.write_snapshot(args.metrics)
     print("Project initialized. You can now run the app.")
@@ -0,0 +1,252 @@
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Instrumentation is off unless enabled in code or with MOVIE_RECS_INSTRUMENT=1
+_enabled = os.environ.get("MOVIE_RECS_INSTRUMENT", "0") not in ("", "0")
+_metrics = {}
+_metrics_lock = threading.Lock()
+# Lists receiving every span record of this process, see collect_spans
+_collectors = []
+_local = threading.local()
+_page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+"""
+Turn span recording on or off for the whole process
+Args: enabled is a bool (default: True)
+"""
+
+def enable(enabled=True):
+    global _enabled
+    _enabled = bool(enabled)
+
+def disable():
+    enable(False)
+
+def is_enabled():
+    return _enabled
+
+"""
+Read the current resident set size of this process
+Returns: int, the RSS in bytes (0 where /proc is unavailable)
+"""
+
+def current_rss_bytes():
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * _page_size
+    except OSError:
+        return 0
+
+"""
+Read the peak resident set size of this process
+Returns: int, the peak RSS in bytes
+"""
+
+def peak_rss_bytes():
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+"""
+Reset the peak resident set size of this process so the next measurement starts fresh
+Returns: bool, whether the reset is supported (Linux only)
+"""
+
+def reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+"""
+A timed, named region of work. Spans opened inside another span on the same thread are
+named "outer/inner". On exit the span is logged at INFO level, with the measurements in
+the record's `span` attribute, and added to the metrics snapshot.
+CPU time is process-wide, so it includes other threads working at the same time.
+Args:
+- name: string, the span name
+- rows: optional int, the number of rows the span processed (can be set later with set_rows)
+"""
+
+class Span:
+    __slots__ = ("name", "rows", "_wall", "_cpu", "_rss")
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+
+    def set_rows(self, rows):
+        self.rows = rows
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        if stack:
+            self.name = f"{stack[-1].name}/{self.name}"
+        stack.append(self)
+        self._rss = current_rss_bytes()
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        _local.stack.pop()
+        record = {
+            "span": self.name,
+            "wall_s": wall,
+            "cpu_s": cpu,
+            "rows": None if self.rows is None else int(self.rows),
+            "rss_delta_mb": (current_rss_bytes() - self._rss) / 1024 ** 2,
+            "peak_rss_mb": peak_rss_bytes() / 1024 ** 2,
+            "error": exc_type.__name__ if exc_type else None,
+        }
+        record_span(record)
+        logger.info("%s wall=%.4fs cpu=%.4fs rows=%s peak_rss=%.1fMB%s", self.name, wall, cpu, record["rows"],
+                    record["peak_rss_mb"], f" error={record['error']}" if exc_type else "", extra={"span": record})
+        return False
+
+"""
+The span handed out while instrumentation is disabled; every method does nothing
+"""
+
+class NullSpan:
+    __slots__ = ()
+
+    def set_rows(self, rows):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+NULL_SPAN = NullSpan()
+
+"""
+Open an instrumentation span
+With instrumentation disabled this returns a shared no-op span, so an instrumented call
+costs one flag check.
+Args:
+- name: string, the span name
+- rows: optional int, the number of rows processed
+Returns: a context manager yielding the span
+Example:
+    with span("clean_ratings") as s:
+        ratings = ...
+        s.set_rows(len(ratings))
+"""
+
+def span(name, rows=None):
+    if not _enabled:
+        return NULL_SPAN
+    return Span(name, rows)
+
+"""
+Add one finished span to the aggregated metrics
+Args: record is the dict of measurements built by Span.__exit__
+"""
+
+def record_span(record):
+    with _metrics_lock:
+        metrics = _metrics.get(record["span"])
+        if metrics is None:
+            metrics = _metrics[record["span"]] = {
+                "count": 0, "errors": 0, "wall_s": 0.0, "max_wall_s": 0.0, "cpu_s": 0.0, "rows": 0,
+                "max_peak_rss_mb": 0.0,
+            }
+        metrics["count"] += 1
+        metrics["errors"] += record["error"] is not None
+        metrics["wall_s"] += record["wall_s"]
+        metrics["max_wall_s"] = max(metrics["max_wall_s"], record["wall_s"])
+        metrics["cpu_s"] += record["cpu_s"]
+        metrics["rows"] += record["rows"] or 0
+        metrics["max_peak_rss_mb"] = max(metrics["max_peak_rss_mb"], record["peak_rss_mb"])
+        for records in _collectors:
+            records.append(record)
+
+"""
+Collect the records of the spans finished in this process while the block runs
+Worker processes return the collected records with their result, and the parent adds
+them to its own metrics with merge_spans.
+Yields: a list the span record dicts are appended to
+"""
+
+@contextmanager
+def collect_spans():
+    records = []
+    with _metrics_lock:
+        _collectors.append(records)
+    try:
+        yield records
+    finally:
+        with _metrics_lock:
+            _collectors.remove(records)
+
+"""
+Add span records collected in another process to the aggregated metrics
+Args: records is a sequence of span record dicts, as yielded by collect_spans
+"""
+
+def merge_spans(records):
+    for record in records:
+        record_span(record)
+
+"""
+Copy the metrics aggregated per span name since the last reset
+Spans recorded in other processes appear once their records are merged with merge_spans, as
+the pipeline does for its workers.
+Returns: a dict mapping span names to their count, errors, total and max wall time, CPU
+time, rows, and max peak RSS
+"""
+
+def snapshot():
+    with _metrics_lock:
+        return {name: dict(metrics) for name, metrics in _metrics.items()}
+
+def reset():
+    with _metrics_lock:
+        _metrics.clear()
+
+"""
+Write the metrics snapshot to a JSON file
+Args: path is the string path of the file to write
+Returns: the snapshot that was written
+"""
+
+def write_snapshot(path):
+    metrics = snapshot()
+    with open(path, "w") as file:
+        json.dump(metrics, file, indent=2)
+    return metrics
+
+"""
+Logging formatter that writes span records as one JSON object per line and other records
+as {"message": ...}, for log collectors that ingest structured logs
+"""
+
+class JsonSpanFormatter(logging.Formatter):
+    def format(self, record):
+        payload = dict(getattr(record, "span", None) or {"message": record.getMessage()})
+        payload.update(logger=record.name, level=record.levelname, time=record.created)
+        return json.dumps(payload)
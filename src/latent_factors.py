@@ -0,0 +1,191 @@
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from scipy import sparse
+
+from instrumentation import span
+from similarity_store import atomic_write
+
+# Defaults of the alternating least squares factorization
+DEFAULT_FACTORS = 64
+DEFAULT_REGULARIZATION = 0.05
+DEFAULT_ITERATIONS = 10
+
+"""
+Ratings similarity computed from k-dimensional movie embeddings instead of a stored N*N
+matrix. Movie similarity is the cosine of two embeddings and a user's scores are the
+predicted ratings of their folded-in embedding, so every query is a small dense product.
+Attributes:
+- item_factors: float32 array (movies x k), the movie embeddings in movies dataset order
+- global_mean: float, the mean rating the factors were trained around
+- regularization: float, the ALS regularization, reused when folding in users
+"""
+
+class FactorSimilarity:
+    def __init__(self, item_factors, global_mean=0.0, regularization=DEFAULT_REGULARIZATION):
+        self.item_factors = np.ascontiguousarray(item_factors, dtype=np.float32)
+        self.global_mean = float(global_mean)
+        self.regularization = float(regularization)
+        norms = np.linalg.norm(self.item_factors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        self.normalized = self.item_factors / norms
+
+    @property
+    def shape(self):
+        return (len(self.item_factors), len(self.item_factors))
+
+    def rows(self, movie_indices):
+        # Cosine similarity of the requested movies against every movie
+        movie_indices = np.atleast_1d(np.asarray(movie_indices, dtype=np.int64))
+        return self.normalized[movie_indices] @ self.normalized.T
+
+    def fold_in(self, history_rows):
+        # Solve the user half-step of ALS against the fixed movie embeddings
+        centered = sparse.csr_matrix(history_rows, dtype=np.float32, copy=True)
+        centered.data -= self.global_mean
+        return solve_factors(centered, self.item_factors, self.regularization)
+
+    def user_scores(self, history_rows):
+        # Predicted ratings of every movie for users given their rating rows
+        return self.fold_in(history_rows) @ self.item_factors.T + np.float32(self.global_mean)
+
+"""
+Split the rows of a CSR matrix into groups of rows with the same number of entries
+Rows of equal length can be gathered into one dense (rows x length x k) block, so a group
+is solved with batched matrix products instead of a Python loop over rows.
+Args:
+- indptr: the CSR row pointer array
+- max_elements: int, the most row entries a group may hold, which bounds its memory
+- min_length: int, rows are counted as at least this long (the factor count, so the
+  k x k normal equations of short rows are bounded too)
+Returns: a list of (length, rows) tuples where rows is an int array of row numbers
+"""
+
+def equal_length_groups(indptr, max_elements, min_length=1):
+    lengths = np.diff(indptr)
+    order = np.argsort(lengths, kind="stable")
+    boundaries = np.flatnonzero(np.diff(lengths[order])) + 1
+    groups = []
+    for rows in np.split(order, boundaries):
+        length = int(lengths[rows[0]]) if len(rows) else 0
+        step = max(1, max_elements // max(length, min_length, 1))
+        groups += [(length, rows[start:start + step]) for start in range(0, len(rows), step)]
+    return groups
+
+"""
+Solve one half-step of alternating least squares: the factors of every row of a ratings
+matrix given the fixed factors of its columns, with weighted-lambda regularization
+Rows are solved in equal-length groups on a thread pool; each group is a few batched NumPy
+calls (matmul and solve), which release the GIL, so the threads run in parallel.
+Args:
+- ratings: SciPy CSR matrix of centered ratings, rows are the factors being solved
+- fixed: array with one row of factors per column of ratings
+- regularization: float, the lambda scaled by the number of ratings of each row
+- workers: int, the number of threads (default: number of CPUs)
+- max_elements: int, the most ratings gathered per group (default: 65536)
+Returns: a float32 array with one row of factors per row of ratings (zero for empty rows)
+"""
+
+def solve_factors(ratings, fixed, regularization, workers=None, max_elements=65536):
+    ratings = sparse.csr_matrix(ratings)
+    indptr, indices, data = ratings.indptr, ratings.indices, ratings.data.astype(np.float64)
+    k = fixed.shape[1]
+    fixed = np.asarray(fixed, dtype=np.float64)
+    out = np.zeros((ratings.shape[0], k), dtype=np.float32)
+    identity = np.eye(k)
+
+    def solve_group(group):
+        length, rows = group
+        if length == 0:
+            return  # Rows without ratings keep zero factors
+        entries = indptr[rows][:, None] + np.arange(length)
+        rated = fixed[indices[entries]]  # (rows, length, k)
+        rated_t = rated.transpose(0, 2, 1)
+        gram = rated_t @ rated + regularization * length * identity
+        rhs = rated_t @ data[entries][..., None]
+        out[rows] = np.linalg.solve(gram, rhs)[..., 0]
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        list(pool.map(solve_group, equal_length_groups(indptr, max_elements, min_length=k)))
+    return out
+
+"""
+Factorize a sparse movie x user ratings matrix with alternating least squares
+Ratings are centered on their global mean; each iteration solves all user factors with the
+movie factors fixed, then all movie factors with the user factors fixed.
+Args:
+- ratings_matrix: SciPy sparse matrix, movies as rows and users as columns (see
+  data_preprocessing.build_ratings_matrix)
+- factors: int, the embedding dimension k (default: 64)
+- regularization: float, the weighted-lambda regularization (default: 0.05)
+- iterations: int, the number of alternating passes (default: 10)
+- workers: int, the number of solver threads (default: number of CPUs)
+- seed: int, the seed of the random initial movie factors (default: 0)
+Returns: a tuple (item_factors, user_factors, global_mean)
+"""
+
+def train_als(ratings_matrix, factors=DEFAULT_FACTORS, regularization=DEFAULT_REGULARIZATION,
+              iterations=DEFAULT_ITERATIONS, workers=None, seed=0):
+    item_ratings = sparse.csr_matrix(ratings_matrix, dtype=np.float32, copy=True)
+    item_ratings.sum_duplicates()
+    global_mean = float(item_ratings.data.mean()) if item_ratings.nnz else 0.0
+    item_ratings.data -= global_mean
+    user_ratings = item_ratings.T.tocsr()
+
+    rng = np.random.default_rng(seed)
+    item_factors = rng.normal(0, 0.1, (item_ratings.shape[0], factors)).astype(np.float32)
+    user_factors = np.zeros((user_ratings.shape[0], factors), dtype=np.float32)
+    for _ in range(iterations):
+        with span("train_als.iteration", rows=item_ratings.nnz):
+            user_factors = solve_factors(user_ratings, item_factors, regularization, workers)
+            item_factors = solve_factors(item_ratings, user_factors, regularization, workers)
+    return item_factors, user_factors, global_mean
+
+"""
+Train ALS factors on the ratings and wrap them as a ratings similarity signal
+Args:
+- ratings_matrix: SciPy sparse matrix, movies as rows and users as columns
+- the remaining keyword arguments of train_als
+Returns: a FactorSimilarity
+"""
+
+def build_factor_similarity(ratings_matrix, factors=DEFAULT_FACTORS, regularization=DEFAULT_REGULARIZATION,
+                            iterations=DEFAULT_ITERATIONS, workers=None, seed=0):
+    item_factors, _, global_mean = train_als(ratings_matrix, factors, regularization, iterations, workers, seed)
+    return FactorSimilarity(item_factors, global_mean, regularization)
+
+"""
+Save a factor signal as a small .npz artifact (movies x k floats instead of movies x movies)
+Args:
+- similarity: the FactorSimilarity to save
+- file_path: string path of the .npz file
+- movie_ids: sequence of movieIds, the order of the factor rows
+"""
+
+def save_factor_similarity(similarity, file_path, movie_ids):
+    movie_ids = np.asarray(movie_ids, dtype=np.int64)
+    if len(movie_ids) != len(similarity.item_factors):
+        raise ValueError("Factor rows must match the number of movie ids.")
+    with atomic_write(file_path) as path:
+        np.savez(
+            path,
+            item_factors=similarity.item_factors,
+            movie_ids=movie_ids,
+            global_mean=np.float64(similarity.global_mean),
+            regularization=np.float64(similarity.regularization),
+        )
+
+"""
+Load a factor signal written by save_factor_similarity
+Args:
+- file_path: string path of the .npz file
+- movie_ids: optional sequence of movieIds the factors must be aligned with
+Returns: a FactorSimilarity
+Raises: ValueError if the factors are not aligned with movie_ids
+"""
+
+def load_factor_similarity(file_path, movie_ids=None):
+    with np.load(file_path) as data:
+        if movie_ids is not None and not np.array_equal(data["movie_ids"], np.asarray(movie_ids)):
+            raise ValueError(f"Factor artifact '{file_path}' is not aligned with the movies dataset.")
+        return FactorSimilarity(data["item_factors"], float(data["global_mean"]), float(data["regularization"]))
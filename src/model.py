@@ -0,0 +1,259 @@
+import logging
+import os
+import threading
+import pandas as pd
+
+from attribute_filters import build_attribute_index
+from instrumentation import span
+from movie_stats import load_movie_stats
+from recommender import SIGNAL_NAMES, load_similarity_data, recommend_movies, recommend_movies_batch, signal_files
+from result_cache import RecommendationCache
+from title_index import TitleIndex
+
+logger = logging.getLogger(__name__)
+
+# The movies table every artifact is aligned with
+MOVIES_FILE = "cleaned_movies.csv"
+# The optional per-movie statistics table
+STATS_FILE = "movie_stats.npz"
+# Recommendation options turned into a candidate mask by the attribute index
+FILTER_OPTIONS = ("genres", "year_from", "year_to", "match_all_genres")
+
+"""
+List the files a model is loaded from that currently exist in a data directory
+Args: data_dir is a string path to the directory holding the preprocessed files
+Returns: a sorted list of file names
+"""
+
+def artifact_files(data_dir):
+    names = [MOVIES_FILE, STATS_FILE]
+    for name in SIGNAL_NAMES:
+        names += signal_files(name)
+    return sorted(name for name in names if os.path.exists(os.path.join(data_dir, name)))
+
+"""
+Fingerprint the model files of a data directory by name, modification time, and size
+Args: data_dir is a string path to the directory holding the preprocessed files
+Returns: a tuple that changes whenever a model file is written, added, or removed
+"""
+
+def artifact_fingerprint(data_dir):
+    fingerprint = []
+    for name in artifact_files(data_dir):
+        stat = os.stat(os.path.join(data_dir, name))
+        fingerprint.append((name, stat.st_mtime_ns, stat.st_size))
+    return tuple(fingerprint)
+
+"""
+One consistent, immutable state of a model: the movies table, the three similarity
+signals, and everything derived from the table. A reload builds a new snapshot and swaps it
+in with one assignment, so a request that takes a snapshot sees a single catalog and its
+matching signals from start to finish.
+Args:
+- movies_df: DataFrame, the dataset containing movie information
+- signals: tuple (genre_similarity, tag_similarity, ratings_similarity)
+- title_index: optional TitleIndex; built from movies_df when not given
+- stats: optional MovieStats enabling the min_ratings, popularity_weight, and fallback options
+- attributes: optional AttributeIndex; built from movies_df and stats when not given
+- generation: int, the result cache generation this snapshot's results are stored under
+"""
+
+class ModelSnapshot:
+    def __init__(self, movies_df, signals, title_index=None, stats=None, attributes=None, generation=0):
+        self.movies_df = movies_df
+        self.signals = tuple(signals)
+        self.title_index = title_index or TitleIndex(movies_df["title"])
+        self.stats = stats
+        self.attributes = attributes or build_attribute_index(movies_df, stats)
+        self.generation = generation
+
+    def __len__(self):
+        return len(self.movies_df)
+
+    def recommend(self, movie_title, cache=None, **options):
+        # recommend_movies over this snapshot; options are its keyword arguments
+        if cache is not None:
+            cache = cache.for_generation(self.generation)
+        return recommend_movies(movie_title, self.movies_df, *self.signals, title_index=self.title_index,
+                                cache=cache, stats=self.stats, **self.apply_filters(options))
+
+    def recommend_batch(self, movies, **options):
+        # recommend_movies_batch over this snapshot; options are its keyword arguments
+        return recommend_movies_batch(movies, self.movies_df, *self.signals, title_index=self.title_index,
+                                      stats=self.stats, **self.apply_filters(options))
+
+    def apply_filters(self, options):
+        # Replace the attribute filters among options by the candidate mask they select
+        filters = {name: options.pop(name) for name in FILTER_OPTIONS if name in options}
+        if filters:
+            options["candidate_mask"] = self.attributes.candidate_mask(**filters)
+        return options
+
+"""
+Read-only recommendation model: the movies table, the three similarity signals, and the
+title index, loaded once and shared by every request a process serves.
+Dense signals are memory-mapped, so processes on one machine share a single copy of them
+through the page cache. The loaded data lives in an immutable ModelSnapshot that reloads
+replace as a whole; the attributes below read the current snapshot.
+Args:
+- movies_df: DataFrame, the dataset containing movie information
+- genre_similarity, tag_similarity, ratings_similarity: the similarity signals
+- title_index: optional TitleIndex; built from movies_df when not given
+- cache: optional RecommendationCache for single-title results; a new one is created when
+  not given and it is cleared whenever the signals are replaced
+- data_dir: optional string path the model was loaded from; required by reload_if_changed
+- stats: optional MovieStats enabling the min_ratings, popularity_weight, and fallback options
+Besides the options of recommend_movies, recommend and recommend_batch accept the attribute
+filters genres, year_from, year_to, and match_all_genres.
+"""
+
+class RecommenderModel:
+    def __init__(self, movies_df, genre_similarity, tag_similarity, ratings_similarity, title_index=None,
+                 cache=None, data_dir=None, stats=None):
+        self.cache = cache if cache is not None else RecommendationCache()
+        self.data_dir = data_dir
+        self.snapshot = ModelSnapshot(movies_df, (genre_similarity, tag_similarity, ratings_similarity),
+                                      title_index, stats, generation=self.cache.generation)
+        self.fingerprint = artifact_fingerprint(data_dir) if data_dir else None
+        self._reload_lock = threading.Lock()
+
+    @property
+    def movies_df(self):
+        return self.snapshot.movies_df
+
+    @property
+    def signals(self):
+        return self.snapshot.signals
+
+    @property
+    def genre_similarity(self):
+        return self.snapshot.signals[0]
+
+    @property
+    def tag_similarity(self):
+        return self.snapshot.signals[1]
+
+    @property
+    def ratings_similarity(self):
+        return self.snapshot.signals[2]
+
+    @property
+    def title_index(self):
+        return self.snapshot.title_index
+
+    @property
+    def stats(self):
+        return self.snapshot.stats
+
+    @property
+    def attributes(self):
+        return self.snapshot.attributes
+
+    def __len__(self):
+        return len(self.snapshot)
+
+    def recommend(self, movie_title, **options):
+        # recommend_movies over the current snapshot; options are its keyword arguments
+        return self.snapshot.recommend(movie_title, cache=self.cache, **options)
+
+    def recommend_batch(self, movies, **options):
+        # recommend_movies_batch over the current snapshot; options are its keyword arguments
+        return self.snapshot.recommend_batch(movies, **options)
+
+    def apply_filters(self, options):
+        return self.snapshot.apply_filters(options)
+
+    def swap(self, movies_df, signals, stats=None, title_index=None):
+        # Build the complete new snapshot first, then publish it with one assignment. Clearing
+        # the cache starts a new generation, so requests still running on the old snapshot
+        # cannot store their results under the new one.
+        with self._reload_lock:
+            self._swap(movies_df, signals, stats, title_index)
+
+    def _swap(self, movies_df, signals, stats, title_index):
+        current = self.snapshot
+        if title_index is None and movies_df is current.movies_df:
+            title_index = current.title_index
+        title_index = title_index or TitleIndex(movies_df["title"])
+        if movies_df is current.movies_df and stats is current.stats:
+            attributes = current.attributes
+        else:
+            attributes = build_attribute_index(movies_df, stats)
+        generation = self.cache.clear()
+        self.snapshot = ModelSnapshot(movies_df, signals, title_index, stats, attributes, generation)
+
+    def set_signals(self, genre_similarity, tag_similarity, ratings_similarity):
+        # Replace the signals of the current catalog
+        current = self.snapshot
+        self.swap(current.movies_df, (genre_similarity, tag_similarity, ratings_similarity), current.stats)
+
+    def reload(self, data_dir="data"):
+        # Reload the similarity artifacts saved for this catalog
+        self.set_signals(*load_similarity_data(data_dir, movie_ids=self.movies_df["movieId"]))
+
+    def warm_up(self):
+        # Answer one query so imports, the title index, and the first signal pages are ready
+        # before the first user arrives; the cache is bypassed so its counters stay clean
+        snapshot = self.snapshot
+        if len(snapshot) == 0:
+            return
+        with span("model.warm_up"):
+            snapshot.recommend(snapshot.movies_df["title"].iloc[0])
+
+    def reload_if_changed(self):
+        # Reload from data_dir when its files changed on disk; returns whether the model changed.
+        # Artifacts are replaced atomically on disk, so the loaded snapshot stays intact while
+        # they are rebuilt; a failed load (e.g. a rebuild still in progress) keeps it and is
+        # retried on the next call.
+        if self.data_dir is None:
+            return False
+        with self._reload_lock:
+            try:
+                fingerprint = artifact_fingerprint(self.data_dir)
+            except FileNotFoundError:
+                # A file vanished between listing and stat, as when a rebuild removes the
+                # formats it replaced; the directory is changing, so retry on the next poll
+                return False
+            if fingerprint == self.fingerprint:
+                return False
+            try:
+                with span("model.reload"):
+                    movies_df = pd.read_csv(os.path.join(self.data_dir, MOVIES_FILE))
+                    signals = load_similarity_data(self.data_dir, movie_ids=movies_df["movieId"])
+                    stats = load_stats(self.data_dir, movie_ids=movies_df["movieId"])
+            except (OSError, ValueError) as e:
+                logger.warning("Keeping the loaded model; reloading '%s' failed: %s", self.data_dir, e)
+                return False
+            current = self.snapshot
+            title_index = current.title_index if movies_df.equals(current.movies_df) else None
+            self._swap(movies_df, signals, stats, title_index)
+            self.fingerprint = fingerprint
+            logger.info("Reloaded the model from '%s'.", self.data_dir)
+            return True
+
+"""
+Load the per-movie statistics table of a data directory when it was built
+Args:
+- data_dir: a string path to the directory holding the preprocessed files
+- movie_ids: optional sequence of movieIds the table must be aligned with
+Returns: a MovieStats, or None when the directory has no statistics table
+"""
+
+def load_stats(data_dir, movie_ids=None):
+    stats_path = os.path.join(data_dir, STATS_FILE)
+    if not os.path.exists(stats_path):
+        return None
+    return load_movie_stats(stats_path, movie_ids=movie_ids)
+
+"""
+Load the recommendation model from the preprocessed data directory
+Args: data_dir is a string path to the directory holding the preprocessed files
+Returns: a RecommenderModel
+Raises: FileNotFoundError if the movies table or a similarity signal is missing
+"""
+
+def load_model(data_dir="data"):
+    movies_df = pd.read_csv(os.path.join(data_dir, MOVIES_FILE))
+    signals = load_similarity_data(data_dir, movie_ids=movies_df["movieId"])
+    stats = load_stats(data_dir, movie_ids=movies_df["movieId"])
+    return RecommenderModel(movies_df, *signals, data_dir=data_dir, stats=stats)
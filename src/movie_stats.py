@@ -0,0 +1,213 @@
+import numpy as np
+import pandas as pd
+
+from genre_codebook import genre_bitmasks
+from instrumentation import span
+from scoring import top_n_indices
+from similarity_store import atomic_write
+
+# Defaults of the smoothed mean and the decayed popularity
+DEFAULT_PRIOR_WEIGHT = 10
+DEFAULT_HALF_LIFE_DAYS = 365
+SECONDS_PER_DAY = 86400
+
+"""
+Per-movie rating statistics computed once at build time, so popularity filters and
+fallbacks never touch the raw ratings at query time.
+Attributes:
+- movie_ids: int array, the movieId of every entry in movies dataset order
+- counts: int32 array, the number of ratings of every movie
+- means: float32 array, the mean rating of every movie (NaN without ratings)
+- bayesian_means: float32 array, the mean smoothed towards global_mean by prior_weight
+  virtual ratings, so movies with a handful of ratings do not top the charts
+- popularity: float32 array, the number of ratings with each one decayed by its age, halving
+  every half_life_days before the newest rating
+- genre_masks: int64 array, the genre bitmask of every movie (see genre_codebook)
+- genres: list of genre strings, the meaning of each bit
+- global_mean: float, the mean of all ratings
+- prior_weight: float, the number of virtual global_mean ratings of the smoothed mean
+- half_life_days: float, the half-life of the popularity decay
+- reference_time: int, the timestamp popularity is measured at (the newest rating)
+"""
+
+class MovieStats:
+    def __init__(self, movie_ids, counts, means, popularity, genre_masks, genres, global_mean,
+                 prior_weight=DEFAULT_PRIOR_WEIGHT, half_life_days=DEFAULT_HALF_LIFE_DAYS, reference_time=0):
+        self.movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        self.counts = np.asarray(counts, dtype=np.int32)
+        self.means = np.asarray(means, dtype=np.float32)
+        self.popularity = np.asarray(popularity, dtype=np.float32)
+        self.genre_masks = np.asarray(genre_masks, dtype=np.int64)
+        self.genres = list(genres)
+        self.global_mean = float(global_mean)
+        self.prior_weight = float(prior_weight)
+        self.half_life_days = float(half_life_days)
+        self.reference_time = int(reference_time)
+
+        rating_sums = np.nan_to_num(self.means.astype(np.float64)) * self.counts
+        self.bayesian_means = ((rating_sums + self.prior_weight * self.global_mean)
+                               / np.maximum(self.counts + self.prior_weight, 1)).astype(np.float32)
+        # Log-scaled popularity in [0, 1], the term added to similarity when re-ranking
+        scaled = np.log1p(self.popularity)
+        self.popularity_scores = (scaled / scaled.max() if len(scaled) and scaled.max() > 0
+                                  else np.zeros_like(scaled))
+
+    def __len__(self):
+        return len(self.movie_ids)
+
+    def support_mask(self, min_ratings):
+        # Movies with at least min_ratings ratings
+        return self.counts >= min_ratings
+
+    def popular_in_genre(self, movie_index, top_n, min_ratings=0, candidate_mask=None):
+        # The most popular other movies sharing a genre with one movie, most popular first;
+        # candidate_mask optionally restricts the movies that may be returned
+        query_mask = self.genre_masks[movie_index]
+        if query_mask:
+            candidates = (self.genre_masks & query_mask) != 0
+        else:
+            candidates = self.genre_masks == 0
+        candidates &= self.support_mask(min_ratings)
+        if candidate_mask is not None:
+            candidates &= np.asarray(candidate_mask, dtype=bool)
+        candidates[movie_index] = False
+        candidates = np.flatnonzero(candidates)
+        return candidates[top_n_indices(self.popularity[candidates], top_n)]
+
+    def to_frame(self):
+        # The statistics as a DataFrame indexed like the movies dataset
+        return pd.DataFrame({
+            "movieId": self.movie_ids,
+            "count": self.counts,
+            "mean": self.means,
+            "bayesian_mean": self.bayesian_means,
+            "popularity": self.popularity,
+        })
+
+"""
+Aggregate ratings per movie in a single pass over chunks of ratings
+Every chunk is reduced with np.bincount, so memory stays at a few arrays of catalog length
+however many ratings are streamed. Decayed popularity is kept relative to the newest
+timestamp seen so far and rescaled whenever a newer one arrives; chunks without
+timestamps count every rating fully.
+Args:
+- chunks: iterable of DataFrames with movieId, rating, and (optionally) timestamp columns
+- movie_ids: sequence of movieIds, the order of the output arrays; other movies are ignored
+- half_life_days: float, the half-life of the popularity decay (default: 365)
+Returns: a tuple (counts, rating_sums, popularity, reference_time) of float64 arrays and the
+newest timestamp
+"""
+
+def accumulate_movie_stats(chunks, movie_ids, half_life_days=DEFAULT_HALF_LIFE_DAYS):
+    movie_index = pd.Index(movie_ids)
+    n_movies = len(movie_index)
+    counts = np.zeros(n_movies)
+    rating_sums = np.zeros(n_movies)
+    popularity = np.zeros(n_movies)
+    reference_time = None
+    decay_seconds = half_life_days * SECONDS_PER_DAY / np.log(2)
+
+    for chunk in chunks:
+        positions = movie_index.get_indexer(chunk["movieId"])
+        known = positions >= 0
+        positions = positions[known]
+        counts += np.bincount(positions, minlength=n_movies)
+        rating_sums += np.bincount(positions, weights=chunk["rating"].to_numpy(np.float64)[known],
+                                   minlength=n_movies)
+        if "timestamp" not in chunk or not len(positions):
+            popularity += np.bincount(positions, minlength=n_movies)
+            continue
+
+        timestamps = chunk["timestamp"].to_numpy(np.float64)[known]
+        newest = timestamps.max()
+        if reference_time is None:
+            reference_time = newest
+        elif newest > reference_time:
+            # Age everything counted so far to the new reference time
+            popularity *= np.exp((reference_time - newest) / decay_seconds)
+            reference_time = newest
+        popularity += np.bincount(positions, weights=np.exp((timestamps - reference_time) / decay_seconds),
+                                  minlength=n_movies)
+    return counts, rating_sums, popularity, int(reference_time or 0)
+
+"""
+Build the per-movie statistics table of a catalog
+Args:
+- ratings: a DataFrame with movieId, rating, and timestamp columns, or an iterable of such
+  DataFrames (e.g. data_clean.iter_ratings_chunks) to stream a large ratings file
+- movies_df: a Pandas DataFrame containing the cleaned movies dataset
+- prior_weight: float, the virtual ratings of the Bayesian-smoothed mean (default: 10)
+- half_life_days: float, the half-life of the popularity decay (default: 365)
+Returns: a MovieStats aligned with movies_df
+"""
+
+def build_movie_stats(ratings, movies_df, prior_weight=DEFAULT_PRIOR_WEIGHT, half_life_days=DEFAULT_HALF_LIFE_DAYS):
+    chunks = [ratings] if isinstance(ratings, pd.DataFrame) else ratings
+    with span("build_movie_stats", rows=len(movies_df)):
+        counts, rating_sums, popularity, reference_time = accumulate_movie_stats(
+            chunks, movies_df["movieId"], half_life_days
+        )
+        means = np.divide(rating_sums, counts, out=np.full(len(counts), np.nan), where=counts > 0)
+        global_mean = rating_sums.sum() / counts.sum() if counts.sum() else 0.0
+        genre_masks, genres = genre_bitmasks(movies_df)
+    return MovieStats(movies_df["movieId"], counts, means, popularity, genre_masks, genres, global_mean,
+                      prior_weight, half_life_days, reference_time)
+
+"""
+Save a statistics table as a small .npz artifact
+Args:
+- stats: the MovieStats to save
+- file_path: string path of the .npz file
+"""
+
+def save_movie_stats(stats, file_path):
+    with atomic_write(file_path) as path:
+        np.savez(
+            path,
+            movie_ids=stats.movie_ids,
+            counts=stats.counts,
+            means=stats.means,
+            popularity=stats.popularity,
+            genre_masks=stats.genre_masks,
+            genres=np.asarray(stats.genres, dtype=str),
+            global_mean=np.float64(stats.global_mean),
+            prior_weight=np.float64(stats.prior_weight),
+            half_life_days=np.float64(stats.half_life_days),
+            reference_time=np.int64(stats.reference_time),
+        )
+
+"""
+Load a statistics table written by save_movie_stats
+Args:
+- file_path: string path of the .npz file
+- movie_ids: optional sequence of movieIds the table must be aligned with
+Returns: a MovieStats
+Raises: ValueError if the table is not aligned with movie_ids
+"""
+
+def load_movie_stats(file_path, movie_ids=None):
+    with np.load(file_path) as data:
+        if movie_ids is not None and not np.array_equal(data["movie_ids"], np.asarray(movie_ids)):
+            raise ValueError(f"Movie statistics '{file_path}' are not aligned with the movies dataset.")
+        return MovieStats(data["movie_ids"], data["counts"], data["means"], data["popularity"],
+                          data["genre_masks"], data["genres"].tolist(), float(data["global_mean"]),
+                          float(data["prior_weight"]), float(data["half_life_days"]),
+                          int(data["reference_time"]))
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    from data_clean import iter_ratings_chunks
+
+    parser = argparse.ArgumentParser(description="Build the per-movie rating statistics table.")
+    parser.add_argument("--ratings", default="data/ml-10M100K/ratings.dat", help="raw MovieLens ratings file")
+    parser.add_argument("--data-dir", default="data", help="directory holding cleaned_movies.csv")
+    parser.add_argument("--prior-weight", type=float, default=DEFAULT_PRIOR_WEIGHT)
+    parser.add_argument("--half-life-days", type=float, default=DEFAULT_HALF_LIFE_DAYS)
+    args = parser.parse_args()
+
+    movies_df = pd.read_csv(os.path.join(args.data_dir, "cleaned_movies.csv"))
+    stats = build_movie_stats(iter_ratings_chunks(args.ratings), movies_df, args.prior_weight, args.half_life_days)
+    save_movie_stats(stats, os.path.join(args.data_dir, "movie_stats.npz"))
+    print(f"Saved statistics of {len(stats)} movies ({int(stats.counts.sum())} ratings).")
@@ -0,0 +1,199 @@
+import numpy as np
+
+from similarity_store import atomic_write
+
+"""
+Sparse top-K neighbor index for a single similarity signal, stored in CSR form.
+Row i of the index holds the K most similar movies to movie i (excluding itself),
+so memory grows as N*K instead of the N*N of a dense similarity matrix.
+Attributes:
+- indices: int32 array, neighbor positions for every row laid out back to back
+- scores: float32 array, similarity score for each entry in indices
+- offsets: int64 array of length n_items + 1, row i spans offsets[i]:offsets[i + 1]
+- n_items: int, the number of movies (rows and columns) in the index
+"""
+
+class NeighborIndex:
+    def __init__(self, indices, scores, offsets, n_items):
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.scores = np.asarray(scores, dtype=np.float32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.n_items = int(n_items)
+        if self.offsets.shape != (self.n_items + 1,):
+            raise ValueError("Neighbor index offsets must have n_items + 1 entries.")
+        if self.indices.shape != self.scores.shape:
+            raise ValueError("Neighbor index indices and scores must have the same length.")
+
+    @property
+    def shape(self):
+        return (self.n_items, self.n_items)
+
+    def neighbors(self, movie_index):
+        # Return the stored neighbors of one movie, best first
+        start, stop = self.offsets[movie_index], self.offsets[movie_index + 1]
+        return self.indices[start:stop], self.scores[start:stop]
+
+    def rows(self, movie_indices):
+        # Expand the requested rows into dense score vectors; missing neighbors score 0
+        movie_indices = np.atleast_1d(np.asarray(movie_indices, dtype=np.int64))
+        out = np.zeros((len(movie_indices), self.n_items), dtype=np.float32)
+        starts = self.offsets[movie_indices]
+        lengths = self.offsets[movie_indices + 1] - starts
+        if lengths.sum() == 0:
+            return out
+        row_ids = np.repeat(np.arange(len(movie_indices)), lengths)
+        # Position of every gathered entry inside the flat indices/scores arrays
+        flat = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        flat += np.repeat(starts, lengths)
+        out[row_ids, self.indices[flat]] = self.scores[flat]
+        return out
+
+    def to_csr(self):
+        # The index already is CSR data, so the SciPy matrix shares its arrays
+        from scipy import sparse
+
+        return sparse.csr_matrix((self.scores, self.indices, self.offsets), shape=self.shape)
+
+"""
+Build a top-K neighbor index from a feature matrix using cosine similarity.
+Similarity is computed one block of rows at a time and each block is reduced to
+its top K before moving on, so the full N*N matrix is never materialized.
+Args:
+- features: a dense NumPy array or SciPy sparse matrix with one row per movie
+- k: int, the number of neighbors to keep per movie
+- block_size: optional int, the number of rows to score per block; derived from
+  memory_budget when not given
+- memory_budget: optional int, the bytes the build may use (default: 1 GiB)
+Returns: a NeighborIndex holding at most k positively scored neighbors per movie
+"""
+
+def build_neighbor_index(features, k, block_size=None, memory_budget=None):
+    from blocked_similarity import blocked_top_k, DEFAULT_MEMORY_BUDGET
+
+    return blocked_top_k(features, k, memory_budget=memory_budget or DEFAULT_MEMORY_BUDGET,
+                         block_rows=block_size)
+
+"""
+Reduce a dense block of similarity rows to the top K positive entries per row
+Args:
+- block: a 2D NumPy array, rows of a similarity matrix
+- k: int, the number of entries to keep per row
+- row_offset: int, the global row number of the first block row, used to drop self matches
+Returns: a tuple (indices, scores, lengths) with the kept entries of every row, best first
+"""
+
+def top_k_rows(block, k, row_offset=0):
+    block = np.array(block, dtype=np.float32)
+    n_rows, n_cols = block.shape
+    self_cols = np.arange(row_offset, row_offset + n_rows)
+    in_range = self_cols < n_cols
+    block[np.arange(n_rows)[in_range], self_cols[in_range]] = -np.inf
+
+    k = min(k, n_cols)
+    if k < n_cols:
+        candidates = np.argpartition(-block, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.tile(np.arange(n_cols), (n_rows, 1))
+    candidate_scores = np.take_along_axis(block, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    candidates = np.take_along_axis(candidates, order, axis=1)
+    candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+
+    # Zero-similarity pairs carry no signal, so they are not stored
+    keep = candidate_scores > 0
+    return (
+        candidates[keep].astype(np.int32),
+        candidate_scores[keep].astype(np.float32),
+        keep.sum(axis=1),
+    )
+
+"""
+Save a neighbor index to a single .npz file
+Args:
+- index: the NeighborIndex to save
+- file_path: string path of the output file
+- movie_ids: optional sequence of movieIds, the order of the index rows
+"""
+
+def save_neighbor_index(index, file_path, movie_ids=None):
+    arrays = {}
+    if movie_ids is not None:
+        arrays["movie_ids"] = np.asarray(movie_ids, dtype=np.int64)
+        if len(arrays["movie_ids"]) != index.n_items:
+            raise ValueError("Neighbor index rows must match the number of movie ids.")
+    with atomic_write(file_path) as path:
+        np.savez(
+            path,
+            indices=index.indices,
+            scores=index.scores,
+            offsets=index.offsets,
+            n_items=np.int64(index.n_items),
+            **arrays,
+        )
+
+"""
+Load a neighbor index previously written by save_neighbor_index
+Args:
+- file_path: string path to the .npz file
+- movie_ids: optional sequence of movieIds the index must be aligned with; indexes saved
+  without their movieIds can only be checked for their size
+Returns: the loaded NeighborIndex
+Raises: ValueError if the index is not aligned with movie_ids
+"""
+
+def load_neighbor_index(file_path, movie_ids=None):
+    with np.load(file_path) as data:
+        if movie_ids is not None:
+            movie_ids = np.asarray(movie_ids, dtype=np.int64)
+            aligned = (np.array_equal(data["movie_ids"], movie_ids) if "movie_ids" in data.files
+                       else int(data["n_items"]) == len(movie_ids))
+            if not aligned:
+                raise ValueError(f"Neighbor index '{file_path}' is not aligned with the movies dataset.")
+        return NeighborIndex(data["indices"], data["scores"], data["offsets"], int(data["n_items"]))
+
+"""
+Return a copy of a neighbor index with some rows replaced by new neighbor lists
+Args:
+- index: the NeighborIndex to update
+- rows: sequence of ints, the rows to replace
+- neighbor_lists: sequence of (indices, scores) tuples, one per row in rows
+Returns: a new NeighborIndex; rows not listed keep their existing neighbors
+"""
+
+def replace_neighbor_rows(index, rows, neighbor_lists):
+    lengths = np.array([len(indices) for indices, _ in neighbor_lists], dtype=np.int64)
+    indices = np.concatenate([np.asarray(indices, dtype=np.int32) for indices, _ in neighbor_lists] or
+                             [np.empty(0, dtype=np.int32)])
+    scores = np.concatenate([np.asarray(scores, dtype=np.float32) for _, scores in neighbor_lists] or
+                            [np.empty(0, dtype=np.float32)])
+    return replace_neighbor_block(index, rows, indices, scores, lengths)
+
+"""
+Return a copy of a neighbor index with some rows replaced by neighbor lists given back to back
+Args:
+- index: the NeighborIndex to update
+- rows: sequence of distinct ints, the rows to replace
+- indices, scores: 1D arrays, the new lists of every row in rows, concatenated in that order
+- lengths: 1D int array, the length of each new list
+Returns: a new NeighborIndex; rows not listed keep their existing neighbors
+"""
+
+def replace_neighbor_block(index, rows, indices, scores, lengths):
+    rows = np.asarray(rows, dtype=np.int64)
+    new_lengths = np.asarray(lengths, dtype=np.int64)
+    old_lengths = np.diff(index.offsets)
+    entry_rows = np.repeat(np.arange(index.n_items), old_lengths)
+    kept = ~np.isin(entry_rows, rows)
+
+    # A row's entries come either all from the old index or all from the new lists,
+    # so a stable sort by row keeps each row's neighbors in their best-first order
+    all_rows = np.concatenate([entry_rows[kept], np.repeat(rows, new_lengths)])
+    order = np.argsort(all_rows, kind="stable")
+    indices = np.concatenate([index.indices[kept], np.asarray(indices, dtype=np.int32)])[order]
+    scores = np.concatenate([index.scores[kept], np.asarray(scores, dtype=np.float32)])[order]
+
+    lengths = old_lengths.copy()
+    lengths[rows] = new_lengths
+    offsets = np.zeros(index.n_items + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return NeighborIndex(indices, scores, offsets, index.n_items)
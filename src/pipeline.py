@@ -0,0 +1,110 @@
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import instrumentation
+
+from blocked_similarity import DEFAULT_MEMORY_BUDGET
+from data_clean import clean_movies, clean_ratings, clean_tags, save_cleaned_data
+from data_preprocessing import SIGNALS, build_signal
+from movie_stats import build_movie_stats, save_movie_stats
+
+logger = logging.getLogger(__name__)
+
+"""
+Compute and save one similarity signal inside a worker process
+Args:
+- the arguments of data_preprocessing.build_signal
+- instrument: bool, whether to record instrumentation spans in the worker
+Returns: a tuple (name, output_path, seconds, spans), where spans holds the records of the
+spans the worker finished, for the parent to merge into its metrics
+"""
+
+def run_signal_stage(name, movies_df, tags_df, ratings_df, output_dir, top_k, dtype, ann_probe, memory_budget,
+                     ratings_factors=None, tag_hash_features=None, instrument=False):
+    instrumentation.enable(instrument)
+    with instrumentation.collect_spans() as spans:
+        start = time.perf_counter()
+        output_path = build_signal(name, movies_df, tags_df, ratings_df, output_dir=output_dir, top_k=top_k,
+                                   dtype=dtype, ann_probe=ann_probe, memory_budget=memory_budget,
+                                   ratings_factors=ratings_factors, tag_hash_features=tag_hash_features)
+        seconds = time.perf_counter() - start
+    return name, output_path, seconds, spans
+
+"""
+Run the full build in one process: clean the raw MovieLens files, save the cleaned CSVs and
+the per-movie statistics table, then build the genre, tag, and ratings similarity signals
+concurrently in a process pool.
+DataFrames are handed from stage to stage in memory instead of being written to CSV and
+parsed again, and each worker receives only the columns its signal needs.
+Args:
+- raw_dir: string path to the directory holding movies.dat, ratings.dat, and tags.dat
+- output_dir: string path to the directory the cleaned data and signals are written to
+- workers: int, the number of processes used for the similarity stage (default: 3)
+- top_k: optional int; keep only the top_k neighbors per movie (sparse index mode)
+- dtype: string, "float32" or "float16", the storage dtype of dense similarity artifacts
+- ann_probe: optional int; with top_k, build neighbor indexes approximately
+- memory_budget: int, the bytes the whole similarity stage may use; it is split evenly
+  between the concurrent workers (default: 1 GiB)
+- ratings_factors: optional int; save the ratings signal as ALS embeddings of this dimension
+- tag_hash_features: optional int; hash the tag words into this many columns
+Returns: a dict mapping each stage name to its wall time in seconds
+"""
+
+def run_pipeline(raw_dir="data/ml-10M100K", output_dir="data", workers=None, top_k=None,
+                 dtype="float32", ann_probe=None, memory_budget=DEFAULT_MEMORY_BUDGET, ratings_factors=None,
+                 tag_hash_features=None):
+    timings = {}
+    pipeline_start = time.perf_counter()
+
+    start = time.perf_counter()
+    logger.info("Cleaning raw data...")
+    movies_df = clean_movies(os.path.join(raw_dir, "movies.dat"))
+    ratings_df = clean_ratings(os.path.join(raw_dir, "ratings.dat"))
+    tags_df = clean_tags(os.path.join(raw_dir, "tags.dat"))
+    timings["clean"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    logger.info("Saving cleaned data...")
+    save_cleaned_data(movies_df, ratings_df, tags_df, output_dir)
+    timings["save_cleaned"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    logger.info("Computing movie statistics...")
+    save_movie_stats(build_movie_stats(ratings_df, movies_df), os.path.join(output_dir, "movie_stats.npz"))
+    timings["movie_stats"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    logger.info("Computing similarity signals in parallel...")
+    stage_inputs = {
+        "genre": (movies_df[["movieId", "genres"]], None, None),
+        "tag": (movies_df[["movieId"]], tags_df[["movieId", "tag"]], None),
+        "ratings": (movies_df[["movieId"]], None, ratings_df[["userId", "movieId", "rating"]]),
+    }
+    workers = workers or len(SIGNALS)
+    worker_budget = memory_budget // min(workers, len(SIGNALS))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(run_signal_stage, name, *stage_inputs[name], output_dir, top_k, dtype, ann_probe,
+                        worker_budget, ratings_factors, tag_hash_features, instrumentation.is_enabled())
+            for name in SIGNALS
+        ]
+        for future in futures:
+            name, output_path, seconds, spans = future.result()
+            instrumentation.merge_spans(spans)
+            timings[f"{name}_similarity"] = seconds
+            logger.info("Saved %s similarity to %s.", name, output_path)
+    timings["similarity"] = time.perf_counter() - start
+
+    timings["total"] = time.perf_counter() - pipeline_start
+    log_stage_report(timings)
+    return timings
+
+"""
+Log the wall time of every pipeline stage at INFO level
+Args: timings is a dict mapping stage names to seconds
+"""
+
+def log_stage_report(timings):
+    logger.info("Stage timings:\n%s", "\n".join(f"  {stage:<20} {seconds:8.2f}s" for stage, seconds in timings.items()))
@@ -1,60 +1,346 @@
 import pandas as pd
 import numpy as np
+import hashlib
+import os
+
+from genre_codebook import load_genre_codebook
+from instrumentation import span
+from latent_factors import load_factor_similarity
+from neighbor_index import load_neighbor_index
+from scoring import blend_rows, top_n_indices, top_n_rows
+from similarity_store import load_similarity_artifact
+from title_index import TitleIndex
+
+# The similarity signals saved by preprocessing, in blending order
+SIGNAL_NAMES = ("genre", "tag", "ratings")
+
+"""
+Raised when a queried title or movieId is not in the movies dataset
+It is a ValueError, so callers catching ValueError keep working; front ends use it to tell a
+missing movie apart from invalid options.
+"""
+
+class MovieNotFoundError(ValueError):
+    pass
+
+"""
+Load the genre, tag, and ratings similarity data saved by preprocessing
+Dense matrices are memory-mapped read-only, so processes on the same machine share one
+copy through the page cache. Each signal is loaded from the one format preprocessing last
+saved it in (a dense matrix, a top-K neighbor index, ALS factors, or a genre codebook);
+rebuilding a signal removes its files in the other formats.
+Args:
+- data_dir: a string path to the directory holding the preprocessed files
+- movie_ids: optional sequence of movieIds the artifacts must be aligned with
+Returns: a tuple (genre_similarity, tag_similarity, ratings_similarity)
+Raises: FileNotFoundError if no similarity data is available for a signal
+"""
+
+def load_similarity_data(data_dir="data", movie_ids=None):
+    signals = []
+    for name in SIGNAL_NAMES:
+        with span(f"load_similarity_data.{name}"):
+            signals.append(load_signal(name, data_dir, movie_ids))
+    return tuple(signals)
+
+"""
+List the files a similarity signal can be saved as, in the order load_signal looks for them
+A signal has exactly one of these formats on disk: preprocessing removes the others when it
+saves a signal, so the loader never picks up a stale one.
+Args: name is a string, one of "genre", "tag", or "ratings"
+Returns: a list of file names; a dense artifact's data file comes before its manifest
+"""
+
+def signal_files(name):
+    return [f"{name}_factors.npz", f"{name}_codebook.npz", f"{name}_similarity_matrix.npy",
+            f"{name}_similarity_matrix.json", f"{name}_neighbors.npz"]
+
+"""
+Load one similarity signal saved by preprocessing (see load_similarity_data)
+Args:
+- name: string, one of "genre", "tag", or "ratings"
+- data_dir: a string path to the directory holding the preprocessed files
+- movie_ids: optional sequence of movieIds the artifact must be aligned with
+Returns: a FactorSimilarity, a GenreCodebook, a memory-mapped NumPy array, or a NeighborIndex
+Raises: FileNotFoundError if no similarity data is available for the signal
+"""
+
+def load_signal(name, data_dir="data", movie_ids=None):
+    factors_path = os.path.join(data_dir, f"{name}_factors.npz")
+    if os.path.exists(factors_path):
+        # Only one format exists per signal; the checks run in signal_files order
+        return load_factor_similarity(factors_path, movie_ids=movie_ids)
+    codebook_path = os.path.join(data_dir, f"{name}_codebook.npz")
+    if os.path.exists(codebook_path):
+        return load_genre_codebook(codebook_path, movie_ids=movie_ids)
+    base_path = os.path.join(data_dir, f"{name}_similarity_matrix")
+    index_path = os.path.join(data_dir, f"{name}_neighbors.npz")
+    if os.path.exists(base_path + ".json"):
+        matrix, _ = load_similarity_artifact(base_path, mmap=True, movie_ids=movie_ids)
+        return matrix
+    if os.path.exists(base_path + ".npy"):
+        # Matrices saved before artifacts had manifests
+        return np.load(base_path + ".npy", mmap_mode="r")
+    if os.path.exists(index_path):
+        return load_neighbor_index(index_path, movie_ids=movie_ids)
+    raise FileNotFoundError(f"No {name} similarity data found in '{data_dir}'.")
+
+"""
+Resolve a movie title to its row position in the movies dataset
+Args:
+- movie_title: string, the title to look up
+- movies_df: DataFrame, the dataset containing movie information
+- title_index: optional TitleIndex over movies_df['title']; without it the titles are
+  scanned for the first substring match
+Returns: int, the row position of the matched movie
+Raises: MovieNotFoundError if no title matches
+"""
+
+def find_movie_index(movie_title, movies_df, title_index=None):
+    if title_index is not None:
+        movie_index = title_index.lookup(movie_title)
+    else:
+        matches = np.flatnonzero(
+            movies_df['title'].str.lower().str.strip().str.contains(
+                movie_title.lower().strip(), case=False, regex=False
+            ).to_numpy()
+        )
+        movie_index = int(matches[0]) if matches.size else None
+    if movie_index is None:
+        raise MovieNotFoundError(f"Movie title '{movie_title}' not found in dataset.")
+    return movie_index
+
+"""
+Apply the minimum-support filter and popularity re-ranking to similarity scores
+Both are vectorized over whole score rows using the precomputed statistics table.
+Args:
+- scores: a 1D or 2D float32 NumPy array of similarity scores over all movies
+- stats: MovieStats aligned with the scores' columns, or None when both options are off
+- min_ratings: int, movies with fewer ratings are scored -inf
+- popularity_weight: float; scores that meet similarity_threshold get this weight times
+  the movie's log-scaled popularity in [0, 1] added, the others become -inf
+- similarity_threshold: float, the threshold the scores are later selected with
+Returns: the adjusted scores (scores itself when no option is set)
+Raises: ValueError if min_ratings or popularity_weight is set without stats
+"""
+
+def apply_movie_stats(scores, stats, min_ratings, popularity_weight, similarity_threshold):
+    if not (min_ratings or popularity_weight):
+        return scores
+    if stats is None:
+        raise ValueError("min_ratings and popularity_weight need the movie statistics table.")
+    if min_ratings:
+        scores[..., ~stats.support_mask(min_ratings)] = -np.inf
+    if popularity_weight:
+        # Re-rank only the movies similar enough to be recommended at all
+        boosted = scores + np.float32(popularity_weight) * stats.popularity_scores
+        scores = np.where(scores >= similarity_threshold, boosted, np.float32(-np.inf))
+    return scores
+
+"""
+Summarize a candidate mask for result cache keys
+Args: candidate_mask is a boolean array over all movies, or None
+Returns: a short hex digest of the packed mask, or None without a mask
+"""
+
+def mask_digest(candidate_mask):
+    if candidate_mask is None:
+        return None
+    packed = np.packbits(np.asarray(candidate_mask, dtype=bool))
+    return hashlib.blake2b(packed.tobytes(), digest_size=16).hexdigest()
+
+"""
+Rank the movies most similar to one movie by blended similarity
+Args:
+- movie_index: int, the row position of the query movie
+- signals: sequence of the genre, tag, and ratings similarity signals
+- weights: sequence of the three signal weights
+- top_n: int, the number of movies to return
+- similarity_threshold: float, minimum blended similarity of a returned movie
+- stats: optional MovieStats; required by min_ratings and popularity_weight
+- min_ratings: int, movies with fewer ratings are never returned (default: 0)
+- popularity_weight: float; movies that clear the threshold are ranked by similarity plus
+  this weight times their log-scaled popularity in [0, 1] (default: 0.0)
+- candidate_mask: optional boolean array over all movies; only movies marked True are ranked
+Returns: a 1D NumPy array of up to top_n row positions, most similar first
+Raises: ValueError if min_ratings or popularity_weight is set without stats
+"""
+
+def rank_similar_movies(movie_index, signals, weights, top_n, similarity_threshold, stats=None, min_ratings=0,
+                        popularity_weight=0.0, candidate_mask=None):
+    with span("rank_similar_movies", rows=1):
+        # Compute the blended similarity score for the query movie's row only
+        similarity_scores = blend_rows([movie_index], signals, weights)[0]
+        similarity_scores[movie_index] = -np.inf  # Avoid recommending the input movie itself
+        if candidate_mask is not None:
+            # Filtered-out movies are dropped before selection, so the top N stays full
+            similarity_scores[~np.asarray(candidate_mask, dtype=bool)] = -np.inf
+
+        similarity_scores = apply_movie_stats(similarity_scores, stats, min_ratings, popularity_weight,
+                                              similarity_threshold)
+
+        # Keep the top N recommendations that meet the similarity threshold
+        return top_n_indices(similarity_scores, top_n, similarity_threshold)
 
 """
 Generate movie recommendations based on blended similarity metrics
 Args:
 - movie_title: string, the title of the movie to base recommendations on
 - movies_df: DataFrame, the dataset containing movie information
-- genre_similarity: NumPy array, the precomputed genre similarity matrix
-- tag_similarity: NumPy array, the precomputed tag similarity matrix
-- ratings_similarity: NumPy array, the precomputed ratings similarity matrix
+- genre_similarity: NumPy array or NeighborIndex, the precomputed genre similarity
+- tag_similarity: NumPy array or NeighborIndex, the precomputed tag similarity
+- ratings_similarity: NumPy array or NeighborIndex, the precomputed ratings similarity
 - genre_weight: float, weight for genre similarity in blended similarity (default: 0.5)
 - tag_weight: float, weight for tag similarity in blended similarity (default: 0.3)
 - ratings_weight: float, weight for ratings similarity in blended similarity (default: 0.2)
 - top_n: int, the number of recommendations to return (default: 10)
 - similarity_threshold: float, minimum similarity threshold for recommendations (default: 0.1)
+- title_index: optional TitleIndex built once from movies_df['title']; when given, the title
+  is resolved through the index (exact, prefix, substring, then typo-tolerant matches)
+  instead of scanning every title
+- cache: optional RecommendationCache filled from these similarity signals; weights are
+  rounded to its step and repeated queries are answered from memory
+- stats: optional MovieStats built for movies_df; required by the three options below
+- min_ratings: int, never recommend movies with fewer ratings (default: 0)
+- popularity_weight: float, weight of popularity when re-ranking similar movies (default: 0.0)
+- fallback: bool; when no movie clears the threshold, return the most popular movies
+  sharing a genre with the query instead of an empty DataFrame (default: False)
+- candidate_mask: optional boolean array over all movies, e.g. from
+  AttributeIndex.candidate_mask; only movies marked True are recommended
 Returns:
 - A DataFrame containing the recommended movies and their genres.
 Raises:
-- ValueError if the movie title is not found in the dataset.
+- ValueError if the movie title is not found in the dataset, or if a statistics option is
+  set without stats.
 """
 
 def recommend_movies(movie_title, movies_df, genre_similarity, tag_similarity, ratings_similarity,
-                     genre_weight=0.5, tag_weight=0.3, ratings_weight=0.2, top_n=10, similarity_threshold=0.1):
+                     genre_weight=0.5, tag_weight=0.3, ratings_weight=0.2, top_n=10, similarity_threshold=0.1,
+                     title_index=None, cache=None, stats=None, min_ratings=0, popularity_weight=0.0,
+                     fallback=False, candidate_mask=None):
+    if fallback and stats is None:
+        raise ValueError("The popular-in-genre fallback needs the movie statistics table.")
+
     # Locate the movie in the dataset
-    matching_movies = movies_df[
-        movies_df['title'].str.lower().str.strip().str.contains(
-            movie_title.lower().strip(), case=False, regex=False
-        )
-    ]
-    if matching_movies.empty:
-        raise ValueError(f"Movie title '{movie_title}' not found in dataset.")
-    movie_index = matching_movies.index[0]
-
-    # Compute the blended similarity score
-    blended_similarity = (
-        genre_weight * genre_similarity +
-        tag_weight * tag_similarity +
-        ratings_weight * ratings_similarity
-    )
-    similarity_scores = blended_similarity[movie_index]
-    similarity_scores[movie_index] = 0  # Avoid recommending the input movie itself
-
-    # Filter recommendations based on the similarity threshold
-    valid_indices = np.where(similarity_scores >= similarity_threshold)[0]
-
-    if valid_indices.size == 0:
+    with span("find_movie_index"):
+        movie_index = find_movie_index(movie_title, movies_df, title_index)
+
+    signals = (genre_similarity, tag_similarity, ratings_similarity)
+    weights = (genre_weight, tag_weight, ratings_weight)
+    ranking = {"stats": stats, "min_ratings": min_ratings, "popularity_weight": popularity_weight,
+               "candidate_mask": candidate_mask}
+    if cache is None:
+        similar_movie_indices = rank_similar_movies(movie_index, signals, weights, top_n, similarity_threshold,
+                                                    **ranking)
+    else:
+        key = cache.key(movie_index, weights, top_n, similarity_threshold,
+                        (min_ratings, popularity_weight, mask_digest(candidate_mask)))
+        similar_movie_indices = cache.get_or_compute(key, lambda: rank_similar_movies(
+            movie_index, signals, key[1], top_n, similarity_threshold, **ranking
+        ))
+
+    if similar_movie_indices.size == 0 and fallback:
+        with span("popular_in_genre"):
+            similar_movie_indices = stats.popular_in_genre(movie_index, top_n, min_ratings, candidate_mask)
+
+    if similar_movie_indices.size == 0:
         # Return an empty DataFrame if no recommendations meet the threshold
         return pd.DataFrame(columns=["title", "genres"])
 
-    # Sort recommendations by similarity score and return the top N
-    similar_movie_indices = similarity_scores.argsort()[::-1][:top_n]
     recommendations = movies_df.iloc[similar_movie_indices][['title', 'genres']]
 
     return recommendations
 
 
+"""
+Resolve a batch of movieIds and/or titles to row positions in the movies dataset
+Args:
+- movies: sequence of movieIds (ints) or titles (strings)
+- movies_df: DataFrame, the dataset containing movie information
+- title_index: optional TitleIndex used to resolve titles
+Returns: a 1D int64 NumPy array of row positions
+Raises: MovieNotFoundError if a movieId or title is not found
+"""
+
+def find_movie_indices(movies, movies_df, title_index=None):
+    movies = list(movies)
+    positions = np.empty(len(movies), dtype=np.int64)
+    is_title = np.array([isinstance(movie, str) for movie in movies], dtype=bool)
+
+    # Ids are resolved with a single vectorized hash lookup, titles one by one
+    ids = [movie for movie, title in zip(movies, is_title) if not title]
+    id_positions = pd.Index(movies_df["movieId"]).get_indexer(ids)
+    if (id_positions < 0).any():
+        missing = ids[int(np.flatnonzero(id_positions < 0)[0])]
+        raise MovieNotFoundError(f"Movie id '{missing}' not found in dataset.")
+    positions[~is_title] = id_positions
+    for i in np.flatnonzero(is_title):
+        positions[i] = find_movie_index(movies[i], movies_df, title_index)
+    return positions
+
+"""
+Generate recommendations for many movies at once
+The query rows are blended and ranked as one matrix per batch, so scoring the whole
+catalog costs a handful of vectorized passes instead of one Python call per movie.
+Args:
+- movies: sequence of movieIds (ints) or titles (strings) to base recommendations on
+- movies_df: DataFrame, the dataset containing movie information
+- genre_similarity, tag_similarity, ratings_similarity: the precomputed similarity signals
+- genre_weight, tag_weight, ratings_weight: float weights, or arrays holding one weight per
+  query movie (defaults: 0.5, 0.3, 0.2)
+- top_n: int, the number of recommendations per movie (default: 10)
+- similarity_threshold: float, minimum similarity threshold for recommendations (default: 0.1)
+- title_index: optional TitleIndex used to resolve titles
+- batch_size: int, the number of query rows scored together, which bounds memory (default: 512)
+- stats, min_ratings, popularity_weight: the statistics options of recommend_movies
+- candidate_mask: optional boolean array over all movies applied to every query
+Returns:
+- A DataFrame with columns query_movieId, rank, movieId, title, genres, and score, holding
+  up to top_n rows per query movie.
+Raises:
+- ValueError if a movieId or title is not found in the dataset, or if a statistics option
+  is set without stats.
+"""
+
+def recommend_movies_batch(movies, movies_df, genre_similarity, tag_similarity, ratings_similarity,
+                           genre_weight=0.5, tag_weight=0.3, ratings_weight=0.2, top_n=10,
+                           similarity_threshold=0.1, title_index=None, batch_size=512, stats=None, min_ratings=0,
+                           popularity_weight=0.0, candidate_mask=None):
+    positions = find_movie_indices(movies, movies_df, title_index)
+    signals = (genre_similarity, tag_similarity, ratings_similarity)
+    weights = [np.broadcast_to(np.asarray(weight, dtype=np.float32), positions.shape)
+               for weight in (genre_weight, tag_weight, ratings_weight)]
+    movie_ids = movies_df["movieId"].to_numpy()
+
+    frames = []
+    for start in range(0, len(positions), batch_size):
+        batch = positions[start:start + batch_size]
+        batch_weights = [weight[start:start + batch_size] for weight in weights]
+        # Skip signals whose weight is zero for the whole batch
+        batch_weights = [weight if weight.any() else 0.0 for weight in batch_weights]
+        with span("recommend_movies_batch.score", rows=len(batch)):
+            scores = blend_rows(batch, signals, batch_weights)
+            scores[np.arange(len(batch)), batch] = -np.inf  # Never recommend the query movie itself
+            if candidate_mask is not None:
+                scores[:, ~np.asarray(candidate_mask, dtype=bool)] = -np.inf
+            scores = apply_movie_stats(scores, stats, min_ratings, popularity_weight, similarity_threshold)
+            recommended, recommended_scores = top_n_rows(scores, top_n, similarity_threshold)
+
+        query_rows, ranks = np.nonzero(recommended >= 0)
+        recommended_positions = recommended[query_rows, ranks]
+        frames.append(pd.DataFrame({
+            "query_movieId": movie_ids[batch[query_rows]],
+            "rank": ranks + 1,
+            "movieId": movie_ids[recommended_positions],
+            "title": movies_df["title"].to_numpy()[recommended_positions],
+            "genres": movies_df["genres"].to_numpy()[recommended_positions],
+            "score": recommended_scores[query_rows, ranks],
+        }))
+
+    if not frames:
+        return pd.DataFrame(columns=["query_movieId", "rank", "movieId", "title", "genres", "score"])
+    return pd.concat(frames, ignore_index=True)
+
 """
 Load the necessary data and prompt the user for input to generate recommendations.
 """
@@ -63,9 +349,10 @@ if __name__ == "__main__":
     try:
         # Load cleaned movies and precomputed similarity matrices
         movies_df = pd.read_csv("data/cleaned_movies.csv")
-        genre_similarity = np.load("data/genre_similarity_matrix.npy")
-        tag_similarity = np.load("data/tag_similarity_matrix.npy")
-        ratings_similarity = np.load("data/ratings_similarity_matrix.npy")
+        genre_similarity, tag_similarity, ratings_similarity = load_similarity_data(
+            "data", movie_ids=movies_df["movieId"]
+        )
+        title_index = TitleIndex(movies_df["title"])
     except FileNotFoundError as e:
         print(f"Error: Required data file not found. Please run preprocessing first. ({e})")
         exit(1)
@@ -85,7 +372,8 @@ if __name__ == "__main__":
                 movies_df,
                 genre_similarity,
                 tag_similarity,
-                ratings_similarity
+                ratings_similarity,
+                title_index=title_index
             )
             if recommendations.empty:
                 print(f"No similar movies found for '{user_input}'. Try another title.")
@@ -0,0 +1,132 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Default number of results a cache holds and the weight step of the app's sliders
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_WEIGHT_STEP = 0.1
+
+"""
+Round similarity weights to a fixed step so near-identical weights share one cache entry
+Args:
+- weights: sequence of floats
+- step: float, the rounding step (a step of 0 leaves the weights unchanged)
+Returns: a tuple of rounded floats
+"""
+
+def quantize_weights(weights, step=DEFAULT_WEIGHT_STEP):
+    if not step:
+        return tuple(float(weight) for weight in weights)
+    # The second round removes float noise such as 0.30000000000000004
+    return tuple(round(round(float(weight) / step) * step, 10) for weight in weights)
+
+"""
+Bounded, thread-safe LRU cache of recommendation results
+Results are keyed on the resolved movie position, the quantized weights, top_n, and the
+similarity threshold, and hold the ranked row positions of the recommended movies.
+The cache must be cleared whenever the similarity data it was filled from is reloaded;
+every clear starts a new generation, and results computed for an older generation (e.g. by a
+request still running when the data was swapped) are no longer stored.
+Args:
+- max_entries: int, the number of results kept before the least recently used is evicted
+  (default: 1024)
+- weight_step: float, the step weights are rounded to (default: 0.1, the slider step)
+"""
+
+class RecommendationCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, weight_step=DEFAULT_WEIGHT_STEP):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self.max_entries = max_entries
+        self.weight_step = weight_step
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, movie_index, weights, top_n, similarity_threshold, options=()):
+        # options holds any further ranking options (e.g. popularity filters) as a tuple
+        return (int(movie_index), quantize_weights(weights, self.weight_step), int(top_n),
+                float(similarity_threshold), tuple(options))
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result, generation=None):
+        # Results are shared between callers, so store them read-only; a result computed for
+        # an older generation is returned to its caller but not stored
+        result = np.array(result, copy=True)
+        result.setflags(write=False)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return result
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def get_or_compute(self, key, compute, generation=None):
+        # compute runs outside the lock; concurrent misses on one key may both compute it
+        result = self.get(key)
+        if result is None:
+            result = self.put(key, compute(), generation)
+        return result
+
+    def clear(self):
+        # Drop every result and start a new generation; returns the new generation
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            return self.generation
+
+    def for_generation(self, generation):
+        # A view of this cache for requests served from data of the given generation
+        return CacheGeneration(self, generation)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+"""
+View of a RecommendationCache bound to one generation of the model data, passed to
+recommend_movies in place of the cache. Its keys carry the generation, so results of
+different data never share an entry, and results are only stored while the generation is
+still the cache's current one.
+Args:
+- cache: the RecommendationCache
+- generation: int, the generation of the data the request is served from
+"""
+
+class CacheGeneration:
+    def __init__(self, cache, generation):
+        self.cache = cache
+        self.generation = generation
+
+    def key(self, *args, **kwargs):
+        return self.cache.key(*args, **kwargs) + (self.generation,)
+
+    def get_or_compute(self, key, compute):
+        return self.cache.get_or_compute(key, compute, self.generation)
@@ -0,0 +1,88 @@
+import numpy as np
+
+"""
+Read rows of a similarity signal as dense float32 score vectors
+Args:
+- similarity: a dense NumPy similarity matrix (or memory map), or any signal object
+  exposing rows(movie_indices) such as a NeighborIndex
+- movie_indices: sequence of ints, the rows to read
+Returns: a 2D float32 NumPy array with one row per requested movie
+"""
+
+def similarity_rows(similarity, movie_indices):
+    movie_indices = np.atleast_1d(np.asarray(movie_indices, dtype=np.int64))
+    if hasattr(similarity, "rows"):
+        return np.asarray(similarity.rows(movie_indices), dtype=np.float32)
+    # Fancy indexing copies only the requested rows, never the full matrix
+    return np.asarray(similarity[movie_indices], dtype=np.float32)
+
+"""
+Blend the rows of several similarity signals with the given weights
+Only the requested rows are read, so the cost is O(len(movie_indices) * N).
+Args:
+- movie_indices: sequence of ints, the query rows
+- signals: sequence of similarity signals accepted by similarity_rows
+- weights: sequence with one weight per signal; each weight is a float or an array
+  holding one weight per query row
+Returns: a 2D float32 NumPy array of blended scores, one row per query
+"""
+
+def blend_rows(movie_indices, signals, weights):
+    movie_indices = np.atleast_1d(np.asarray(movie_indices, dtype=np.int64))
+    n_items = signals[0].shape[1]
+    blended = np.zeros((len(movie_indices), n_items), dtype=np.float32)
+    for similarity, weight in zip(signals, weights):
+        weight = np.asarray(weight, dtype=np.float32)
+        if weight.ndim == 0:
+            if weight == 0:
+                # A zero-weighted signal does not need to be read at all
+                continue
+        else:
+            weight = weight.reshape(-1, 1)
+        blended += weight * similarity_rows(similarity, movie_indices)
+    return blended
+
+"""
+Select the positions of the top N scores in descending order using partial selection
+Args:
+- scores: a 1D NumPy array of scores
+- top_n: int, the maximum number of positions to return
+- threshold: float, only scores greater than or equal to this value are returned
+Returns: a 1D NumPy array of positions, best score first
+"""
+
+def top_n_indices(scores, top_n, threshold=-np.inf):
+    if top_n <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.flatnonzero(scores >= threshold)
+    if candidates.size > top_n:
+        # argpartition finds the top N in O(N); only those N get sorted
+        partition = np.argpartition(-scores[candidates], top_n - 1)[:top_n]
+        candidates = np.sort(candidates[partition])
+    order = np.argsort(-scores[candidates], kind="stable")
+    return candidates[order]
+
+"""
+Select the top N positions of every row of a score matrix using partial selection
+Args:
+- scores: a 2D NumPy array with one row of scores per query
+- top_n: int, the number of positions to return per row
+- threshold: float, positions scoring below this value are replaced by -1
+Returns: a tuple (positions, top_scores) of 2D arrays shaped (rows, top_n), best first
+"""
+
+def top_n_rows(scores, top_n, threshold=-np.inf):
+    n_rows, n_cols = scores.shape
+    top_n = max(min(top_n, n_cols), 0)
+    if top_n == 0:
+        positions = np.empty((n_rows, 0), dtype=np.int64)
+    elif top_n < n_cols:
+        positions = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+    else:
+        positions = np.broadcast_to(np.arange(n_cols), (n_rows, n_cols))
+    top_scores = np.take_along_axis(scores, positions, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    positions = np.take_along_axis(positions, order, axis=1).astype(np.int64)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+    positions[~(top_scores >= threshold)] = -1
+    return positions, top_scores
@@ -0,0 +1,204 @@
+import multiprocessing
+import os
+import socket
+from flask import Flask, jsonify, request
+
+from model import load_model
+from recommender import MovieNotFoundError, find_movie_indices
+
+# Weight and ranking options accepted by the recommendation endpoints
+FLOAT_OPTIONS = ("genre_weight", "tag_weight", "ratings_weight", "similarity_threshold", "popularity_weight")
+INT_OPTIONS = ("top_n", "min_ratings", "year_from", "year_to")
+
+"""
+Read the recommendation options present in a request
+Args: values is a mapping of request parameters (query string or JSON body)
+Returns: a dict of keyword arguments for recommend_movies
+Raises: ValueError if an option is not a number or genres is not a list of strings
+"""
+
+def parse_options(values):
+    options = {}
+    for name in FLOAT_OPTIONS:
+        if values.get(name) is not None:
+            options[name] = float(values[name])
+    for name in INT_OPTIONS:
+        if values.get(name) is not None:
+            options[name] = int(values[name])
+    # Genre filters are a comma-separated string or a JSON list
+    genres = values.get("genres")
+    if isinstance(genres, str):
+        options["genres"] = [genre for genre in genres.split(",") if genre]
+    elif isinstance(genres, list) and all(isinstance(genre, str) for genre in genres):
+        options["genres"] = genres
+    elif genres is not None:
+        raise ValueError("'genres' must be a comma-separated string or a list of strings")
+    return options
+
+"""
+Check that a batch item is a movieId or a title
+Args: movie is one item of the batch request's movies list
+Returns: bool
+"""
+
+def is_movie_reference(movie):
+    return isinstance(movie, str) or (isinstance(movie, int) and not isinstance(movie, bool))
+
+"""
+Convert a recommendations DataFrame into JSON-ready records
+Args: recommendations is a DataFrame with at least movieId, title, and genres columns
+Returns: a list of dicts
+"""
+
+def to_records(recommendations):
+    records = []
+    for row in recommendations.to_dict(orient="records"):
+        record = {"movieId": int(row["movieId"]), "title": row["title"], "genres": row["genres"]}
+        if "score" in row:
+            record["score"] = float(row["score"])
+        records.append(record)
+    return records
+
+"""
+Create the Flask application serving recommendations from a loaded model
+Endpoints:
+- GET /health: liveness check with the catalog size
+- GET /stats: result cache counters of the worker process answering the request, with its
+  pid; each forked worker has its own cache, so they are not totals across workers
+- GET /recommend?title=...: recommendations for one title; accepts the weight options, the
+  filters genres=Comedy,Drama, year_from, year_to, and min_ratings, and fallback=1 for
+  popular movies of the same genres when nothing is similar enough
+- POST /recommend/batch: JSON body {"movies": [...ids or titles...], ...options}
+Args: model is a RecommenderModel shared by every request
+Returns: a Flask application
+"""
+
+def create_app(model):
+    app = Flask(__name__)
+
+    @app.get("/health")
+    def health():
+        return jsonify({"status": "ok", "movies": len(model)})
+
+    @app.get("/stats")
+    def stats():
+        return jsonify({"worker": os.getpid(), "cache": model.cache.stats()})
+
+    @app.get("/recommend")
+    def recommend():
+        title = request.args.get("title", "").strip()
+        if not title:
+            return jsonify({"error": "Query parameter 'title' is required."}), 400
+        try:
+            options = parse_options(request.args)
+            if request.args.get("fallback") is not None:
+                options["fallback"] = request.args["fallback"].lower() in ("1", "true", "yes")
+        except ValueError as e:
+            return jsonify({"error": f"Invalid option: {e}"}), 400
+        snapshot = model.snapshot  # One catalog for the whole request, even across a reload
+        try:
+            recommendations = snapshot.recommend(title, cache=model.cache, **options)
+        except MovieNotFoundError as e:
+            return jsonify({"error": str(e)}), 404
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        recommendations = recommendations.assign(movieId=snapshot.movies_df.loc[recommendations.index, "movieId"])
+        return jsonify({"title": title, "recommendations": to_records(recommendations)})
+
+    @app.post("/recommend/batch")
+    def recommend_batch():
+        body = request.get_json(silent=True) or {}
+        movies = body.get("movies")
+        if not isinstance(movies, list) or not movies:
+            return jsonify({"error": "JSON field 'movies' must be a non-empty list."}), 400
+        if not all(is_movie_reference(movie) for movie in movies):
+            return jsonify({"error": "JSON field 'movies' must hold movieIds (ints) or titles (strings)."}), 400
+        try:
+            options = parse_options(body)
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": f"Invalid option: {e}"}), 400
+        snapshot = model.snapshot
+        try:
+            positions = find_movie_indices(movies, snapshot.movies_df, snapshot.title_index)
+        except MovieNotFoundError as e:
+            return jsonify({"error": str(e)}), 404
+
+        # Titles are resolved once above; the batch itself is scored from movieIds
+        query_ids = snapshot.movies_df["movieId"].to_numpy()[positions].tolist()
+        try:
+            recommendations = snapshot.recommend_batch(query_ids, **options)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        grouped = {movie_id: rows for movie_id, rows in recommendations.groupby("query_movieId", sort=False)}
+        results = [
+            {"query": movie, "movieId": int(movie_id),
+             "recommendations": to_records(grouped[movie_id]) if movie_id in grouped else []}
+            for movie, movie_id in zip(movies, query_ids)
+        ]
+        return jsonify({"results": results})
+
+    return app
+
+"""
+Serve one worker process on an already-listening socket
+Args:
+- app: the Flask application
+- fd: int, the file descriptor of the listening socket inherited from the parent
+"""
+
+def serve_worker(app, fd):
+    from werkzeug.serving import make_server
+
+    make_server("0.0.0.0", 0, app, threaded=True, fd=fd).serve_forever()
+
+"""
+Load the model once and serve it from several worker processes
+The model is loaded in the parent before the workers are forked, so its arrays are
+shared copy-on-write and the memory-mapped signals are shared through the page cache;
+all workers accept connections from one listening socket.
+Args:
+- data_dir: string path to the directory holding the preprocessed files
+- host: string, the interface to bind
+- port: int, the port to listen on
+- workers: int, the number of worker processes
+"""
+
+def serve(data_dir="data", host="127.0.0.1", port=8000, workers=4):
+    model = load_model(data_dir)
+    model.warm_up()
+    app = create_app(model)
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(128)
+    listener.set_inheritable(True)
+
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=serve_worker, args=(app, listener.fileno())) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    print(f"Serving recommendations on http://{host}:{port} with {workers} workers.")
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+    finally:
+        listener.close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve movie recommendations over HTTP.")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    try:
+        serve(args.data_dir, args.host, args.port, args.workers)
+    except FileNotFoundError as e:
+        print(f"Error: Required data file not found. Please run preprocessing first. ({e})")
+        exit(1)
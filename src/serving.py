@@ -0,0 +1,196 @@
+import json
+import os
+import threading
+import numpy as np
+
+from genre_codebook import GenreCodebook
+from neighbor_index import NeighborIndex
+from scoring import blend_rows, top_n_indices
+from title_index import TitleIndex, normalize_title
+
+# Serving depends on NumPy only: pandas, SciPy, and scikit-learn stay in the build path
+
+# File describing a serving bundle and the layout version this module reads
+BUNDLE_MANIFEST = "bundle.json"
+BUNDLE_FORMAT = 1
+# The similarity signals of a bundle, in blending order
+SIGNAL_NAMES = ("genre", "tag", "ratings")
+
+"""
+Strings stored as one UTF-8 byte blob plus offsets, decoded only when read
+Attributes:
+- blob: uint8 array, the concatenated UTF-8 bytes
+- offsets: int64 array of length n + 1, string i spans offsets[i]:offsets[i + 1]
+"""
+
+class StringTable:
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position):
+        return self.blob[self.offsets[position]:self.offsets[position + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        return (self[position] for position in range(len(self)))
+
+"""
+Cosine similarity of normalized movie embeddings (the ALS factor signal)
+Attributes: normalized is a float32 array with one unit-length embedding per movie
+"""
+
+class EmbeddingSimilarity:
+    def __init__(self, normalized):
+        self.normalized = normalized
+
+    @property
+    def shape(self):
+        return (len(self.normalized), len(self.normalized))
+
+    def rows(self, movie_indices):
+        return np.asarray(self.normalized[np.atleast_1d(movie_indices)]) @ self.normalized.T
+
+"""
+Minimal recommendation runtime over a serving bundle.
+Titles are resolved through the bundle's sorted normalized titles: exact and prefix
+queries are binary searches, and the full typo-tolerant TitleIndex is only built the first
+time a query needs it.
+Args:
+- movie_ids: int array, the movieId of every movie
+- titles, genres: StringTable (or sequence) of titles and "|"-joined genres
+- signals: the genre, tag, and ratings similarity signals
+- title_keys: sorted UTF-8 bytes array of the normalized titles
+- title_order: int array, the movie position of every entry of title_keys
+"""
+
+class ServingModel:
+    def __init__(self, movie_ids, titles, genres, signals, title_keys, title_order):
+        self.movie_ids = movie_ids
+        self.titles = titles
+        self.genres = genres
+        self.signals = tuple(signals)
+        self.title_keys = title_keys
+        self.title_order = title_order
+        self._title_index = None
+        self._title_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.movie_ids)
+
+    def find_movie_index(self, movie_title):
+        # Resolve a title to a movie position: exact, then shortest prefix, then fuzzy match.
+        # An empty query matches nothing, as in TitleIndex.lookup, instead of prefixing every title.
+        key = normalize_title(movie_title).encode("utf-8")
+        if not key:
+            raise ValueError(f"Movie title '{movie_title}' not found in dataset.")
+        start = np.searchsorted(self.title_keys, key, side="left")
+        stop = np.searchsorted(self.title_keys, key + b"\xff", side="left")
+        if stop > start:
+            matches = self.title_keys[start:stop]
+            # Shortest title first, then catalog order, as TitleIndex ranks prefix matches
+            best = np.lexsort((self.title_order[start:stop], np.char.str_len(matches)))[0]
+            return int(self.title_order[start + best])
+        movie_index = self.title_index().lookup(movie_title)
+        if movie_index is None:
+            raise ValueError(f"Movie title '{movie_title}' not found in dataset.")
+        return movie_index
+
+    def title_index(self):
+        # Build the full title index on the first query that needs substring or fuzzy matching
+        with self._title_lock:
+            if self._title_index is None:
+                self._title_index = TitleIndex(self.titles)
+            return self._title_index
+
+    def rank(self, movie_index, weights=(0.5, 0.3, 0.2), top_n=10, similarity_threshold=0.1):
+        # Blend the query movie's rows and return (positions, scores) of its top N
+        scores = blend_rows([movie_index], self.signals, weights)[0]
+        scores[movie_index] = -np.inf  # Never recommend the query movie itself
+        positions = top_n_indices(scores, top_n, similarity_threshold)
+        return positions, scores[positions]
+
+    def recommend(self, movie_title, genre_weight=0.5, tag_weight=0.3, ratings_weight=0.2, top_n=10,
+                  similarity_threshold=0.1):
+        # The recommend_movies equivalent, returning plain dicts instead of a DataFrame
+        movie_index = self.find_movie_index(movie_title)
+        positions, scores = self.rank(movie_index, (genre_weight, tag_weight, ratings_weight), top_n,
+                                      similarity_threshold)
+        return [
+            {"movieId": int(self.movie_ids[position]), "title": self.titles[position],
+             "genres": self.genres[position], "score": float(score)}
+            for position, score in zip(positions, scores)
+        ]
+
+"""
+Load one signal of a serving bundle, memory-mapping its arrays
+Args:
+- bundle_dir: string path to the bundle directory
+- name: string, the signal name
+- spec: dict, the signal's entry in the bundle manifest
+Returns: a similarity signal accepted by scoring.blend_rows
+Raises: ValueError for an unknown signal kind
+"""
+
+def load_bundle_signal(bundle_dir, name, spec):
+    def array(suffix):
+        return np.load(os.path.join(bundle_dir, f"{name}_{suffix}.npy"), mmap_mode="r")
+
+    kind = spec["kind"]
+    if kind == "dense":
+        return array("similarity")
+    if kind == "neighbors":
+        return NeighborIndex(array("indices"), array("scores"), array("offsets"), spec["n_items"])
+    if kind == "codebook":
+        return GenreCodebook(array("combo_ids"), array("table"), array("masks"), spec["genres"])
+    if kind == "factors":
+        return EmbeddingSimilarity(array("normalized"))
+    raise ValueError(f"Unknown signal kind '{kind}' in serving bundle.")
+
+"""
+Load a serving bundle written by serving_bundle.build_serving_bundle
+Every array is memory-mapped, so startup costs a few file opens whatever the catalog size.
+Args: bundle_dir is a string path to the bundle directory
+Returns: a ServingModel
+Raises: FileNotFoundError if the bundle is missing, ValueError if its format is unsupported
+"""
+
+def load_bundle(bundle_dir):
+    with open(os.path.join(bundle_dir, BUNDLE_MANIFEST)) as file:
+        manifest = json.load(file)
+    if manifest.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"Unsupported serving bundle format {manifest.get('format')!r}.")
+
+    def array(name):
+        return np.load(os.path.join(bundle_dir, f"{name}.npy"), mmap_mode="r")
+
+    signals = [load_bundle_signal(bundle_dir, name, manifest["signals"][name]) for name in SIGNAL_NAMES]
+    return ServingModel(
+        array("movie_ids"),
+        StringTable(array("titles_blob"), array("titles_offsets")),
+        StringTable(array("genres_blob"), array("genres_offsets")),
+        signals,
+        array("title_keys"),
+        array("title_order"),
+    )
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Answer recommendations from a serving bundle.")
+    parser.add_argument("title", help="the movie title to base recommendations on")
+    parser.add_argument("--bundle-dir", default="data/serving_bundle")
+    parser.add_argument("--top-n", type=int, default=10)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    model = load_bundle(args.bundle_dir)
+    loaded = time.perf_counter()
+    recommendations = model.recommend(args.title, top_n=args.top_n)
+    answered = time.perf_counter()
+    for recommendation in recommendations:
+        print(f"{recommendation['score']:.3f}  {recommendation['title']}  ({recommendation['genres']})")
+    print(f"Loaded in {(loaded - start) * 1000:.1f} ms, first query in {(answered - loaded) * 1000:.1f} ms.")
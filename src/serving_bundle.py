@@ -0,0 +1,144 @@
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+from genre_codebook import GenreCodebook, parse_genres
+from latent_factors import FactorSimilarity
+from neighbor_index import NeighborIndex
+from recommender import load_similarity_data
+from serving import BUNDLE_FORMAT, BUNDLE_MANIFEST, SIGNAL_NAMES
+from similarity_store import atomic_write
+from title_index import normalize_title
+
+"""
+Encode strings as one UTF-8 byte blob plus offsets (the layout of serving.StringTable)
+Args: values is a sequence of strings
+Returns: a tuple (blob, offsets) of a uint8 array and an int64 array of length n + 1
+"""
+
+def encode_strings(values):
+    encoded = [str(value).encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+"""
+Sort the normalized titles of a catalog for binary-search lookups
+Args: titles is a sequence of title strings
+Returns: a tuple (title_keys, title_order) of a sorted UTF-8 bytes array and the movie
+position of every key
+"""
+
+def sorted_title_keys(titles):
+    keys = np.array([normalize_title(title).encode("utf-8") for title in titles], dtype=bytes)
+    order = np.argsort(keys, kind="stable")
+    return keys[order], order.astype(np.int64)
+
+"""
+Save an array as a .npy file that atomically replaces any previous version
+Args:
+- file_path: string path of the .npy file
+- array: the NumPy array to save
+"""
+
+def save_array(file_path, array):
+    with atomic_write(file_path) as path:
+        np.save(path, array)
+
+"""
+Write one similarity signal into a serving bundle
+Dense matrices already on disk are hard-linked (copied across file systems) rather than
+rewritten. This is safe because artifacts are never rewritten in place: a rebuild replaces
+the artifact's file with a new inode, and the bundle keeps the one it was built from. The
+other signals are split into one plain .npy file per array. Every bundle file is replaced
+atomically, so a process serving the previous bundle keeps consistent data.
+Args:
+- bundle_dir: string path to the bundle directory
+- name: string, the signal name
+- similarity: a dense matrix (or memory map), NeighborIndex, GenreCodebook, or FactorSimilarity
+Returns: the dict describing the signal in the bundle manifest
+Raises: TypeError for a signal type the serving runtime cannot load
+"""
+
+def write_bundle_signal(bundle_dir, name, similarity):
+    def save(suffix, array):
+        save_array(os.path.join(bundle_dir, f"{name}_{suffix}.npy"), np.ascontiguousarray(array))
+
+    if isinstance(similarity, GenreCodebook):
+        save("combo_ids", similarity.combo_ids)
+        save("table", similarity.table)
+        save("masks", similarity.masks)
+        return {"kind": "codebook", "genres": similarity.genres}
+    if isinstance(similarity, FactorSimilarity):
+        save("normalized", similarity.normalized.astype(np.float32, copy=False))
+        return {"kind": "factors"}
+    if isinstance(similarity, NeighborIndex):
+        save("indices", similarity.indices)
+        save("scores", similarity.scores)
+        save("offsets", similarity.offsets)
+        return {"kind": "neighbors", "n_items": similarity.n_items}
+    if isinstance(similarity, np.ndarray):
+        source = getattr(similarity, "filename", None)
+        if isinstance(similarity, np.memmap) and source and similarity.shape[0] == similarity.shape[1]:
+            with atomic_write(os.path.join(bundle_dir, f"{name}_similarity.npy")) as path:
+                try:
+                    os.link(source, path)
+                except OSError:
+                    shutil.copyfile(source, path)
+        else:
+            save("similarity", similarity)
+        return {"kind": "dense"}
+    raise TypeError(f"Cannot bundle a similarity signal of type {type(similarity).__name__}.")
+
+"""
+Build the serving bundle of a preprocessed data directory: everything serving.load_bundle
+needs to answer recommendations as memory-mappable .npy files, so a serving process starts
+without pandas, SciPy, or scikit-learn and without parsing any CSV.
+Args:
+- data_dir: string path to the directory holding the cleaned movies and similarity data
+- bundle_dir: string path of the bundle directory (default: data_dir/serving_bundle)
+Returns: the bundle directory path
+"""
+
+def build_serving_bundle(data_dir="data", bundle_dir=None):
+    bundle_dir = bundle_dir or os.path.join(data_dir, "serving_bundle")
+    os.makedirs(bundle_dir, exist_ok=True)
+    movies_df = pd.read_csv(os.path.join(data_dir, "cleaned_movies.csv"))
+    movie_ids = movies_df["movieId"].to_numpy(dtype=np.int64)
+    signals = load_similarity_data(data_dir, movie_ids=movie_ids)
+
+    def save(name, array):
+        save_array(os.path.join(bundle_dir, f"{name}.npy"), array)
+
+    save("movie_ids", movie_ids)
+    # Genres are stored "|"-joined, whatever form the cleaned CSV holds them in
+    columns = {"titles": movies_df["title"].fillna("").astype(str),
+               "genres": ["|".join(parse_genres(genres)) for genres in movies_df["genres"]]}
+    for name, values in columns.items():
+        blob, offsets = encode_strings(values)
+        save(f"{name}_blob", blob)
+        save(f"{name}_offsets", offsets)
+    title_keys, title_order = sorted_title_keys(movies_df["title"].astype(str))
+    save("title_keys", title_keys)
+    save("title_order", title_order)
+
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "n_movies": len(movie_ids),
+        "signals": {name: write_bundle_signal(bundle_dir, name, signal) for name, signal in zip(SIGNAL_NAMES, signals)},
+    }
+    # The manifest is written last, so a bundle without one is incomplete
+    with atomic_write(os.path.join(bundle_dir, BUNDLE_MANIFEST)) as path, open(path, "w") as file:
+        json.dump(manifest, file, indent=2)
+    return bundle_dir
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the serving bundle of a preprocessed data directory.")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--bundle-dir", default=None)
+    args = parser.parse_args()
+    print(f"Serving bundle written to {build_serving_bundle(args.data_dir, args.bundle_dir)}")
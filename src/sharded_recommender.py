@@ -0,0 +1,299 @@
+import multiprocessing
+import threading
+import numpy as np
+import pandas as pd
+
+from genre_codebook import GenreCodebook
+from instrumentation import span
+from latent_factors import FactorSimilarity
+from recommender import find_movie_index, find_movie_indices, load_similarity_data
+from scoring import blend_rows, top_n_rows
+from title_index import TitleIndex
+
+"""
+Split the columns of a catalog into contiguous shard ranges of near-equal size
+Args:
+- n_items: int, the number of movies
+- n_shards: int, the number of shards
+Returns: a list of (start, stop) column ranges covering 0..n_items
+"""
+
+def shard_ranges(n_items, n_shards):
+    if n_shards < 1:
+        raise ValueError("A sharded catalog needs at least one shard.")
+    boundaries = np.linspace(0, n_items, min(n_shards, max(n_items, 1)) + 1).round().astype(np.int64)
+    return list(zip(boundaries[:-1].tolist(), boundaries[1:].tolist()))
+
+"""
+Columns of a sparse similarity signal (e.g. a NeighborIndex) kept as a CSR matrix
+Attributes: matrix is a SciPy CSR matrix, every movie as a row and the shard's movies as columns
+"""
+
+class SparseColumns:
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    def rows(self, movie_indices):
+        return self.matrix[np.atleast_1d(movie_indices)].toarray().astype(np.float32, copy=False)
+
+"""
+Columns of a genre codebook: the combination of every movie, the small combination table,
+and the combinations of the shard's movies
+"""
+
+class CodebookColumns:
+    def __init__(self, combo_ids, table, column_combo_ids):
+        self.combo_ids = combo_ids
+        self.table = table
+        self.column_combo_ids = column_combo_ids
+
+    @property
+    def shape(self):
+        return (len(self.combo_ids), len(self.column_combo_ids))
+
+    def rows(self, movie_indices):
+        return self.table[self.combo_ids[np.atleast_1d(movie_indices)]][:, self.column_combo_ids]
+
+"""
+Columns of a factor signal: the normalized embeddings of every movie (the queries) and of
+the shard's movies (the candidates)
+"""
+
+class FactorColumns:
+    def __init__(self, query_vectors, column_vectors):
+        self.query_vectors = query_vectors
+        self.column_vectors = column_vectors
+
+    @property
+    def shape(self):
+        return (len(self.query_vectors), len(self.column_vectors))
+
+    def rows(self, movie_indices):
+        return self.query_vectors[np.atleast_1d(movie_indices)] @ self.column_vectors.T
+
+"""
+Cut the columns start:stop out of a similarity signal
+A shard can then score any query movie against its own candidates only: a dense signal
+keeps N x (stop - start) values, a neighbor index the entries pointing into the range, and
+codebook and factor signals their small per-movie codes or embeddings.
+Args:
+- similarity: a dense matrix (or memory map), NeighborIndex, GenreCodebook, or FactorSimilarity
+- start, stop: ints, the column range of the shard
+Returns: a signal of shape (N, stop - start) accepted by scoring.similarity_rows
+Raises: TypeError for a signal type that cannot be split by columns
+"""
+
+def column_shard(similarity, start, stop):
+    if isinstance(similarity, GenreCodebook):
+        return CodebookColumns(similarity.combo_ids, similarity.table, similarity.combo_ids[start:stop])
+    if isinstance(similarity, FactorSimilarity):
+        return FactorColumns(similarity.normalized, similarity.normalized[start:stop].copy())
+    if hasattr(similarity, "to_csr"):
+        return SparseColumns(similarity.to_csr()[:, start:stop].tocsr())
+    if isinstance(similarity, np.ndarray):
+        return np.ascontiguousarray(similarity[:, start:stop], dtype=np.float32)
+    raise TypeError(f"Cannot shard a similarity signal of type {type(similarity).__name__}.")
+
+"""
+Serve one shard inside a worker process until the coordinator closes the connection
+Each request is (movie_indices, weights, top_n, similarity_threshold, candidate_mask) with
+the mask cut to the shard's columns (or None); the reply is the shard's local top N as
+global (positions, scores), or the exception the request raised.
+Args:
+- connection: the worker end of a multiprocessing Pipe
+- start, stop: ints, the column range of the shard
+- signals: the shard's column signals, or None to load them from data_dir
+- data_dir: optional string path the worker loads and cuts its own columns from, so the
+  full similarity data never passes through the coordinator
+- movie_ids: optional sequence of movieIds the loaded artifacts must be aligned with
+"""
+
+def serve_shard(connection, start, stop, signals=None, data_dir=None, movie_ids=None):
+    try:
+        if signals is None:
+            signals = [column_shard(signal, start, stop)
+                       for signal in load_similarity_data(data_dir, movie_ids=movie_ids)]
+        connection.send(("ready", None))
+    except Exception as e:
+        connection.send(("error", e))
+        return
+
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        try:
+            movie_indices, weights, top_n, similarity_threshold, candidate_mask = request
+            with span("shard.score", rows=len(movie_indices)):
+                scores = blend_rows(movie_indices, signals, weights)
+                # Never recommend a query movie itself when it lives in this shard
+                own = (movie_indices >= start) & (movie_indices < stop)
+                scores[np.flatnonzero(own), movie_indices[own] - start] = -np.inf
+                if candidate_mask is not None:
+                    scores[:, ~candidate_mask] = -np.inf
+                positions, top_scores = top_n_rows(scores, top_n, similarity_threshold)
+            connection.send(("ok", (np.where(positions >= 0, positions + start, -1), top_scores)))
+        except Exception as e:
+            connection.send(("error", e))
+
+"""
+Merge the local top N of every shard into the global top N
+Args:
+- shard_results: list of (positions, scores) tuples, one per shard, with one row per query
+- top_n: int, the number of movies to keep per query
+Returns: a tuple (positions, scores) of 2D arrays; missing entries have position -1
+"""
+
+def merge_shard_results(shard_results, top_n):
+    positions = np.concatenate([positions for positions, _ in shard_results], axis=1)
+    scores = np.concatenate([scores for _, scores in shard_results], axis=1).astype(np.float32)
+    scores[positions < 0] = -np.inf
+    order, top_scores = top_n_rows(scores, top_n, -np.inf)
+    merged = np.take_along_axis(positions, np.maximum(order, 0), axis=1)
+    merged[(order < 0) | ~np.isfinite(top_scores)] = -1
+    return merged, top_scores
+
+"""
+Recommendation coordinator over a catalog split into column shards, each held by its own
+worker process.
+A query is scattered to every shard, each shard blends and ranks the query row against its
+own movies only, and the coordinator merges the shards' local top N. Workers are local
+processes here, standing in for separate nodes: the coordinator keeps only the movies table
+and title index, so capacity grows by adding shards.
+Args:
+- movies_df: DataFrame, the dataset containing movie information
+- genre_similarity, tag_similarity, ratings_similarity: the similarity signals to split, or
+  None with data_dir to have every worker load its own columns
+- n_shards: int, the number of worker processes (default: 2)
+- title_index: optional TitleIndex; built from movies_df when not given
+- data_dir: optional string path to the preprocessed files the workers load from
+"""
+
+class ShardedRecommender:
+    def __init__(self, movies_df, genre_similarity=None, tag_similarity=None, ratings_similarity=None,
+                 n_shards=2, title_index=None, data_dir=None):
+        signals = (genre_similarity, tag_similarity, ratings_similarity)
+        if data_dir is None and any(signal is None for signal in signals):
+            raise ValueError("Pass the three similarity signals or the data_dir to load them from.")
+        self.movies_df = movies_df
+        self.title_index = title_index or TitleIndex(movies_df["title"])
+        self.ranges = shard_ranges(len(movies_df), n_shards)
+        self.workers = []
+        self.connections = []
+        self._lock = threading.Lock()  # One scatter-gather round on the pipes at a time
+
+        context = multiprocessing.get_context()
+        try:
+            for start, stop in self.ranges:
+                parent_end, worker_end = context.Pipe()
+                if data_dir is None:
+                    # Each worker receives only its own columns
+                    shard_signals = [column_shard(signal, start, stop) for signal in signals]
+                    args = (worker_end, start, stop, shard_signals)
+                else:
+                    args = (worker_end, start, stop, None, data_dir, movies_df["movieId"].to_numpy())
+                worker = context.Process(target=serve_shard, args=args, daemon=True)
+                worker.start()
+                worker_end.close()
+                self.workers.append(worker)
+                self.connections.append(parent_end)
+            for connection in self.connections:
+                self._receive(connection)
+        except BaseException:
+            self.close()
+            raise
+
+    def __len__(self):
+        return len(self.movies_df)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _receive(self, connection):
+        # Unwrap one worker reply, re-raising the exception a worker hit
+        status, payload = connection.recv()
+        if status == "error":
+            raise payload
+        return payload
+
+    def _gather(self):
+        # Read the reply of every shard before raising the first error, so no reply is left
+        # in a pipe for the next round to read
+        replies = [connection.recv() for connection in self.connections]
+        for status, payload in replies:
+            if status == "error":
+                raise payload
+        return [payload for _, payload in replies]
+
+    def rank(self, movie_indices, weights=(0.5, 0.3, 0.2), top_n=10, similarity_threshold=0.1,
+             candidate_mask=None):
+        # Scatter the queries (and each shard's slice of the candidate mask) to every shard
+        # and merge their local top N
+        movie_indices = np.atleast_1d(np.asarray(movie_indices, dtype=np.int64))
+        weights = tuple(float(weight) for weight in weights)
+        # Requests are checked here, before any shard sees them
+        if ((movie_indices < 0) | (movie_indices >= len(self))).any():
+            raise IndexError(f"Movie positions must lie in [0, {len(self)}).")
+        if candidate_mask is not None:
+            candidate_mask = np.asarray(candidate_mask, dtype=bool)
+            if candidate_mask.shape != (len(self),):
+                raise ValueError(f"candidate_mask must hold one entry per movie ({len(self)}).")
+        with self._lock, span("sharded.rank", rows=len(movie_indices)):
+            for (start, stop), connection in zip(self.ranges, self.connections):
+                shard_mask = None if candidate_mask is None else candidate_mask[start:stop]
+                connection.send((movie_indices, weights, top_n, similarity_threshold, shard_mask))
+            return merge_shard_results(self._gather(), top_n)
+
+    def recommend(self, movie_title, genre_weight=0.5, tag_weight=0.3, ratings_weight=0.2, top_n=10,
+                  similarity_threshold=0.1, candidate_mask=None):
+        # The sharded equivalent of recommend_movies
+        movie_index = find_movie_index(movie_title, self.movies_df, self.title_index)
+        positions, _ = self.rank([movie_index], (genre_weight, tag_weight, ratings_weight), top_n,
+                                 similarity_threshold, candidate_mask)
+        positions = positions[0][positions[0] >= 0]
+        if positions.size == 0:
+            return pd.DataFrame(columns=["title", "genres"])
+        return self.movies_df.iloc[positions][["title", "genres"]]
+
+    def recommend_batch(self, movies, genre_weight=0.5, tag_weight=0.3, ratings_weight=0.2, top_n=10,
+                        similarity_threshold=0.1, candidate_mask=None):
+        # The sharded equivalent of recommend_movies_batch
+        batch = find_movie_indices(movies, self.movies_df, self.title_index)
+        positions, scores = self.rank(batch, (genre_weight, tag_weight, ratings_weight), top_n,
+                                      similarity_threshold, candidate_mask)
+        query_rows, ranks = np.nonzero(positions >= 0)
+        recommended_positions = positions[query_rows, ranks]
+        movie_ids = self.movies_df["movieId"].to_numpy()
+        return pd.DataFrame({
+            "query_movieId": movie_ids[batch[query_rows]],
+            "rank": ranks + 1,
+            "movieId": movie_ids[recommended_positions],
+            "title": self.movies_df["title"].to_numpy()[recommended_positions],
+            "genres": self.movies_df["genres"].to_numpy()[recommended_positions],
+            "score": scores[query_rows, ranks],
+        })
+
+    def close(self):
+        # Stop every worker; safe to call more than once
+        for connection in self.connections:
+            try:
+                connection.send(None)
+            except (OSError, ValueError):
+                pass
+            connection.close()
+        for worker in self.workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        self.connections = []
+        self.workers = []
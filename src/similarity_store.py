@@ -0,0 +1,148 @@
+import json
+import os
+from contextlib import contextmanager
+import numpy as np
+
+# Bump when the on-disk layout of similarity artifacts changes
+ARTIFACT_VERSION = 1
+SUPPORTED_DTYPES = ("float32", "float16")
+
+"""
+Path a file is written to before it replaces its final path
+The extension is kept, so NumPy does not append another one.
+Args: file_path is the string path of the final file
+Returns: a string path in the same directory, unique to this process
+"""
+
+def temporary_path(file_path):
+    root, extension = os.path.splitext(file_path)
+    return f"{root}.tmp-{os.getpid()}{extension}"
+
+"""
+Write a file under a temporary name and move it over its final path in one atomic rename
+Rebuilding never touches the file that is already there: readers, and processes that have
+it memory-mapped, keep the complete previous version until the rename, and then still hold
+the old inode. The temporary file is removed if the write fails.
+Args: file_path is the string path of the final file
+Yields: the temporary string path to write to
+"""
+
+@contextmanager
+def atomic_write(file_path):
+    path = temporary_path(file_path)
+    try:
+        yield path
+        os.replace(path, file_path)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+"""
+Create the data file of a similarity artifact and return it as a writable memory map
+Rows can then be written block by block without holding the matrix in memory. The data is
+written to a temporary file; write_manifest moves it into place once all rows are written,
+so an existing artifact stays intact while it is rebuilt.
+Args:
+- base_path: string path without extension; base_path.npy is written by write_manifest
+- shape: tuple (rows, columns) of the matrix
+- dtype: string, "float32" or "float16" (default: "float32")
+Returns: a writable np.memmap of the given shape and dtype
+"""
+
+def create_similarity_artifact(base_path, shape, dtype="float32"):
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"Unsupported artifact dtype '{dtype}'. Use one of {SUPPORTED_DTYPES}.")
+    return np.lib.format.open_memmap(temporary_path(base_path + ".npy"), mode="w+", dtype=dtype,
+                                     shape=tuple(shape))
+
+"""
+Write the JSON manifest of a similarity artifact, first moving the data file written through
+create_similarity_artifact into place; both are replaced atomically
+Args:
+- base_path: string path without extension; writes base_path.json
+- shape: tuple (rows, columns) of the matrix
+- dtype: string, the dtype of the data file
+- movie_ids: sequence of movieIds, the order of the matrix rows and columns
+- params: optional dict of build parameters
+Returns: the manifest dict that was written
+"""
+
+def write_manifest(base_path, shape, dtype, movie_ids, params=None):
+    movie_ids = [int(movie_id) for movie_id in movie_ids]
+    if shape[0] != len(movie_ids):
+        raise ValueError("Similarity matrix rows must match the number of movie ids.")
+    manifest = {
+        "version": ARTIFACT_VERSION,
+        "data_file": os.path.basename(base_path + ".npy"),
+        "shape": list(shape),
+        "dtype": dtype,
+        "movie_ids": movie_ids,
+        "params": params or {},
+    }
+    data_path = temporary_path(base_path + ".npy")
+    if os.path.exists(data_path):
+        os.replace(data_path, base_path + ".npy")
+    with atomic_write(base_path + ".json") as path, open(path, "w") as f:
+        json.dump(manifest, f)
+    return manifest
+
+"""
+Save a dense similarity matrix as a compact artifact: a raw .npy data file plus a JSON
+manifest describing its shape, dtype, movieId order, and build parameters.
+The matrix is converted to the target dtype one block of rows at a time, so saving does
+not need a second full-size copy in memory.
+Args:
+- base_path: string path without extension; writes base_path.npy and base_path.json
+- matrix: a 2D NumPy array holding the similarity scores
+- movie_ids: sequence of movieIds, the order of the matrix rows and columns
+- dtype: string, "float32" or "float16" (default: "float32")
+- params: optional dict of build parameters recorded in the manifest
+- block_rows: int, the number of rows converted and written per block
+Returns: the manifest dict that was written
+"""
+
+def save_similarity_artifact(base_path, matrix, movie_ids, dtype="float32", params=None, block_rows=4096):
+    if matrix.ndim != 2 or matrix.shape[0] != len(movie_ids):
+        raise ValueError("Similarity matrix rows must match the number of movie ids.")
+
+    out = create_similarity_artifact(base_path, matrix.shape, dtype)
+    for start in range(0, matrix.shape[0], block_rows):
+        out[start:start + block_rows] = matrix[start:start + block_rows]
+    out.flush()
+    del out
+    return write_manifest(base_path, matrix.shape, dtype, movie_ids, params)
+
+"""
+Read the JSON manifest of a similarity artifact
+Args: base_path is a string path without extension
+Returns: the manifest dict
+Raises: FileNotFoundError if the manifest does not exist
+"""
+
+def read_manifest(base_path):
+    with open(base_path + ".json") as f:
+        return json.load(f)
+
+"""
+Open a similarity artifact, memory-mapped read-only by default so every process on the
+machine shares the same page-cache pages instead of loading its own copy.
+Args:
+- base_path: string path without extension
+- mmap: bool, memory-map the data file instead of reading it into the heap (default: True)
+- movie_ids: optional sequence of movieIds the artifact must be aligned with
+Returns: a tuple (matrix, manifest)
+Raises: ValueError if the data file does not match its manifest or the expected movie order
+"""
+
+def load_similarity_artifact(base_path, mmap=True, movie_ids=None):
+    manifest = read_manifest(base_path)
+    if manifest.get("version") != ARTIFACT_VERSION:
+        raise ValueError(f"Unsupported similarity artifact version {manifest.get('version')}.")
+
+    data_path = os.path.join(os.path.dirname(base_path), manifest["data_file"])
+    matrix = np.load(data_path, mmap_mode="r" if mmap else None)
+    if list(matrix.shape) != manifest["shape"] or str(matrix.dtype) != manifest["dtype"]:
+        raise ValueError(f"Similarity data '{data_path}' does not match its manifest.")
+    if movie_ids is not None and [int(movie_id) for movie_id in movie_ids] != manifest["movie_ids"]:
+        raise ValueError(f"Similarity artifact '{base_path}' is not aligned with the movies dataset.")
+    return matrix, manifest
@@ -0,0 +1,162 @@
+import pandas as pd
+import numpy as np
+import os
+
+from data_clean import FIELD_SEPARATOR
+
+# The 18 MovieLens genres plus the placeholder used for movies without one
+GENRES = [
+    "Action", "Adventure", "Animation", "Children", "Comedy", "Crime", "Documentary", "Drama", "Fantasy",
+    "Film-Noir", "Horror", "Musical", "Mystery", "Romance", "Sci-Fi", "Thriller", "War", "Western",
+    "(no genres listed)",
+]
+TITLE_WORDS = [
+    "Night", "Story", "Return", "Last", "City", "Love", "Dark", "Star", "King", "Lost", "Blue", "House",
+    "River", "Dream", "War", "Secret", "Road", "Golden", "Wild", "Island", "Ghost", "Summer", "Iron", "Time",
+]
+RATING_VALUES = np.arange(0.5, 5.5, 0.5, dtype=np.float32)
+RATING_WEIGHTS = np.array([1, 2, 2, 5, 8, 14, 20, 24, 12, 12], dtype=np.float64)
+TIMESTAMP_RANGE = (789652009, 1231131736)  # The span of the MovieLens 10M ratings
+CHUNK_ROWS = 1_000_000
+
+"""
+Zipf-like popularity weights so a few movies, users, and tags account for most records,
+as in the real MovieLens data
+Args:
+- n: int, the number of items
+- rng: NumPy Generator used to shuffle which items are popular
+- exponent: float, the skew of the distribution (default: 1.0)
+Returns: a float64 NumPy array of n probabilities summing to 1
+"""
+
+def popularity_weights(n, rng, exponent=1.0):
+    weights = 1 / np.arange(10, n + 10, dtype=np.float64) ** exponent
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+"""
+Generate a MovieLens-shaped movies table
+Args:
+- n_movies: int, the number of movies
+- rng: NumPy Generator
+Returns: a DataFrame with movieId, title ("Words (year)"), and "|" joined genres columns;
+movieIds are increasing but not contiguous, like MovieLens ids
+"""
+
+def generate_movies(n_movies, rng):
+    movie_ids = np.cumsum(rng.integers(1, 4, n_movies)).astype(np.int32)
+    years = rng.integers(1915, 2009, n_movies)
+    words = rng.choice(TITLE_WORDS, size=(n_movies, 2))
+    titles = [f"{first} {second} {movie_id} ({year})"
+              for (first, second), movie_id, year in zip(words, movie_ids, years)]
+
+    # 1-3 genres per movie, skewed toward Drama and Comedy like the real catalog
+    genre_weights = np.array([8, 5, 2, 3, 12, 5, 2, 16, 3, 1, 4, 2, 3, 6, 3, 7, 2, 1, 0.2])
+    genre_weights /= genre_weights.sum()
+    counts = rng.choice([1, 2, 3], size=n_movies, p=[0.45, 0.35, 0.2])
+    genres = ["|".join(sorted(rng.choice(GENRES, size=count, replace=False, p=genre_weights)))
+              for count in counts]
+    return pd.DataFrame({"movieId": movie_ids, "title": titles, "genres": genres})
+
+"""
+Generate MovieLens-shaped ratings in chunks, with popular movies and heavy users rated most
+Args:
+- n_ratings: int, the total number of ratings
+- n_users: int, the number of users
+- movie_ids: NumPy array of the movieIds that can be rated
+- rng: NumPy Generator
+- chunk_rows: int, the number of ratings per chunk (default: 1,000,000)
+Yields: DataFrames with userId, movieId, rating, and timestamp columns; a (user, movie)
+pair may occasionally repeat
+"""
+
+def iter_ratings(n_ratings, n_users, movie_ids, rng, chunk_rows=CHUNK_ROWS):
+    movie_p = popularity_weights(len(movie_ids), rng)
+    user_p = popularity_weights(n_users, rng, exponent=0.5)
+    rating_p = RATING_WEIGHTS / RATING_WEIGHTS.sum()
+    for start in range(0, n_ratings, chunk_rows):
+        size = min(chunk_rows, n_ratings - start)
+        yield pd.DataFrame({
+            "userId": (rng.choice(n_users, size=size, p=user_p) + 1).astype(np.int32),
+            "movieId": movie_ids[rng.choice(len(movie_ids), size=size, p=movie_p)],
+            "rating": rng.choice(RATING_VALUES, size=size, p=rating_p),
+            "timestamp": rng.integers(*TIMESTAMP_RANGE, size=size, dtype=np.int64),
+        })
+
+"""
+Generate MovieLens-shaped free-text tags drawn from a skewed vocabulary
+Args:
+- n_tags: int, the number of tag applications
+- n_users: int, the number of users
+- movie_ids: NumPy array of the movieIds that can be tagged
+- rng: NumPy Generator
+- vocabulary_size: int, the number of distinct tags (default: 2000)
+Returns: a DataFrame with userId, movieId, tag, and timestamp columns
+"""
+
+def generate_tags(n_tags, n_users, movie_ids, rng, vocabulary_size=2000):
+    vocabulary = np.array([f"{TITLE_WORDS[i % len(TITLE_WORDS)].lower()} tag{i}" for i in range(vocabulary_size)])
+    return pd.DataFrame({
+        "userId": rng.integers(1, n_users + 1, size=n_tags, dtype=np.int32),
+        "movieId": movie_ids[rng.choice(len(movie_ids), size=n_tags, p=popularity_weights(len(movie_ids), rng))],
+        "tag": vocabulary[rng.choice(vocabulary_size, size=n_tags, p=popularity_weights(vocabulary_size, rng))],
+        "timestamp": rng.integers(*TIMESTAMP_RANGE, size=n_tags, dtype=np.int64),
+    })
+
+"""
+Append DataFrame rows to a "::" delimited MovieLens .dat file
+Args:
+- df: DataFrame whose columns are written in order
+- file: an open text file
+"""
+
+def write_dat_rows(df, file):
+    text = df.to_csv(sep=FIELD_SEPARATOR, header=False, index=False, lineterminator="\n")
+    file.write(text.replace(FIELD_SEPARATOR, "::"))
+
+"""
+Write a synthetic MovieLens dataset (movies.dat, ratings.dat, tags.dat) to a directory
+Ratings are generated and written one chunk at a time, so tens of millions of ratings
+never have to be held in memory at once.
+Args:
+- output_dir: string path to the directory the .dat files are written to
+- n_movies: int, the number of movies (default: 1000)
+- n_ratings: int, the number of ratings (default: 100,000)
+- n_tags: int, the number of tag applications (default: n_ratings / 10)
+- n_users: int, the number of users (default: about one per 140 ratings, as in MovieLens)
+- seed: int, the random seed, so runs at one scale are reproducible (default: 0)
+Returns: a dict mapping "movies", "ratings", and "tags" to the written file paths
+"""
+
+def generate_dataset(output_dir, n_movies=1000, n_ratings=100_000, n_tags=None, n_users=None, seed=0):
+    rng = np.random.default_rng(seed)
+    n_tags = n_ratings // 10 if n_tags is None else n_tags
+    n_users = n_users or max(1, n_ratings // 140)
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {name: os.path.join(output_dir, f"{name}.dat") for name in ("movies", "ratings", "tags")}
+
+    movies = generate_movies(n_movies, rng)
+    movie_ids = movies["movieId"].to_numpy()
+    with open(paths["movies"], "w", encoding="utf-8") as file:
+        write_dat_rows(movies, file)
+    with open(paths["ratings"], "w", encoding="utf-8") as file:
+        for chunk in iter_ratings(n_ratings, n_users, movie_ids, rng):
+            write_dat_rows(chunk, file)
+    with open(paths["tags"], "w", encoding="utf-8") as file:
+        write_dat_rows(generate_tags(n_tags, n_users, movie_ids, rng), file)
+    return paths
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic MovieLens-shaped dataset.")
+    parser.add_argument("output_dir", help="directory the movies/ratings/tags .dat files are written to")
+    parser.add_argument("--movies", type=int, default=1000)
+    parser.add_argument("--ratings", type=int, default=100_000)
+    parser.add_argument("--tags", type=int, default=None)
+    parser.add_argument("--users", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = generate_dataset(args.output_dir, args.movies, args.ratings, args.tags, args.users, args.seed)
+    print(f"Wrote {', '.join(paths.values())}.")
@@ -0,0 +1,130 @@
+import re
+from collections import defaultdict
+import numpy as np
+
+# Ranking tiers of a title match; fuzzy matches score below 1.0
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+SUBSTRING_SCORE = 1.0
+# Trigrams found in more titles than this (such as " (1" and "(19" of the year suffix) are
+# stop-grams: they count toward the overlap of candidates but never generate them
+STOP_GRAM_POSTINGS = 1000
+
+_WHITESPACE = re.compile(r"\s+")
+
+"""
+Normalize a movie title for lookup: lowercase, trimmed, and with runs of whitespace collapsed
+Args: title is the raw title string
+Returns: the normalized title string
+"""
+
+def normalize_title(title):
+    return _WHITESPACE.sub(" ", str(title).lower()).strip()
+
+"""
+Split a normalized title into its set of character trigrams
+Args: text is a normalized title string
+Returns: a set of 3-character strings (empty for strings shorter than 3 characters)
+"""
+
+def title_trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+"""
+Search index over movie titles, built once when the movies are loaded.
+It combines an exact normalized-title hash lookup with a trigram inverted index that
+answers prefix, substring, and typo-tolerant queries by merging a few posting lists
+instead of scanning every title.
+Args:
+- titles: sequence of title strings, in the row order of the movies dataset
+- stop_gram_postings: int, the posting list length above which a trigram is a stop-gram
+"""
+
+class TitleIndex:
+    def __init__(self, titles, stop_gram_postings=STOP_GRAM_POSTINGS):
+        self.stop_gram_postings = stop_gram_postings
+        self.titles = [str(title) for title in titles]
+        self.normalized = [normalize_title(title) for title in self.titles]
+        self.lengths = np.array([len(title) for title in self.normalized], dtype=np.int32)
+
+        self.exact = {}
+        short_prefixes = defaultdict(list)
+        postings = defaultdict(list)
+        for position, title in enumerate(self.normalized):
+            self.exact.setdefault(title, []).append(position)
+            for size in (1, 2):
+                if len(title) >= size:
+                    short_prefixes[title[:size]].append(position)
+            for gram in title_trigrams(title):
+                postings[gram].append(position)
+
+        # Posting lists are sorted int32 arrays so candidates can be merged with NumPy
+        self.short_prefixes = {key: np.array(value, dtype=np.int32) for key, value in short_prefixes.items()}
+        self.postings = {gram: np.array(value, dtype=np.int32) for gram, value in postings.items()}
+
+    def __len__(self):
+        return len(self.titles)
+
+    def search(self, query, limit=10, min_similarity=0.5):
+        # Rank matching titles as (position, score) tuples, best first: exact matches,
+        # then titles starting with the query, then titles containing it, then fuzzy
+        # matches sharing at least min_similarity of the query's trigrams
+        query = normalize_title(query)
+        if not query or limit <= 0:
+            return []
+
+        if len(query) < 3:
+            candidates = self.short_prefixes.get(query[:2], np.empty(0, dtype=np.int32))
+            candidates = [position for position in candidates if self.normalized[position].startswith(query)]
+            scores = [EXACT_SCORE if self.normalized[position] == query else PREFIX_SCORE
+                      for position in candidates]
+            return self._rank(candidates, scores, limit)
+
+        grams = title_trigrams(query)
+        lists = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not lists:
+            return []
+        # Candidates come from the selective grams only, so a query never merges the near
+        # catalog-wide lists of stop-grams; those are counted per candidate by binary search.
+        # Exact, prefix, and substring matches hold every query gram, so none is lost.
+        selective = [postings for postings in lists if len(postings) <= self.stop_gram_postings]
+        common = [postings for postings in lists if len(postings) > self.stop_gram_postings]
+        if not selective:
+            selective, common = lists, []
+        candidates, shared = np.unique(np.concatenate(selective), return_counts=True)
+        for postings in common:
+            found = np.minimum(np.searchsorted(postings, candidates), len(postings) - 1)
+            shared += postings[found] == candidates
+        overlap = shared / len(grams)
+        keep = overlap >= min_similarity
+        candidates, overlap = candidates[keep], overlap[keep]
+
+        scores = []
+        for position, similarity in zip(candidates, overlap):
+            title = self.normalized[position]
+            if title == query:
+                scores.append(EXACT_SCORE)
+            elif title.startswith(query):
+                scores.append(PREFIX_SCORE)
+            elif similarity == 1.0 and query in title:
+                scores.append(SUBSTRING_SCORE)
+            else:
+                scores.append(min(similarity, 0.99))
+        return self._rank(candidates, scores, limit)
+
+    def lookup(self, query):
+        # Resolve a query to the position of the best matching title, or None
+        positions = self.exact.get(normalize_title(query))
+        if positions:
+            return positions[0]
+        matches = self.search(query, limit=1)
+        return int(matches[0][0]) if matches else None
+
+    def _rank(self, candidates, scores, limit):
+        candidates = np.asarray(candidates, dtype=np.int64)
+        if candidates.size == 0:
+            return []
+        scores = np.asarray(scores, dtype=np.float64)
+        # Sort by score, then shorter title, then catalog order
+        order = np.lexsort((candidates, self.lengths[candidates], -scores))[:limit]
+        return [(int(candidates[i]), float(scores[i])) for i in order]
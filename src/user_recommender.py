@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from data_preprocessing import build_ratings_matrix
+from instrumentation import span
+from scoring import similarity_rows, top_n_rows
+
+# Candidates must score above zero, i.e. be similar to at least one rated movie
+MIN_USER_SCORE = np.finfo(np.float32).tiny
+
+"""
+Rating histories of every user as a sparse user x movie matrix
+Attributes:
+- user_ids: int array, the userId of every row
+- ratings: SciPy CSR matrix, users as rows and movies (in movies dataset order) as columns
+"""
+
+class UserHistory:
+    def __init__(self, user_ids, ratings):
+        self.user_ids = np.asarray(user_ids)
+        self.ratings = sparse.csr_matrix(ratings, dtype=np.float32)
+        self.user_index = pd.Index(self.user_ids)
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def positions(self, user_ids):
+        # Map userIds to history rows; unknown users are an error
+        positions = self.user_index.get_indexer(np.atleast_1d(user_ids))
+        if (positions < 0).any():
+            missing = np.atleast_1d(user_ids)[int(np.flatnonzero(positions < 0)[0])]
+            raise ValueError(f"User id '{missing}' not found in the ratings history.")
+        return positions
+
+"""
+Build the rating histories of all users
+Args:
+- ratings_df: a Pandas DataFrame with userId, movieId, and rating columns
+- movies_df: a Pandas DataFrame containing the cleaned movies dataset
+Returns: a UserHistory whose columns follow the order of movies_df
+"""
+
+def build_user_history(ratings_df, movies_df):
+    ratings_matrix, user_ids = build_ratings_matrix(ratings_df, movies_df)
+    return UserHistory(user_ids, ratings_matrix.T.tocsr())
+
+"""
+Score every movie for a block of users from their rating histories
+The score of movie j for user u is sum_i rating(u, i) * similarity(i, j), i.e. the sparse
+history rows times the item-item similarity. A FactorSimilarity instead predicts ratings
+from the user's folded-in embedding. A NeighborIndex is multiplied as a sparse
+matrix (cost proportional to ratings * K), a float32 matrix directly, and any other signal
+has only the rows of the movies rated in the block read, once per block.
+Args:
+- history_rows: SciPy CSR matrix, the ratings of the users to score (users x movies)
+- similarity: a similarity signal (dense matrix, memory map, or object with rows())
+Returns: a 2D float32 NumPy array with one row of scores per user
+"""
+
+def score_users(history_rows, similarity):
+    if hasattr(similarity, "user_scores"):
+        return np.asarray(similarity.user_scores(history_rows), dtype=np.float32)
+    if hasattr(similarity, "to_csr"):
+        return (history_rows @ similarity.to_csr()).toarray().astype(np.float32, copy=False)
+    if isinstance(similarity, np.ndarray) and similarity.dtype == np.float32:
+        # A float32 matrix (or memory map) is multiplied in place, without gathering rows
+        return np.asarray(history_rows @ similarity, dtype=np.float32)
+    rated = np.unique(history_rows.indices)
+    scores = history_rows[:, rated] @ similarity_rows(similarity, rated)
+    return np.asarray(scores, dtype=np.float32)
+
+"""
+Recommend unseen movies to many users at once
+Users are scored in blocks, so a nightly refresh of every user is a handful of sparse
+matrix products instead of one Python call per user.
+Args:
+- user_ids: sequence of userIds, or None for every user in the history
+- history: UserHistory of the users' ratings
+- movies_df: DataFrame, the dataset containing movie information
+- similarity: the item-item similarity signal, normally the ratings similarity
+- top_n: int, the number of recommendations per user (default: 10)
+- batch_size: int, the number of users scored together, which bounds memory (default: 1024)
+Returns: a DataFrame with columns userId, rank, movieId, title, genres, and score holding up
+to top_n movies per user that the user has not rated
+Raises: ValueError if a userId is not in the history
+"""
+
+def recommend_for_users(user_ids, history, movies_df, similarity, top_n=10, batch_size=1024):
+    positions = np.arange(len(history)) if user_ids is None else history.positions(user_ids)
+    movie_ids = movies_df["movieId"].to_numpy()
+
+    frames = []
+    for start in range(0, len(positions), batch_size):
+        batch = positions[start:start + batch_size]
+        history_rows = history.ratings[batch]
+        with span("recommend_for_users.score", rows=len(batch)):
+            scores = score_users(history_rows, similarity)
+            # Never recommend a movie the user has already rated
+            seen_rows, seen_cols = history_rows.nonzero()
+            scores[seen_rows, seen_cols] = -np.inf
+            recommended, recommended_scores = top_n_rows(scores, top_n, MIN_USER_SCORE)
+
+        user_rows, ranks = np.nonzero(recommended >= 0)
+        recommended_positions = recommended[user_rows, ranks]
+        frames.append(pd.DataFrame({
+            "userId": history.user_ids[batch[user_rows]],
+            "rank": ranks + 1,
+            "movieId": movie_ids[recommended_positions],
+            "title": movies_df["title"].to_numpy()[recommended_positions],
+            "genres": movies_df["genres"].to_numpy()[recommended_positions],
+            "score": recommended_scores[user_rows, ranks],
+        }))
+
+    if not frames:
+        return pd.DataFrame(columns=["userId", "rank", "movieId", "title", "genres", "score"])
+    return pd.concat(frames, ignore_index=True)
+
+"""
+Recommend unseen movies to one user from their rating history
+Args:
+- user_id: int, the userId to recommend for
+- history: UserHistory of the users' ratings
+- movies_df: DataFrame, the dataset containing movie information
+- similarity: the item-item similarity signal, normally the ratings similarity
+- top_n: int, the number of recommendations to return (default: 10)
+Returns: a DataFrame with the title, genres, and score of the recommended movies
+Raises: ValueError if the user is not in the history
+"""
+
+def recommend_for_user(user_id, history, movies_df, similarity, top_n=10):
+    recommendations = recommend_for_users([user_id], history, movies_df, similarity, top_n=top_n)
+    return recommendations[["title", "genres", "score"]].reset_index(drop=True)
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    from recommender import load_signal
+
+    parser = argparse.ArgumentParser(description="Recommend unseen movies to every user (nightly refresh).")
+    parser.add_argument("output", help="path of the CSV file to write")
+    parser.add_argument("--data-dir", default="data", help="directory holding the preprocessed files")
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=1024, help="users scored per batch")
+    args = parser.parse_args()
+
+    try:
+        movies_df = pd.read_csv(os.path.join(args.data_dir, "cleaned_movies.csv"))
+        ratings_df = pd.read_csv(os.path.join(args.data_dir, "cleaned_ratings.csv"),
+                                 usecols=["userId", "movieId", "rating"])
+        similarity = load_signal("ratings", args.data_dir, movie_ids=movies_df["movieId"])
+    except FileNotFoundError as e:
+        print(f"Error: Required data file not found. Please run preprocessing first. ({e})")
+        exit(1)
+
+    history = build_user_history(ratings_df, movies_df)
+    recommendations = recommend_for_users(None, history, movies_df, similarity, top_n=args.top_n,
+                                          batch_size=args.batch_size)
+    recommendations.to_csv(args.output, index=False)
+    print(f"Wrote {len(recommendations)} recommendations for {len(history)} users to {args.output}.")
@@ -0,0 +1,58 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from scipy import sparse
+from ann_index import IVFIndex, normalize_rows, recall_report
+from scoring import blend_rows
+
+@pytest.fixture
+def features():
+    # Clustered vectors so the coarse quantizer has real structure to find
+    rng = np.random.default_rng(5)
+    centers = rng.random((8, 16))
+    return centers[rng.integers(0, 8, 400)] + 0.05 * rng.random((400, 16))
+
+def test_normalize_rows_sparse_and_dense():
+    dense = np.array([[3.0, 4.0], [0.0, 0.0]])
+    np.testing.assert_allclose(normalize_rows(dense), [[0.6, 0.8], [0.0, 0.0]])
+    np.testing.assert_allclose(normalize_rows(sparse.csr_matrix(dense)).toarray(), [[0.6, 0.8], [0.0, 0.0]])
+
+def test_full_probe_is_exact(features):
+    index = IVFIndex(n_lists=10, n_probe=10).fit(sparse.csr_matrix(features))
+    report = recall_report(index, top_n=5, n_queries=50, n_probes=(10,))
+    assert report[0]["recall"] == pytest.approx(1.0)
+
+def test_recall_grows_with_probes(features):
+    index = IVFIndex(n_lists=20).fit(features)
+    report = recall_report(index, top_n=10, n_queries=100, n_probes=(1, 4, 20))
+    recalls = [row["recall"] for row in report]
+    assert recalls == sorted(recalls)
+    assert recalls[-1] == pytest.approx(1.0)
+
+def test_query_excludes_self_and_builds_neighbor_index(features):
+    index = IVFIndex(n_lists=10, n_probe=3).fit(features)
+    neighbors, scores = index.query(7, top_n=5)
+    assert 7 not in neighbors
+    assert list(scores) == sorted(scores, reverse=True)
+    neighbor_index = index.build_neighbor_index(5)
+    np.testing.assert_array_equal(neighbor_index.neighbors(7)[0], neighbors)
+
+def test_index_works_as_similarity_signal(features):
+    index = IVFIndex(n_lists=10, n_probe=10).fit(features)
+    rows = blend_rows([0], (index,), (1.0,))
+    expected = normalize_rows(features) @ normalize_rows(features)[0]
+    np.testing.assert_allclose(rows[0], expected, rtol=1e-4)
+
+def test_blocked_build_matches_single_queries(features):
+    index = IVFIndex(n_lists=12, n_probe=3).fit(sparse.csr_matrix(features))
+    neighbor_index = index.build_neighbor_index(4, block_rows=64)
+    for movie_index in range(0, 400, 7):
+        neighbors, scores = index.query(movie_index, top_n=4)
+        built_neighbors, built_scores = neighbor_index.neighbors(movie_index)
+        np.testing.assert_allclose(built_scores, scores[scores > 0], rtol=1e-5)
+        assert set(built_neighbors) == set(neighbors[scores > 0])
@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from attribute_filters import UNKNOWN_YEAR, build_attribute_index, parse_release_years
+from movie_stats import build_movie_stats
+
+def sample_movies():
+    return pd.DataFrame({
+        "movieId": [1, 2, 3, 4, 5],
+        "title": ["Toy Story (1995)", "Shrek (2001)", "Heat (1995) ", "Lost (2004-2010)", "Untitled"],
+        "genres": [["Animation", "Comedy"], ["Animation", "Comedy"], ["Action"], ["Drama"], ["Comedy"]]
+    })
+
+def test_parse_release_years_from_title_suffix():
+    years = parse_release_years(sample_movies()["title"])
+    assert years.tolist() == [1995, 2001, 1995, 2004, UNKNOWN_YEAR]
+
+def test_candidate_mask_combines_filters():
+    movies_df = sample_movies()
+    ratings = pd.DataFrame({"movieId": [1, 1, 2, 3, 3, 5], "rating": [4.0] * 6, "timestamp": [0] * 6})
+    index = build_attribute_index(movies_df, build_movie_stats(ratings, movies_df))
+
+    assert index.candidate_mask() is None
+    assert index.candidate_mask(genres=["comedy"]).tolist() == [True, True, False, False, True]
+    assert index.candidate_mask(genres=["Animation", "Drama"]).tolist() == [True, True, False, True, False]
+    assert index.candidate_mask(genres=["Comedy", "Animation"], match_all_genres=True).tolist() == \
+        [True, True, False, False, False]
+    # Movies of unknown year never match a year filter
+    assert index.candidate_mask(year_to=1999).tolist() == [True, False, True, False, False]
+    assert index.candidate_mask(genres=["Comedy"], year_from=2000).tolist() == [False, True, False, False, False]
+    with pytest.raises(ValueError):
+        index.candidate_mask(genres=["Western"])
+
+def test_index_without_statistics_parses_genres():
+    index = build_attribute_index(sample_movies())
+    assert index.genres == ["Action", "Animation", "Comedy", "Drama"]
+    assert index.candidate_mask(genres=["Drama"]).tolist() == [False, False, False, True, False]
@@ -0,0 +1,103 @@
+import asyncio
+import pandas as pd
+import numpy as np
+import pytest
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from batch_scheduler import MicroBatchScheduler
+from neighbor_index import build_neighbor_index
+from recommender import recommend_movies
+
+def sample_catalog(n_movies=40, seed=0):
+    rng = np.random.default_rng(seed)
+    movies_df = pd.DataFrame({
+        "movieId": np.arange(1, n_movies + 1) * 10,
+        "title": [f"Movie {i} (2000)" for i in range(n_movies)],
+        "genres": ["Action|Drama"] * n_movies,
+    })
+    signals = []
+    for _ in range(3):
+        features = rng.random((n_movies, 6))
+        features /= np.linalg.norm(features, axis=1, keepdims=True)
+        signals.append((features @ features.T).astype(np.float32))
+    signals[1] = build_neighbor_index(signals[1], 8)
+    return movies_df, signals
+
+def test_concurrent_requests_match_recommend_movies():
+    movies_df, signals = sample_catalog()
+    candidate_mask = np.arange(len(movies_df)) % 2 == 0
+    queries = [
+        ("Movie 1 (2000)", {}),
+        ("Movie 2 (2000)", {"genre_weight": 0.0, "tag_weight": 1.0, "ratings_weight": 0.0, "top_n": 3}),
+        ("Movie 3 (2000)", {"top_n": 7, "similarity_threshold": 0.6}),
+        ("Movie 4 (2000)", {"candidate_mask": candidate_mask, "top_n": 5}),
+        ("movie 25", {"ratings_weight": 0.8}),
+    ] * 4
+    with MicroBatchScheduler(movies_df, *signals, max_wait=0.05) as scheduler:
+        with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+            results = list(pool.map(lambda query: scheduler.recommend(query[0], **query[1]), queries))
+        stats = scheduler.stats()
+
+    for (title, options), result in zip(queries, results):
+        expected = recommend_movies(title, movies_df, *signals, **options)
+        assert result.index.tolist() == expected.index.tolist()
+    assert stats["requests"] == len(queries)
+    assert stats["largest_batch"] > 1
+    assert stats["batches"] < len(queries)
+    assert stats["mean_batch_size"] == len(queries) / stats["batches"]
+
+def test_unknown_title_fails_only_its_request():
+    movies_df, signals = sample_catalog()
+    with MicroBatchScheduler(movies_df, *signals, max_wait=0.05) as scheduler:
+        missing = scheduler.submit("zzzzzz")
+        found = scheduler.submit("Movie 6 (2000)", top_n=4)
+        with pytest.raises(ValueError):
+            missing.result()
+        assert len(found.result()) == 4
+
+def test_invalid_requests_fail_without_their_batch():
+    movies_df, signals = sample_catalog()
+    with MicroBatchScheduler(movies_df, *signals, max_wait=0.05) as scheduler:
+        good = [scheduler.submit(f"Movie {i} (2000)", top_n=3) for i in range(3)]
+        bad = [
+            scheduler.submit("Movie 4 (2000)", candidate_mask=np.ones(5, dtype=bool)),
+            scheduler.submit("Movie 5 (2000)", top_n=-2),
+            scheduler.submit(7),
+        ]
+        good.append(scheduler.submit("Movie 8 (2000)", top_n=3))
+        for future in bad:
+            with pytest.raises((TypeError, ValueError)):
+                future.result()
+        for future in good:
+            assert len(future.result()) == 3
+        assert scheduler.stats()["requests"] == len(good)
+
+def test_batches_respect_max_batch_size():
+    movies_df, signals = sample_catalog()
+    with MicroBatchScheduler(movies_df, *signals, max_batch_size=3, max_wait=0.05) as scheduler:
+        futures = [scheduler.submit(f"Movie {i} (2000)") for i in range(10)]
+        for future in futures:
+            future.result()
+        stats = scheduler.stats()
+    assert stats["largest_batch"] <= 3
+    assert stats["batches"] >= 4
+    assert stats["queue_depth"] == 0
+
+def test_recommend_async_and_close():
+    movies_df, signals = sample_catalog()
+    scheduler = MicroBatchScheduler(movies_df, *signals)
+
+    async def run():
+        return await asyncio.gather(*(scheduler.recommend_async(f"Movie {i} (2000)", top_n=2) for i in range(5)))
+
+    results = asyncio.run(run())
+    assert [len(result) for result in results] == [2] * 5
+    scheduler.close()
+    scheduler.close()
+    with pytest.raises(RuntimeError):
+        scheduler.submit("Movie 1 (2000)")
@@ -0,0 +1,49 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from scipy import sparse
+from sklearn.metrics.pairwise import cosine_similarity
+from blocked_similarity import (
+    rows_for_memory_budget, normalize_rows, iter_similarity_blocks, blocked_top_k, blocked_similarity_artifact
+)
+from similarity_store import load_similarity_artifact
+
+@pytest.fixture
+def features():
+    rng = np.random.default_rng(6)
+    dense = rng.random((50, 12))
+    dense[dense < 0.6] = 0
+    return sparse.csr_matrix(dense)
+
+def test_rows_for_memory_budget_scales_with_budget(features):
+    small = rows_for_memory_budget(features, 64 * 1024)
+    large = rows_for_memory_budget(features, 1024 ** 2)
+    assert 1 <= small < large <= 50
+    with pytest.raises(MemoryError):
+        rows_for_memory_budget(features, 10)
+
+def test_blocks_cover_full_similarity(features):
+    normalized = normalize_rows(features)
+    blocks = list(iter_similarity_blocks(normalized, 7))
+    assert [start for start, _, _ in blocks] == list(range(0, 50, 7))
+    full = np.vstack([block for _, _, block in blocks])
+    np.testing.assert_allclose(full, cosine_similarity(features), atol=1e-6)
+
+def test_blocked_top_k_same_for_any_budget(features):
+    tight = blocked_top_k(features, 4, memory_budget=32 * 1024)
+    loose = blocked_top_k(features, 4, memory_budget=1024 ** 3)
+    np.testing.assert_array_equal(tight.offsets, loose.offsets)
+    np.testing.assert_allclose(tight.scores, loose.scores, rtol=1e-6)
+
+def test_blocked_similarity_artifact_writes_memory_mapped_matrix(features, tmp_path):
+    base_path = str(tmp_path / "ratings_similarity_matrix")
+    manifest = blocked_similarity_artifact(features, base_path, range(50), params={"signal": "ratings"},
+                                           memory_budget=48 * 1024)
+    assert manifest["params"]["block_rows"] < 50
+    matrix, _ = load_similarity_artifact(base_path)
+    np.testing.assert_allclose(matrix, cosine_similarity(features), atol=1e-6)
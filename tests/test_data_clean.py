@@ -8,7 +8,10 @@ import os
 
 # Add the src directory to the Python path for module imports
 sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
-from data_clean import clean_movies, clean_ratings, clean_tags, save_cleaned_data
+from data_clean import (
+    clean_movies, clean_ratings, clean_tags, save_cleaned_data, split_byte_ranges, iter_ratings_chunks,
+    normalize_tags, read_dat_file, TAGS_COLUMNS, TAGS_DTYPES
+)
 
 def test_clean_movies():
     # Mock movies dataset
@@ -39,3 +42,43 @@ def test_clean_tags():
         tags = clean_tags(f.name)
     assert len(tags) == 2
     assert tags["tag"].iloc[0] == "funny"
+
+def test_normalize_tags():
+    tags = pd.Series([" Funny", "funny", None, "  ", 7, "Dark Comedy"], dtype=object)
+    assert normalize_tags(tags).tolist() == ["funny", "funny", "unknown", "unknown", "7", "dark comedy"]
+
+def test_split_byte_ranges_align_to_lines(tmp_path):
+    path = tmp_path / "ratings.dat"
+    path.write_text("".join(f"{i}::{i % 7}::{i % 5}.5::{1000 + i}\n" for i in range(200)))
+    ranges = split_byte_ranges(path, chunk_bytes=100)
+    assert len(ranges) > 1
+    assert ranges[0][0] == 0 and ranges[-1][1] == os.path.getsize(path)
+    content = path.read_bytes()
+    for start, stop in ranges:
+        assert start == 0 or content[start - 1:start] == b"\n"
+
+def test_iter_ratings_chunks_parallel_matches_single_pass(tmp_path):
+    path = tmp_path / "ratings.dat"
+    path.write_text("".join(f"{i}::{i % 7}::{i % 5}.5::{1000 + i}\n" for i in range(500)))
+    chunks = list(iter_ratings_chunks(path, workers=2, chunk_bytes=512))
+    assert len(chunks) > 1
+    ratings = pd.concat(chunks, ignore_index=True)
+    assert len(ratings) == 500
+    assert ratings["userId"].tolist() == list(range(500))
+    assert ratings["userId"].dtype == "int32"
+    assert ratings["rating"].dtype == "float32"
+    assert ratings.equals(clean_ratings(path, workers=1))
+
+def test_clean_movies_keeps_quotes_and_colons(tmp_path):
+    path = tmp_path / "movies.dat"
+    path.write_text('1::Star Wars: Episode IV - A New Hope (1977)::Action|Sci-Fi\n2::"Great" Escape, The (1963)::War\n')
+    movies = clean_movies(path)
+    assert movies["title"].tolist() == ['Star Wars: Episode IV - A New Hope (1977)', '"Great" Escape, The (1963)']
+    assert movies["genres"].iloc[1] == ["War"]
+
+def test_numeric_looking_tags_stay_strings_in_every_chunk(tmp_path):
+    path = tmp_path / "tags.dat"
+    path.write_text("".join(f"{i}::1::007::{1000 + i}\n" for i in range(50)) +
+                    "".join(f"{i}::2::bond::{1000 + i}\n" for i in range(50)))
+    tags = read_dat_file(path, TAGS_COLUMNS, TAGS_DTYPES, workers=1, chunk_bytes=256)
+    assert set(tags["tag"]) == {"007", "bond"}
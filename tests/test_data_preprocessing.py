@@ -8,7 +8,13 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
 
 import pytest
-from data_preprocessing import precompute_genre_similarity, precompute_tag_similarity, precompute_ratings_similarity
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+from data_preprocessing import (
+    precompute_genre_similarity, precompute_tag_similarity, precompute_ratings_similarity,
+    build_ratings_matrix, build_tag_counts, build_tag_features
+)
+from sklearn.feature_extraction.text import TfidfVectorizer
 
 def test_precompute_genre_similarity():
     movies_df = pd.DataFrame({
@@ -29,6 +35,26 @@ def test_precompute_tag_similarity():
     assert similarity_matrix.shape == (2, 2)
     assert similarity_matrix[0, 1] > 0
 
+def test_build_tag_features_matches_concatenated_tfidf():
+    tags_df = pd.DataFrame({
+        "movieId": [2, 1, 2, 1, 3, 99],
+        "tag": ["dark comedy", "funny", "dark comedy", "unknown", "the funny one", "ignored"]
+    })
+    movies_df = pd.DataFrame({"movieId": [1, 2, 3, 4]})
+
+    counts, tags = build_tag_counts(tags_df, movies_df)
+    assert tags.tolist() == ["dark comedy", "funny", "the funny one"]
+    assert counts.toarray().tolist() == [[0, 1, 0], [2, 0, 0], [0, 0, 1], [0, 0, 0]]
+
+    # Same features as vectorizing one concatenated tag string per movie
+    expected = TfidfVectorizer(stop_words="english").fit_transform(["funny", "dark comedy dark comedy", "funny", ""])
+    features = build_tag_features(tags_df, movies_df)
+    np.testing.assert_allclose((features @ features.T).toarray(), (expected @ expected.T).toarray())
+
+    hashed = build_tag_features(tags_df, movies_df, hash_features=1024)
+    assert hashed.shape == (4, 1024)
+    np.testing.assert_allclose((hashed @ hashed.T).toarray(), (expected @ expected.T).toarray())
+
 def test_precompute_ratings_similarity():
     ratings_df = pd.DataFrame({
         "userId": [1, 2, 1],
@@ -39,3 +65,27 @@ def test_precompute_ratings_similarity():
     similarity_matrix = precompute_ratings_similarity(ratings_df, movies_df)
     assert similarity_matrix.shape == (2, 2)
     assert similarity_matrix[0, 1] > 0
+
+def test_build_ratings_matrix_is_sparse_and_aligned():
+    ratings_df = pd.DataFrame({
+        "userId": [10, 20, 10, 30],
+        "movieId": [2, 2, 1, 99],
+        "rating": [5.0, 4.0, 3.0, 1.0]
+    })
+    movies_df = pd.DataFrame({"movieId": [1, 2, 3]})
+    ratings_matrix, user_ids = build_ratings_matrix(ratings_df, movies_df)
+    assert ratings_matrix.shape == (3, 2)
+    assert ratings_matrix.nnz == 3
+    assert list(user_ids) == [10, 20]
+    assert ratings_matrix.toarray().tolist() == [[3.0, 0.0], [5.0, 4.0], [0.0, 0.0]]
+
+def test_precompute_ratings_similarity_matches_dense_pivot():
+    ratings_df = pd.DataFrame({
+        "userId": [1, 2, 1, 3, 2],
+        "movieId": [1, 1, 2, 2, 3],
+        "rating": [5.0, 4.0, 3.0, 2.0, 1.0]
+    })
+    movies_df = pd.DataFrame({"movieId": [1, 2, 3]})
+    pivot = ratings_df.pivot(index="movieId", columns="userId", values="rating").fillna(0)
+    expected = cosine_similarity(pivot.reindex(index=movies_df["movieId"], fill_value=0))
+    np.testing.assert_allclose(precompute_ratings_similarity(ratings_df, movies_df), expected, rtol=1e-5)
@@ -0,0 +1,29 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from similarity_store import save_similarity_artifact
+from export_recommendations import export_recommendations
+
+def test_export_recommendations_in_chunks(tmp_path):
+    movies_df = pd.DataFrame({
+        "movieId": [10, 20, 30, 40, 50],
+        "title": [f"Movie {i} (2000)" for i in range(5)],
+        "genres": ["['Drama']"] * 5
+    })
+    movies_df.to_csv(tmp_path / "cleaned_movies.csv", index=False)
+    similarity = np.random.default_rng(4).random((5, 5))
+    for name in ("genre", "tag", "ratings"):
+        save_similarity_artifact(str(tmp_path / f"{name}_similarity_matrix"), similarity, movies_df["movieId"])
+
+    output_path = tmp_path / "recommendations.csv"
+    total = export_recommendations(str(output_path), data_dir=str(tmp_path), top_n=2,
+                                   similarity_threshold=0.0, chunk_size=2)
+    exported = pd.read_csv(output_path)
+    assert total == len(exported) == 10
+    assert exported["query_movieId"].unique().tolist() == [10, 20, 30, 40, 50]
+    assert (exported["query_movieId"] != exported["movieId"]).all()
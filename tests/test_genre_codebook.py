@@ -0,0 +1,58 @@
+import pandas as pd
+import numpy as np
+import pytest
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from data_preprocessing import build_genre_features, precompute_genre_similarity
+from genre_codebook import build_genre_codebook, genre_bitmasks, load_genre_codebook, parse_genres, save_genre_codebook
+
+def sample_movies():
+    return pd.DataFrame({
+        "movieId": [1, 2, 3, 4, 5],
+        "title": ["Toy Story (1995)", "Jumanji (1995)", "Heat (1995)", "Antz (1998)", "Ronin (1998)"],
+        "genres": [["Adventure", "Animation"], ["Adventure", "Fantasy"], ["Action", "Thriller"],
+                   ["Animation", "Adventure"], ["Action", "Thriller"]]
+    })
+
+def test_parse_genres_reads_lists_pipes_and_csv_strings():
+    assert parse_genres(["Action", "Drama"]) == ["Action", "Drama"]
+    assert parse_genres("Action|Drama") == ["Action", "Drama"]
+    assert parse_genres("['Action', 'Drama']") == ["Action", "Drama"]
+    assert parse_genres(np.nan) == []
+
+def test_genre_bitmasks_ignore_genre_order():
+    masks, genres = genre_bitmasks(sample_movies())
+    assert genres == ["Action", "Adventure", "Animation", "Fantasy", "Thriller"]
+    assert masks[0] == masks[3] == 0b00110
+    assert masks[2] == masks[4]
+
+def test_codebook_lookups_match_per_movie_similarity():
+    movies_df = sample_movies()
+    codebook = build_genre_codebook(movies_df, build_genre_features(movies_df))
+
+    assert codebook.table.shape == (3, 3)  # Five movies, three distinct combinations
+    assert codebook.shape == (5, 5)
+    np.testing.assert_allclose(codebook.rows(np.arange(5)), precompute_genre_similarity(movies_df), atol=1e-6)
+    assert codebook.combination(codebook.combo_ids[0]) == ["Adventure", "Animation"]
+
+def test_csv_genre_strings_build_the_same_codebook():
+    movies_df = sample_movies()
+    csv_movies = movies_df.assign(genres=movies_df["genres"].astype(str))
+    codebook = build_genre_codebook(csv_movies, build_genre_features(csv_movies))
+    np.testing.assert_allclose(codebook.rows([0]), precompute_genre_similarity(movies_df)[[0]], atol=1e-6)
+
+def test_save_and_load_codebook_checks_alignment(tmp_path):
+    movies_df = sample_movies()
+    codebook = build_genre_codebook(movies_df, build_genre_features(movies_df))
+    file_path = str(tmp_path / "genre_codebook.npz")
+    save_genre_codebook(codebook, file_path, movies_df["movieId"])
+
+    loaded = load_genre_codebook(file_path, movie_ids=movies_df["movieId"])
+    np.testing.assert_array_equal(loaded.rows([1, 2]), codebook.rows([1, 2]))
+    assert loaded.genres == codebook.genres
+    with pytest.raises(ValueError):
+        load_genre_codebook(file_path, movie_ids=[5, 4, 3, 2, 1])
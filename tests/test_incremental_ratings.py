@@ -0,0 +1,138 @@
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from incremental_ratings import (
+    build_ratings_state, apply_ratings_delta, read_appended_ratings, save_ratings_state, load_ratings_state,
+    publish_ratings_neighbors
+)
+
+@pytest.fixture
+def movies_df():
+    return pd.DataFrame({"movieId": [10, 20, 30, 40, 50, 60]})
+
+def random_ratings(seed, n_rows):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "userId": rng.integers(1, 15, n_rows),
+        "movieId": rng.choice([10, 20, 30, 40, 50, 60], n_rows),
+        "rating": rng.integers(1, 11, n_rows) / 2,
+    }).drop_duplicates(subset=["userId", "movieId"], keep="last")
+
+def assert_same_neighbors(state, expected):
+    for row in range(expected.neighbors.n_items):
+        indices, scores = state.neighbors.neighbors(row)
+        expected_indices, expected_scores = expected.neighbors.neighbors(row)
+        np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+        assert set(indices) == set(expected_indices)
+
+def test_delta_matches_full_rebuild(movies_df):
+    history = random_ratings(0, 40)
+    delta = pd.concat([
+        random_ratings(1, 10),
+        pd.DataFrame({"userId": [99, 99], "movieId": [10, 60], "rating": [5.0, 4.5]}),  # New user
+        history.iloc[:3].assign(rating=0.5),  # Changed ratings
+        pd.DataFrame({"userId": [1], "movieId": [12345], "rating": [3.0]}),  # Unknown movie
+    ])
+    state = build_ratings_state(history, movies_df, k=3)
+    summary = apply_ratings_delta(state, delta)
+    assert summary["new_users"] == 1
+    assert summary["skipped"] == 1
+
+    combined = pd.concat([history, delta]).drop_duplicates(subset=["userId", "movieId"], keep="last")
+    assert_same_neighbors(state, build_ratings_state(combined, movies_df, k=3))
+
+def test_read_appended_ratings_skips_partial_line(tmp_path):
+    path = tmp_path / "ratings.dat"
+    path.write_text("1::10::4.0::100\n")
+    offset = path.stat().st_size
+    with open(path, "a") as f:
+        f.write("2::20::3.5::101\n3::30::2.0")
+    delta, new_offset = read_appended_ratings(path, offset)
+    assert delta["userId"].tolist() == [2]
+    assert new_offset == offset + len("2::20::3.5::101\n")
+
+def test_save_and_load_state(movies_df, tmp_path):
+    state = build_ratings_state(random_ratings(2, 30), movies_df, k=2, ratings_offset=123)
+    save_ratings_state(state, tmp_path / "state")
+    loaded = load_ratings_state(tmp_path / "state")
+    assert loaded.ratings_offset == 123
+    assert loaded.k == 2
+    assert_same_neighbors(loaded, state)
+
+def test_small_delta_on_larger_catalog():
+    movies_df = pd.DataFrame({"movieId": np.arange(1, 41)})
+    rng = np.random.default_rng(3)
+    history = pd.DataFrame({
+        "userId": rng.integers(1, 60, 300),
+        "movieId": rng.integers(1, 41, 300),
+        "rating": rng.integers(1, 11, 300) / 2,
+    }).drop_duplicates(subset=["userId", "movieId"], keep="last")
+    delta = pd.DataFrame({"userId": [5, 70], "movieId": [3, 3], "rating": [1.0, 5.0]})
+
+    state = build_ratings_state(history, movies_df, k=4)
+    summary = apply_ratings_delta(state, delta)
+    assert summary["movies_updated"] < len(movies_df)
+
+    combined = pd.concat([history, delta]).drop_duplicates(subset=["userId", "movieId"], keep="last")
+    assert_same_neighbors(state, build_ratings_state(combined, movies_df, k=4))
+
+def test_updates_of_a_loaded_state_are_saved_in_place(movies_df, tmp_path):
+    history = random_ratings(4, 40)
+    save_ratings_state(build_ratings_state(history, movies_df, k=3), tmp_path / "state")
+
+    combined = history
+    for seed in (5, 6):
+        state = load_ratings_state(tmp_path / "state")
+        delta = random_ratings(seed, 8).assign(userId=lambda df: df["userId"] + seed)
+        apply_ratings_delta(state, delta)
+        save_ratings_state(state, tmp_path / "state")
+        combined = pd.concat([combined, delta]).drop_duplicates(subset=["userId", "movieId"], keep="last")
+
+    # Changing existing ratings touches only stored entries, which are updated in the mapped files
+    gram_file = tmp_path / "state" / "gram_data.npy"
+    inode = gram_file.stat().st_ino
+    state = load_ratings_state(tmp_path / "state")
+    delta = combined.iloc[:4].assign(rating=0.5)
+    apply_ratings_delta(state, delta)
+    save_ratings_state(state, tmp_path / "state")
+    combined = pd.concat([combined, delta]).drop_duplicates(subset=["userId", "movieId"], keep="last")
+    assert gram_file.stat().st_ino == inode
+
+    loaded = load_ratings_state(tmp_path / "state")
+    expected = build_ratings_state(combined, movies_df, k=3)
+    assert_same_neighbors(loaded, expected)
+    np.testing.assert_allclose(loaded.gram.to_csr().toarray(), expected.gram.to_csr().toarray())
+
+def test_interrupted_update_is_rejected(movies_df, tmp_path):
+    save_ratings_state(build_ratings_state(random_ratings(8, 30), movies_df, k=2), tmp_path / "state")
+    state = load_ratings_state(tmp_path / "state")
+    apply_ratings_delta(state, random_ratings(9, 5))
+    with pytest.raises(ValueError):
+        load_ratings_state(tmp_path / "state")
+    save_ratings_state(state, tmp_path / "state")
+    load_ratings_state(tmp_path / "state")
+
+def test_published_neighbors_are_the_loaded_ratings_signal(movies_df, tmp_path):
+    from recommender import load_signal
+    from neighbor_index import NeighborIndex
+
+    movies_df.assign(title="t", genres="g").to_csv(tmp_path / "cleaned_movies.csv", index=False)
+    np.save(tmp_path / "ratings_similarity_matrix.npy", np.eye(len(movies_df), dtype=np.float32))
+    state = build_ratings_state(random_ratings(10, 30), movies_df, k=2)
+    save_ratings_state(state, tmp_path / "state")
+    publish_ratings_neighbors(tmp_path / "state", tmp_path)
+
+    signal = load_signal("ratings", tmp_path, movie_ids=movies_df["movieId"])
+    assert isinstance(signal, NeighborIndex)
+    assert not (tmp_path / "ratings_similarity_matrix.npy").exists()
+    np.testing.assert_array_equal(signal.indices, state.neighbors.indices)
+
+    with pytest.raises(ValueError):
+        movies_df.iloc[::-1].to_csv(tmp_path / "cleaned_movies.csv", index=False)
+        publish_ratings_neighbors(tmp_path / "state", tmp_path)
@@ -0,0 +1,52 @@
+import pytest
+import json
+import logging
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+import instrumentation
+from instrumentation import span, NULL_SPAN, JsonSpanFormatter
+
+@pytest.fixture
+def enabled():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+def test_disabled_span_is_a_shared_no_op():
+    instrumentation.disable()
+    with span("ignored", rows=3) as s:
+        s.set_rows(5)
+    assert s is NULL_SPAN
+    assert "ignored" not in instrumentation.snapshot()
+
+def test_nested_spans_are_aggregated(enabled):
+    for _ in range(2):
+        with span("outer") as outer:
+            with span("inner", rows=10):
+                pass
+            outer.set_rows(4)
+
+    metrics = instrumentation.snapshot()
+    assert metrics["outer"]["count"] == 2 and metrics["outer"]["rows"] == 8
+    assert metrics["outer/inner"]["rows"] == 20
+    assert metrics["outer"]["wall_s"] >= metrics["outer/inner"]["wall_s"]
+    assert metrics["outer"]["max_peak_rss_mb"] > 0
+
+def test_span_logs_structured_records_and_errors(enabled, caplog, tmp_path):
+    caplog.set_level(logging.INFO, logger="instrumentation")
+    with pytest.raises(ValueError):
+        with span("failing"):
+            raise ValueError("boom")
+
+    record = caplog.records[-1]
+    assert record.span["span"] == "failing" and record.span["error"] == "ValueError"
+    assert json.loads(JsonSpanFormatter().format(record))["span"] == "failing"
+    assert instrumentation.write_snapshot(str(tmp_path / "metrics.json"))["failing"]["errors"] == 1
+    with open(tmp_path / "metrics.json") as file:
+        assert json.load(file)["failing"]["count"] == 1
@@ -0,0 +1,84 @@
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+import os
+from scipy import sparse
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from latent_factors import (
+    FactorSimilarity,
+    build_factor_similarity,
+    equal_length_groups,
+    load_factor_similarity,
+    save_factor_similarity,
+    train_als,
+)
+from recommender import load_similarity_data
+from user_recommender import build_user_history, recommend_for_user
+
+@pytest.fixture
+def ratings_matrix():
+    # Movies 0-2 are loved by users 0-9 and disliked by users 10-19; movies 3-5 the reverse
+    rng = np.random.default_rng(0)
+    ratings = np.zeros((6, 20), dtype=np.float32)
+    ratings[:3, :10] = 5
+    ratings[3:, 10:] = 5
+    ratings[:3, 10:] = 1
+    ratings[3:, :10] = 1
+    ratings[rng.random(ratings.shape) < 0.3] = 0  # Leave some ratings unobserved
+    return sparse.csr_matrix(ratings)
+
+def test_equal_length_groups_cover_every_row():
+    indptr = np.array([0, 2, 2, 5, 7, 8])
+    groups = equal_length_groups(indptr, max_elements=2)
+    assert sorted(int(row) for _, rows in groups for row in rows) == [0, 1, 2, 3, 4]
+    assert all((np.diff(indptr)[rows] == length).all() for length, rows in groups)
+
+def test_train_als_fits_ratings(ratings_matrix):
+    item_factors, user_factors, global_mean = train_als(ratings_matrix, factors=4, iterations=10, workers=2)
+
+    coo = ratings_matrix.tocoo()
+    predictions = (item_factors[coo.row] * user_factors[coo.col]).sum(axis=1) + global_mean
+    assert np.sqrt(np.mean((predictions - coo.data) ** 2)) < 0.5
+    assert item_factors.dtype == np.float32 and item_factors.shape == (6, 4)
+
+def test_factor_similarity_groups_movies(ratings_matrix):
+    similarity = build_factor_similarity(ratings_matrix, factors=4)
+    rows = similarity.rows([0, 3])
+
+    assert similarity.shape == (6, 6)
+    assert rows[0, 1] > 0.9 and rows[0, 4] < 0
+    assert rows[1, 5] > 0.9
+
+def test_factor_artifact_round_trip(ratings_matrix, tmp_path):
+    similarity = build_factor_similarity(ratings_matrix, factors=4)
+    movie_ids = np.arange(1, 7)
+    save_factor_similarity(similarity, str(tmp_path / "ratings_factors.npz"), movie_ids)
+
+    loaded = load_factor_similarity(str(tmp_path / "ratings_factors.npz"), movie_ids=movie_ids)
+    np.testing.assert_array_equal(loaded.item_factors, similarity.item_factors)
+    assert loaded.global_mean == pytest.approx(similarity.global_mean)
+    with pytest.raises(ValueError, match="not aligned"):
+        load_factor_similarity(str(tmp_path / "ratings_factors.npz"), movie_ids=movie_ids[::-1])
+
+    for name in ("genre", "tag"):
+        np.save(tmp_path / f"{name}_similarity_matrix.npy", np.eye(6, dtype=np.float32))
+    assert isinstance(load_similarity_data(str(tmp_path), movie_ids=movie_ids)[2], FactorSimilarity)
+
+def test_recommend_for_user_from_factors(ratings_matrix):
+    movies_df = pd.DataFrame({
+        "movieId": np.arange(1, 7),
+        "title": [f"Movie {i} (2000)" for i in range(1, 7)],
+        "genres": ["Drama"] * 6
+    })
+    ratings_df = pd.DataFrame({"userId": [1, 1], "movieId": [1, 5], "rating": [5.0, 1.0]})
+    history = build_user_history(ratings_df, movies_df)
+    similarity = build_factor_similarity(ratings_matrix, factors=4)
+
+    recommendations = recommend_for_user(1, history, movies_df, similarity, top_n=2)
+
+    # A fan of movie 1 who disliked movie 5 gets the rest of the first group
+    assert sorted(recommendations["title"]) == ["Movie 2 (2000)", "Movie 3 (2000)"]
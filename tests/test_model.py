@@ -0,0 +1,75 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from model import RecommenderModel, load_model
+from similarity_store import save_similarity_artifact
+
+def write_model_files(data_dir, movies_df, similarity):
+    movies_df.to_csv(os.path.join(data_dir, "cleaned_movies.csv"), index=False)
+    for name in ("genre", "tag", "ratings"):
+        save_similarity_artifact(os.path.join(data_dir, f"{name}_similarity_matrix"), similarity,
+                                 movies_df["movieId"])
+
+def sample_movies():
+    return pd.DataFrame({
+        "movieId": [1, 2, 3],
+        "title": ["Toy Story (1995)", "Jumanji (1995)", "Heat (1995)"],
+        "genres": ["Animation", "Adventure", "Action"]
+    })
+
+def test_load_model_shares_read_only_memory_mapped_signals(tmp_path):
+    write_model_files(str(tmp_path), sample_movies(), np.eye(3))
+
+    model = load_model(str(tmp_path))
+    model.warm_up()
+
+    assert isinstance(model, RecommenderModel)
+    assert len(model) == 3
+    assert all(isinstance(signal, np.memmap) and not signal.flags.writeable for signal in model.signals)
+    assert model.title_index.lookup("jumanji") == 1
+    assert len(model.cache) == 0  # Warm-up bypasses the result cache
+
+def test_reload_if_changed_picks_up_new_artifacts(tmp_path):
+    similarity = np.array([[1.0, 0.9, 0.2], [0.9, 1.0, 0.3], [0.2, 0.3, 1.0]])
+    write_model_files(str(tmp_path), sample_movies(), similarity)
+    model = load_model(str(tmp_path))
+    assert model.reload_if_changed() is False
+    assert model.recommend("Toy Story", top_n=1)["title"].tolist() == ["Jumanji (1995)"]
+
+    rebuilt = similarity[:, [0, 2, 1]][[0, 2, 1]]
+    write_model_files(str(tmp_path), sample_movies(), rebuilt)
+    os.utime(tmp_path / "genre_similarity_matrix.npy", ns=(1, 1))  # Make the change visible to coarse clocks
+
+    assert model.reload_if_changed() is True
+    assert len(model.cache) == 0
+    assert model.recommend("Toy Story", top_n=1)["title"].tolist() == ["Heat (1995)"]
+
+def test_reload_if_changed_keeps_model_when_artifacts_are_incomplete(tmp_path):
+    write_model_files(str(tmp_path), sample_movies(), np.eye(3))
+    model = load_model(str(tmp_path))
+    signals = model.signals
+
+    os.remove(tmp_path / "tag_similarity_matrix.npy")
+    os.remove(tmp_path / "tag_similarity_matrix.json")
+
+    assert model.reload_if_changed() is False
+    assert model.signals == signals
+
+def test_reload_if_changed_retries_when_a_file_vanishes_while_fingerprinting(tmp_path, monkeypatch):
+    import model as model_module
+
+    write_model_files(str(tmp_path), sample_movies(), np.eye(3))
+    model = load_model(str(tmp_path))
+    fingerprint = model.fingerprint
+
+    def vanished(data_dir):
+        raise FileNotFoundError("removed during a format switch")
+
+    monkeypatch.setattr(model_module, "artifact_fingerprint", vanished)
+    assert model.reload_if_changed() is False
+    assert model.fingerprint == fingerprint
@@ -7,7 +7,8 @@ import os
 # Add the src directory to the Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
 
-from recommender import recommend_movies
+from recommender import recommend_movies, recommend_movies_batch
+from title_index import TitleIndex
 
 # Mock dataset for movies
 @pytest.fixture
@@ -81,3 +82,90 @@ def test_recommend_movies_empty_recommendations(movies_df, genre_similarity, tag
         similarity_threshold=0.95  # Set a very high threshold
     )
     assert recommendations.empty
+
+def test_recommend_movies_with_title_index(movies_df, genre_similarity, tag_similarity, ratings_similarity):
+    # Test title resolution through a prebuilt title index
+    title_index = TitleIndex(movies_df["title"])
+    recommendations = recommend_movies(
+        movie_title="jumanj",
+        movies_df=movies_df,
+        genre_similarity=genre_similarity,
+        tag_similarity=tag_similarity,
+        ratings_similarity=ratings_similarity,
+        top_n=1,
+        title_index=title_index
+    )
+    assert recommendations["title"].tolist() == ["Toy Story (1995)"]
+    with pytest.raises(ValueError, match="not found in dataset"):
+        recommend_movies("Invalid Movie", movies_df, genre_similarity, tag_similarity,
+                         ratings_similarity, title_index=title_index)
+
+def test_recommend_movies_batch_matches_single(movies_df, genre_similarity, tag_similarity, ratings_similarity):
+    # Test that batched recommendations agree with one-at-a-time calls
+    batch = recommend_movies_batch(
+        [1, "Jumanji (1995)", 3], movies_df, genre_similarity, tag_similarity, ratings_similarity, top_n=2
+    )
+    assert batch["query_movieId"].unique().tolist() == [1, 2, 3]
+    for title, movie_id in zip(movies_df["title"], movies_df["movieId"]):
+        single = recommend_movies(title, movies_df, genre_similarity, tag_similarity, ratings_similarity, top_n=2)
+        rows = batch[batch["query_movieId"] == movie_id]
+        assert rows["title"].tolist() == single["title"].tolist()
+        assert rows["rank"].tolist() == list(range(1, len(rows) + 1))
+
+def test_recommend_movies_batch_per_row_weights(movies_df, genre_similarity, tag_similarity, ratings_similarity):
+    # Test per-query weights and an unknown movie id
+    batch = recommend_movies_batch(
+        [3, 3], movies_df, genre_similarity, tag_similarity, ratings_similarity,
+        genre_weight=np.array([1.0, 0.0]), tag_weight=0.0, ratings_weight=np.array([0.0, 1.0]), top_n=1
+    )
+    assert batch["score"].tolist() == pytest.approx([0.2, 0.6])
+    with pytest.raises(ValueError, match="Movie id '42' not found"):
+        recommend_movies_batch([42], movies_df, genre_similarity, tag_similarity, ratings_similarity)
+
+@pytest.fixture
+def stats(movies_df):
+    from movie_stats import build_movie_stats
+
+    # Jumanji has one rating, Grumpier Old Men has four recent ones
+    ratings = pd.DataFrame({
+        "movieId": [1, 1, 2, 3, 3, 3, 3],
+        "rating": [4.0, 5.0, 3.0, 4.0, 4.0, 3.0, 5.0],
+        "timestamp": [100, 100, 100, 200, 200, 200, 200],
+    })
+    return build_movie_stats(ratings, movies_df)
+
+def test_recommend_movies_min_ratings(movies_df, genre_similarity, tag_similarity, ratings_similarity, stats):
+    recommendations = recommend_movies("Toy Story (1995)", movies_df, genre_similarity, tag_similarity,
+                                       ratings_similarity, stats=stats, min_ratings=2)
+    assert recommendations["title"].tolist() == ["Grumpier Old Men (1995)"]
+    with pytest.raises(ValueError):
+        recommend_movies("Toy Story (1995)", movies_df, genre_similarity, tag_similarity, ratings_similarity,
+                         min_ratings=2)
+
+def test_recommend_movies_popularity_reranking(movies_df, genre_similarity, tag_similarity, ratings_similarity,
+                                               stats):
+    recommendations = recommend_movies("Toy Story (1995)", movies_df, genre_similarity, tag_similarity,
+                                       ratings_similarity, stats=stats, popularity_weight=2.0)
+    assert recommendations["title"].tolist() == ["Grumpier Old Men (1995)", "Jumanji (1995)"]
+
+    batch = recommend_movies_batch([1], movies_df, genre_similarity, tag_similarity, ratings_similarity,
+                                   stats=stats, popularity_weight=2.0)
+    assert batch["movieId"].tolist() == [3, 2]
+
+def test_recommend_movies_popular_in_genre_fallback(movies_df, genre_similarity, tag_similarity,
+                                                    ratings_similarity, stats):
+    recommendations = recommend_movies("Toy Story (1995)", movies_df, genre_similarity, tag_similarity,
+                                       ratings_similarity, similarity_threshold=0.95, stats=stats, fallback=True)
+    # Only Jumanji shares a genre (Adventure) with Toy Story
+    assert recommendations["title"].tolist() == ["Jumanji (1995)"]
+
+def test_candidate_mask_filters_before_top_n(movies_df, genre_similarity, tag_similarity, ratings_similarity):
+    # Jumanji is the best match, but only Grumpier Old Men passes the filter
+    candidate_mask = np.array([True, False, True])
+    recommendations = recommend_movies("Toy Story (1995)", movies_df, genre_similarity, tag_similarity,
+                                       ratings_similarity, top_n=1, candidate_mask=candidate_mask)
+    assert recommendations["title"].tolist() == ["Grumpier Old Men (1995)"]
+
+    batch = recommend_movies_batch([1, 3], movies_df, genre_similarity, tag_similarity, ratings_similarity,
+                                   top_n=1, candidate_mask=candidate_mask)
+    assert batch["movieId"].tolist() == [3, 1]
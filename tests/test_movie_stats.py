@@ -0,0 +1,70 @@
+import pandas as pd
+import numpy as np
+import pytest
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from movie_stats import build_movie_stats, load_movie_stats, save_movie_stats, SECONDS_PER_DAY
+
+def sample_movies():
+    return pd.DataFrame({
+        "movieId": [10, 20, 30, 40],
+        "title": ["Toy Story (1995)", "Jumanji (1995)", "Heat (1995)", "Antz (1998)"],
+        "genres": [["Adventure", "Animation"], ["Adventure"], ["Action"], ["Animation"]]
+    })
+
+def sample_ratings():
+    day = SECONDS_PER_DAY
+    return pd.DataFrame({
+        "userId": [1, 2, 3, 1, 2, 4, 5],
+        "movieId": [10, 10, 10, 20, 30, 30, 99],
+        "rating": [5.0, 4.0, 3.0, 2.0, 4.0, 5.0, 1.0],
+        "timestamp": [0, 365 * day, 730 * day, 730 * day, 0, 0, 730 * day],
+    })
+
+def test_build_movie_stats_aggregates_per_movie():
+    stats = build_movie_stats(sample_ratings(), sample_movies(), prior_weight=2, half_life_days=365)
+
+    np.testing.assert_array_equal(stats.counts, [3, 1, 2, 0])
+    np.testing.assert_allclose(stats.means[:3], [4.0, 2.0, 4.5])
+    assert np.isnan(stats.means[3])
+    assert stats.global_mean == pytest.approx(23 / 6)  # Movie 99 is not in the catalog
+    # (sum + 2 * global mean) / (count + 2)
+    np.testing.assert_allclose(stats.bayesian_means, [(12 + 23 / 3) / 5, (2 + 23 / 3) / 3, (9 + 23 / 3) / 4,
+                                                      23 / 6], rtol=1e-6)
+    # Ratings one and two half-lives before the newest weigh 0.5 and 0.25
+    np.testing.assert_allclose(stats.popularity, [1.75, 1.0, 0.5, 0.0], rtol=1e-6)
+    assert stats.reference_time == 730 * SECONDS_PER_DAY
+
+def test_chunked_aggregation_matches_one_pass():
+    ratings = sample_ratings()
+    whole = build_movie_stats(ratings, sample_movies())
+    # Chunks arrive out of time order, so the popularity reference moves forward mid-stream
+    chunked = build_movie_stats((ratings.iloc[[0, 4, 5]], ratings.iloc[[1, 2, 3, 6]]), sample_movies())
+
+    np.testing.assert_array_equal(chunked.counts, whole.counts)
+    np.testing.assert_allclose(chunked.bayesian_means, whole.bayesian_means)
+    np.testing.assert_allclose(chunked.popularity, whole.popularity, rtol=1e-6)
+
+def test_popular_in_genre_and_support_mask():
+    stats = build_movie_stats(sample_ratings(), sample_movies())
+
+    # Jumanji and Antz share a genre with Toy Story; Jumanji is more popular
+    assert stats.popular_in_genre(0, top_n=5).tolist() == [1, 3]
+    assert stats.popular_in_genre(0, top_n=5, min_ratings=1).tolist() == [1]
+    np.testing.assert_array_equal(stats.support_mask(2), [True, False, True, False])
+
+def test_save_and_load_movie_stats(tmp_path):
+    movies_df = sample_movies()
+    stats = build_movie_stats(sample_ratings(), movies_df)
+    file_path = str(tmp_path / "movie_stats.npz")
+    save_movie_stats(stats, file_path)
+
+    loaded = load_movie_stats(file_path, movie_ids=movies_df["movieId"])
+    pd.testing.assert_frame_equal(loaded.to_frame(), stats.to_frame())
+    assert loaded.genres == stats.genres
+    with pytest.raises(ValueError):
+        load_movie_stats(file_path, movie_ids=[40, 30, 20, 10])
@@ -0,0 +1,81 @@
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from scipy import sparse
+from sklearn.metrics.pairwise import cosine_similarity
+from neighbor_index import NeighborIndex, build_neighbor_index, save_neighbor_index, load_neighbor_index
+from recommender import recommend_movies
+
+@pytest.fixture
+def features():
+    rng = np.random.default_rng(0)
+    dense = rng.random((40, 8))
+    dense[dense < 0.5] = 0
+    return sparse.csr_matrix(dense)
+
+def test_build_neighbor_index_matches_dense_top_k(features):
+    index = build_neighbor_index(features, k=5, block_size=7)
+    dense = cosine_similarity(features)
+    np.fill_diagonal(dense, -np.inf)
+    assert index.shape == (40, 40)
+    for i in range(40):
+        neighbor_ids, neighbor_scores = index.neighbors(i)
+        expected = np.sort(dense[i])[::-1][:len(neighbor_ids)]
+        assert i not in neighbor_ids
+        np.testing.assert_allclose(neighbor_scores, expected, rtol=1e-5)
+        np.testing.assert_allclose(dense[i, neighbor_ids], neighbor_scores, rtol=1e-5)
+
+def test_rows_expand_to_dense():
+    index = NeighborIndex(
+        indices=[1, 2, 0, 0],
+        scores=[0.9, 0.1, 0.9, 0.1],
+        offsets=[0, 2, 3, 4],
+        n_items=3,
+    )
+    rows = index.rows([2, 0])
+    np.testing.assert_allclose(rows, [[0.1, 0.0, 0.0], [0.0, 0.9, 0.1]])
+    np.testing.assert_allclose(index.to_csr().toarray(), index.rows([0, 1, 2]))
+
+def test_save_and_load_round_trip(features, tmp_path):
+    index = build_neighbor_index(features, k=3)
+    path = tmp_path / "neighbors.npz"
+    save_neighbor_index(index, path)
+    loaded = load_neighbor_index(path)
+    np.testing.assert_array_equal(loaded.indices, index.indices)
+    np.testing.assert_array_equal(loaded.offsets, index.offsets)
+    np.testing.assert_allclose(loaded.scores, index.scores)
+
+def test_load_checks_movie_id_alignment(features, tmp_path):
+    index = build_neighbor_index(features, k=3)
+    path = tmp_path / "neighbors.npz"
+    movie_ids = np.arange(index.n_items) * 10
+    save_neighbor_index(index, path, movie_ids)
+    assert load_neighbor_index(path, movie_ids=movie_ids).n_items == index.n_items
+    with pytest.raises(ValueError, match="not aligned"):
+        load_neighbor_index(path, movie_ids=movie_ids[::-1])
+
+    # Indexes saved without movieIds are checked for their size only
+    save_neighbor_index(index, path)
+    with pytest.raises(ValueError, match="not aligned"):
+        load_neighbor_index(path, movie_ids=movie_ids[:-1])
+
+def test_recommend_movies_from_neighbor_index():
+    movies_df = pd.DataFrame({
+        "movieId": [1, 2, 3],
+        "title": ["Toy Story (1995)", "Jumanji (1995)", "Grumpier Old Men (1995)"],
+        "genres": [["Adventure", "Animation"], ["Adventure", "Children"], ["Comedy", "Romance"]]
+    })
+    similarity = np.array([
+        [1.0, 0.9, 0.1],
+        [0.9, 1.0, 0.2],
+        [0.1, 0.2, 1.0]
+    ])
+    index = build_neighbor_index(similarity, k=1)
+    recommendations = recommend_movies("Toy Story (1995)", movies_df, index, index, index, top_n=1)
+    assert recommendations["title"].tolist() == ["Jumanji (1995)"]
@@ -0,0 +1,91 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from neighbor_index import NeighborIndex
+from pipeline import run_pipeline
+from recommender import load_similarity_data, recommend_movies
+
+def write_raw_data(raw_dir):
+    raw_dir.mkdir()
+    (raw_dir / "movies.dat").write_text(
+        "1::Toy Story (1995)::Adventure|Animation|Children\n"
+        "2::Jumanji (1995)::Adventure|Children|Fantasy\n"
+        "3::Heat (1995)::Action|Crime|Thriller\n"
+    )
+    (raw_dir / "ratings.dat").write_text(
+        "1::1::5::100\n1::2::4::101\n2::1::4::102\n2::3::2::103\n3::2::3.5::104\n"
+    )
+    (raw_dir / "tags.dat").write_text(
+        "1::1::pixar::100\n2::2::jungle::101\n3::1::animation::102\n3::2::animation::103\n"
+    )
+
+def test_run_pipeline_builds_all_signals(tmp_path):
+    write_raw_data(tmp_path / "raw")
+    output_dir = tmp_path / "data"
+    timings = run_pipeline(raw_dir=str(tmp_path / "raw"), output_dir=str(output_dir), workers=2)
+
+    for stage in ("clean", "save_cleaned", "movie_stats", "genre_similarity", "tag_similarity", "ratings_similarity", "total"):
+        assert timings[stage] >= 0
+    movies_df = pd.read_csv(output_dir / "cleaned_movies.csv")
+    signals = load_similarity_data(str(output_dir), movie_ids=movies_df["movieId"])
+    assert all(signal.shape == (3, 3) for signal in signals)
+    # Toy Story and Jumanji share genres, so their combinations are similar in the codebook
+    assert signals[0].rows([0])[0, 1] > 0
+
+    recommendations = recommend_movies("Toy Story (1995)", movies_df, *signals, top_n=1)
+    assert recommendations["title"].tolist() == ["Jumanji (1995)"]
+
+def test_run_pipeline_top_k_mode(tmp_path):
+    write_raw_data(tmp_path / "raw")
+    run_pipeline(raw_dir=str(tmp_path / "raw"), output_dir=str(tmp_path / "data"), top_k=1)
+    assert os.path.exists(tmp_path / "data" / "genre_codebook.npz")
+    for name in ("tag", "ratings"):
+        assert os.path.exists(tmp_path / "data" / f"{name}_neighbors.npz")
+
+def test_rebuild_in_another_mode_replaces_the_loaded_format(tmp_path):
+    write_raw_data(tmp_path / "raw")
+    output_dir = tmp_path / "data"
+    run_pipeline(raw_dir=str(tmp_path / "raw"), output_dir=str(output_dir))
+    assert os.path.exists(output_dir / "tag_similarity_matrix.npy")
+
+    run_pipeline(raw_dir=str(tmp_path / "raw"), output_dir=str(output_dir), top_k=1)
+    for name in ("tag", "ratings"):
+        assert not os.path.exists(output_dir / f"{name}_similarity_matrix.npy")
+        assert not os.path.exists(output_dir / f"{name}_similarity_matrix.json")
+    movies_df = pd.read_csv(output_dir / "cleaned_movies.csv")
+    _, tag_similarity, _ = load_similarity_data(str(output_dir), movie_ids=movies_df["movieId"])
+    assert isinstance(tag_similarity, NeighborIndex)
+
+def test_rebuild_without_factors_drops_the_ratings_factors(tmp_path):
+    write_raw_data(tmp_path / "raw")
+    output_dir = tmp_path / "data"
+    run_pipeline(raw_dir=str(tmp_path / "raw"), output_dir=str(output_dir), ratings_factors=2)
+    assert os.path.exists(output_dir / "ratings_factors.npz")
+
+    run_pipeline(raw_dir=str(tmp_path / "raw"), output_dir=str(output_dir))
+    assert not os.path.exists(output_dir / "ratings_factors.npz")
+    movies_df = pd.read_csv(output_dir / "cleaned_movies.csv")
+    _, _, ratings_similarity = load_similarity_data(str(output_dir), movie_ids=movies_df["movieId"])
+    assert isinstance(ratings_similarity, np.memmap)
+
+def test_worker_spans_reach_the_parent_metrics(tmp_path, caplog):
+    import instrumentation
+
+    write_raw_data(tmp_path / "raw")
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        with caplog.at_level("INFO", logger="pipeline"):
+            run_pipeline(raw_dir=str(tmp_path / "raw"), output_dir=str(tmp_path / "data"), workers=2)
+        metrics = instrumentation.snapshot()
+    finally:
+        instrumentation.disable()
+        instrumentation.reset()
+    for name in ("genre", "tag", "ratings"):
+        assert metrics[f"build_signal.{name}"]["count"] == 1
+    assert "Stage timings" in caplog.text
@@ -0,0 +1,94 @@
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from result_cache import RecommendationCache, quantize_weights
+from recommender import recommend_movies
+from model import RecommenderModel
+
+@pytest.fixture
+def sample_data():
+    movies_df = pd.DataFrame({
+        "movieId": [1, 2, 3],
+        "title": ["Toy Story (1995)", "Jumanji (1995)", "Grumpier Old Men (1995)"],
+        "genres": ["Adventure|Animation", "Adventure|Children", "Comedy|Romance"]
+    })
+    similarity = np.array([
+        [1.0, 0.9, 0.4],
+        [0.9, 1.0, 0.2],
+        [0.4, 0.2, 1.0]
+    ], dtype=np.float32)
+    return movies_df, similarity
+
+def test_quantize_weights():
+    assert quantize_weights([0.31, 0.19, 0.5]) == (0.3, 0.2, 0.5)
+    assert quantize_weights([0.1 + 0.2]) == (0.3,)
+    assert quantize_weights([0.33], step=0) == (0.33,)
+
+def test_cache_lru_eviction_and_counters():
+    cache = RecommendationCache(max_entries=2)
+    cache.put("a", [1])
+    cache.put("b", [2])
+    assert cache.get("a").tolist() == [1]  # "a" becomes the most recently used
+    cache.put("c", [3])
+
+    assert cache.get("b") is None
+    assert cache.get("c").tolist() == [3]
+    assert cache.stats() == {"size": 2, "max_entries": 2, "hits": 2, "misses": 1, "evictions": 1,
+                             "hit_rate": pytest.approx(2 / 3)}
+    with pytest.raises(ValueError):
+        cache.get("a")[0] = 5  # Cached results are read-only
+
+def test_recommend_movies_with_cache(sample_data):
+    movies_df, similarity = sample_data
+    cache = RecommendationCache()
+
+    first = recommend_movies("Toy Story", movies_df, similarity, similarity, similarity,
+                             genre_weight=0.52, tag_weight=0.3, ratings_weight=0.2, cache=cache)
+    second = recommend_movies("Toy Story (1995)", movies_df, similarity, similarity, similarity,
+                              genre_weight=0.5, tag_weight=0.3, ratings_weight=0.2, cache=cache)
+
+    pd.testing.assert_frame_equal(first, second)
+    assert first["title"].tolist() == ["Jumanji (1995)", "Grumpier Old Men (1995)"]
+    assert (cache.hits, cache.misses, len(cache)) == (1, 1, 1)
+
+def test_model_set_signals_invalidates_cache(sample_data):
+    movies_df, similarity = sample_data
+    model = RecommenderModel(movies_df, similarity, similarity, similarity)
+    assert model.recommend("Toy Story", top_n=1)["title"].tolist() == ["Jumanji (1995)"]
+
+    swapped = similarity[:, [0, 2, 1]][[0, 2, 1]]
+    model.set_signals(swapped, swapped, swapped)
+
+    assert len(model.cache) == 0
+    assert model.recommend("Toy Story", top_n=1)["title"].tolist() == ["Grumpier Old Men (1995)"]
+
+def test_results_of_an_old_generation_are_not_stored():
+    cache = RecommendationCache()
+    old = cache.for_generation(cache.generation)
+    key = old.key(0, (0.5, 0.3, 0.2), 10, 0.1)
+    new_generation = cache.clear()
+
+    assert old.get_or_compute(key, lambda: [1, 2]).tolist() == [1, 2]
+    assert len(cache) == 0
+    current = cache.for_generation(new_generation)
+    assert current.key(0, (0.5, 0.3, 0.2), 10, 0.1) != key
+    current.get_or_compute(current.key(0, (0.5, 0.3, 0.2), 10, 0.1), lambda: [3])
+    assert len(cache) == 1
+
+def test_model_swaps_a_complete_snapshot(sample_data):
+    movies_df, similarity = sample_data
+    model = RecommenderModel(movies_df, similarity, similarity, similarity)
+    before = model.snapshot
+
+    smaller = movies_df.iloc[:2].reset_index(drop=True)
+    model.swap(smaller, (similarity[:2, :2],) * 3)
+
+    assert len(before) == 3 and len(before.signals[0]) == 3  # In-flight requests keep their snapshot
+    assert len(model) == 2 and model.title_index.lookup("Grumpier") is None
+    assert model.snapshot.generation == model.cache.generation != before.generation
@@ -0,0 +1,45 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from scoring import similarity_rows, blend_rows, top_n_indices, top_n_rows
+
+@pytest.fixture
+def signals():
+    rng = np.random.default_rng(1)
+    return [rng.random((6, 6)) for _ in range(3)]
+
+def test_similarity_rows_reads_only_requested_rows(signals):
+    rows = similarity_rows(signals[0], [4, 1])
+    assert rows.dtype == np.float32
+    np.testing.assert_allclose(rows, signals[0][[4, 1]], rtol=1e-6)
+
+def test_blend_rows_matches_full_blend(signals):
+    weights = (0.5, 0.3, 0.2)
+    expected = sum(w * s for w, s in zip(weights, signals))[[2, 5]]
+    np.testing.assert_allclose(blend_rows([2, 5], signals, weights), expected, rtol=1e-5)
+
+def test_blend_rows_per_row_weights(signals):
+    weights = (np.array([1.0, 0.0]), np.array([0.0, 1.0]), 0.0)
+    blended = blend_rows([0, 3], signals, weights)
+    np.testing.assert_allclose(blended[0], signals[0][0], rtol=1e-6)
+    np.testing.assert_allclose(blended[1], signals[1][3], rtol=1e-6)
+
+def test_top_n_indices_matches_full_sort():
+    scores = np.random.default_rng(2).random(1000)
+    np.testing.assert_array_equal(top_n_indices(scores, 10), np.argsort(-scores)[:10])
+
+def test_top_n_indices_applies_threshold():
+    scores = np.array([0.05, 0.9, 0.2, 0.5])
+    np.testing.assert_array_equal(top_n_indices(scores, 10, threshold=0.1), [1, 3, 2])
+    assert top_n_indices(scores, 3, threshold=0.95).size == 0
+
+def test_top_n_rows_pads_below_threshold():
+    scores = np.array([[0.1, 0.7, 0.3], [0.9, 0.0, 0.05]])
+    positions, top_scores = top_n_rows(scores, 2, threshold=0.1)
+    np.testing.assert_array_equal(positions, [[1, 2], [0, -1]])
+    np.testing.assert_allclose(top_scores, [[0.7, 0.3], [0.9, 0.05]])
@@ -0,0 +1,72 @@
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+pytest.importorskip("flask")
+from model import RecommenderModel
+from server import create_app
+
+@pytest.fixture
+def client():
+    movies_df = pd.DataFrame({
+        "movieId": [1, 2, 3],
+        "title": ["Toy Story (1995)", "Jumanji (1995)", "Grumpier Old Men (1995)"],
+        "genres": ["Adventure|Animation", "Adventure|Children", "Comedy|Romance"]
+    })
+    similarity = np.array([
+        [1.0, 0.9, 0.1],
+        [0.9, 1.0, 0.2],
+        [0.1, 0.2, 1.0]
+    ], dtype=np.float32)
+    model = RecommenderModel(movies_df, similarity, similarity, similarity)
+    return create_app(model).test_client()
+
+def test_health(client):
+    assert client.get("/health").get_json() == {"status": "ok", "movies": 3}
+
+def test_recommend(client):
+    response = client.get("/recommend", query_string={"title": "toy story", "top_n": 1})
+    assert response.status_code == 200
+    assert response.get_json()["recommendations"] == [
+        {"movieId": 2, "title": "Jumanji (1995)", "genres": "Adventure|Children"}
+    ]
+
+def test_stats_counts_cache_hits(client):
+    for _ in range(2):
+        client.get("/recommend", query_string={"title": "Jumanji"})
+    cache = client.get("/stats").get_json()["cache"]
+    assert (cache["hits"], cache["misses"]) == (1, 1)
+    assert client.get("/stats").get_json()["worker"] == os.getpid()
+
+def test_recommend_errors(client):
+    assert client.get("/recommend").status_code == 400
+    assert client.get("/recommend", query_string={"title": "x", "top_n": "many"}).status_code == 400
+    assert client.get("/recommend", query_string={"title": "Invalid Movie"}).status_code == 404
+    # Options the model rejects are bad requests, not missing movies
+    assert client.get("/recommend", query_string={"title": "Jumanji", "genres": "Western"}).status_code == 400
+    assert client.get("/recommend", query_string={"title": "Jumanji", "min_ratings": 2}).status_code == 400
+
+def test_recommend_batch(client):
+    response = client.post("/recommend/batch", json={"movies": [3, "Jumanji (1995)"], "top_n": 1})
+    results = response.get_json()["results"]
+    assert [result["movieId"] for result in results] == [3, 2]
+    assert results[0]["recommendations"][0]["title"] == "Jumanji (1995)"
+    assert results[1]["recommendations"][0]["score"] == pytest.approx(0.9)
+    assert client.post("/recommend/batch", json={"movies": [42]}).status_code == 404
+    assert client.post("/recommend/batch", json={}).status_code == 400
+
+def test_recommend_batch_rejects_malformed_items(client):
+    for body in ({"movies": [3, [1]]}, {"movies": [3, None]}, {"movies": [True]},
+                 {"movies": [3], "genres": {"name": "Comedy"}},
+                 {"movies": [3], "genres": [1]}, {"movies": [3], "top_n": [1]}):
+        assert client.post("/recommend/batch", json=body).status_code == 400
+
+def test_recommend_with_genre_filter(client):
+    response = client.get("/recommend", query_string={"title": "toy story", "top_n": 1, "genres": "comedy"})
+    assert [record["movieId"] for record in response.get_json()["recommendations"]] == [3]
+    assert client.get("/recommend", query_string={"title": "toy story", "year_from": "soon"}).status_code == 400
@@ -0,0 +1,98 @@
+import pandas as pd
+import numpy as np
+import pytest
+import subprocess
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from data_preprocessing import build_genre_features
+from genre_codebook import build_genre_codebook, save_genre_codebook
+from latent_factors import FactorSimilarity, save_factor_similarity
+from neighbor_index import build_neighbor_index, save_neighbor_index
+from recommender import load_similarity_data, recommend_movies
+from serving import StringTable, load_bundle
+from serving_bundle import build_serving_bundle, encode_strings
+from similarity_store import save_similarity_artifact
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), "../src")
+
+def write_data_dir(data_dir, tag_kind):
+    rng = np.random.default_rng(0)
+    genres = ["Action", "Comedy", "Drama", "Horror"]
+    movies_df = pd.DataFrame({
+        "movieId": np.arange(1, 31) * 10,
+        "title": [f"Movie {i} (2000)" for i in range(29)] + ["Amélie (2001)"],
+        "genres": [rng.choice(genres, size=rng.integers(1, 3), replace=False).tolist() for _ in range(30)],
+    })
+    movies_df.to_csv(os.path.join(data_dir, "cleaned_movies.csv"), index=False)
+    movie_ids = movies_df["movieId"].to_numpy()
+
+    codebook = build_genre_codebook(movies_df, build_genre_features(movies_df))
+    save_genre_codebook(codebook, os.path.join(data_dir, "genre_codebook.npz"), movie_ids)
+    features = rng.random((30, 6))
+    features /= np.linalg.norm(features, axis=1, keepdims=True)
+    tag_similarity = (features @ features.T).astype(np.float32)
+    if tag_kind == "dense":
+        save_similarity_artifact(os.path.join(data_dir, "tag_similarity_matrix"), tag_similarity, movie_ids)
+    else:
+        save_neighbor_index(build_neighbor_index(tag_similarity, 8), os.path.join(data_dir, "tag_neighbors.npz"))
+    factors = FactorSimilarity(rng.normal(size=(30, 4)))
+    save_factor_similarity(factors, os.path.join(data_dir, "ratings_factors.npz"), movie_ids)
+    return movies_df
+
+def test_encode_strings_round_trip():
+    values = ["Heat (1995)", "", "Amélie (2001)"]
+    table = StringTable(*encode_strings(values))
+    assert len(table) == 3
+    assert list(table) == values
+
+@pytest.mark.parametrize("tag_kind", ["dense", "neighbors"])
+def test_bundle_recommendations_match_recommender(tmp_path, tag_kind):
+    movies_df = write_data_dir(str(tmp_path), tag_kind)
+    model = load_bundle(build_serving_bundle(str(tmp_path)))
+    signals = load_similarity_data(str(tmp_path), movie_ids=movies_df["movieId"].to_numpy())
+
+    assert len(model) == len(movies_df)
+    for title in ("Movie 3 (2000)", "movie 12", "amélie"):
+        expected = recommend_movies(title, movies_df, *signals, top_n=5, similarity_threshold=0.2)
+        recommendations = model.recommend(title, top_n=5, similarity_threshold=0.2)
+        assert [r["title"] for r in recommendations] == expected["title"].tolist()
+        assert [r["movieId"] for r in recommendations] == movies_df.loc[expected.index, "movieId"].tolist()
+        assert [r["genres"] for r in recommendations] == ["|".join(genres) for genres in expected["genres"]]
+
+def test_title_lookup_falls_back_to_fuzzy_matching(tmp_path):
+    write_data_dir(str(tmp_path), "dense")
+    model = load_bundle(build_serving_bundle(str(tmp_path)))
+    assert model.find_movie_index("Movie 7 (2000)") == 7
+    assert model.find_movie_index("ie 17 (2000)") == 17
+    assert model.find_movie_index("Movei 21 (2000)") == 21
+    for query in ("zzzzzz", "", "   "):
+        with pytest.raises(ValueError):
+            model.find_movie_index(query)
+
+def test_serving_process_never_imports_build_dependencies(tmp_path):
+    write_data_dir(str(tmp_path), "neighbors")
+    bundle_dir = build_serving_bundle(str(tmp_path))
+    script = (
+        "import sys; sys.path.insert(0, sys.argv[1])\n"
+        "from serving import load_bundle\n"
+        "assert load_bundle(sys.argv[2]).recommend('Movie 4', top_n=3)\n"
+        "print(sorted(m for m in ('pandas', 'scipy', 'sklearn') if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script, SRC_DIR, bundle_dir],
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+def test_rebuilding_artifacts_leaves_the_bundle_intact(tmp_path):
+    movies_df = write_data_dir(str(tmp_path), "dense")
+    model = load_bundle(build_serving_bundle(str(tmp_path)))
+    expected = model.recommend("Movie 3 (2000)", top_n=5)
+
+    save_similarity_artifact(os.path.join(str(tmp_path), "tag_similarity_matrix"),
+                             np.zeros((30, 30), dtype=np.float32), movies_df["movieId"])
+
+    assert model.recommend("Movie 3 (2000)", top_n=5) == expected
+    assert load_bundle(os.path.join(str(tmp_path), "serving_bundle")).recommend("Movie 3 (2000)", top_n=5) == expected
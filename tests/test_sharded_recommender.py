@@ -0,0 +1,109 @@
+import pandas as pd
+import numpy as np
+import pytest
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from data_preprocessing import build_genre_features
+from genre_codebook import build_genre_codebook
+from latent_factors import FactorSimilarity
+from neighbor_index import build_neighbor_index
+from recommender import recommend_movies, recommend_movies_batch
+from sharded_recommender import ShardedRecommender, column_shard, merge_shard_results, shard_ranges
+from similarity_store import save_similarity_artifact
+
+def sample_catalog(n_movies=40, seed=0):
+    rng = np.random.default_rng(seed)
+    genres = ["Action", "Comedy", "Drama", "Horror"]
+    movies_df = pd.DataFrame({
+        "movieId": np.arange(1, n_movies + 1) * 10,
+        "title": [f"Movie {i} (2000)" for i in range(n_movies)],
+        "genres": [list(rng.choice(genres, size=rng.integers(1, 3), replace=False)) for _ in range(n_movies)],
+    })
+    signals = []
+    for _ in range(3):
+        features = rng.random((n_movies, 6))
+        features /= np.linalg.norm(features, axis=1, keepdims=True)
+        signals.append((features @ features.T).astype(np.float32))
+    return movies_df, signals
+
+def test_shard_ranges_cover_the_catalog():
+    assert shard_ranges(10, 3) == [(0, 3), (3, 7), (7, 10)]
+    assert shard_ranges(2, 4) == [(0, 1), (1, 2)]
+    with pytest.raises(ValueError):
+        shard_ranges(10, 0)
+
+def test_column_shards_match_full_signal_columns():
+    movies_df, (dense, _, _) = sample_catalog()
+    signals = [
+        dense,
+        build_neighbor_index(dense, 5),
+        build_genre_codebook(movies_df, build_genre_features(movies_df)),
+        FactorSimilarity(np.random.default_rng(1).normal(size=(len(movies_df), 4))),
+    ]
+    queries = [0, 7, 39]
+    for signal in signals:
+        full = np.asarray(signal[queries] if isinstance(signal, np.ndarray) else signal.rows(queries))
+        shard = column_shard(signal, 10, 25)
+        assert shard.shape == (40, 15)
+        rows = shard[queries] if isinstance(shard, np.ndarray) else shard.rows(queries)
+        np.testing.assert_allclose(rows, full[:, 10:25], rtol=1e-5, atol=1e-6)
+
+def test_merge_shard_results_keeps_global_top_n():
+    shard_results = [
+        (np.array([[0, 2, -1]]), np.array([[0.9, 0.5, 0.0]], dtype=np.float32)),
+        (np.array([[5, 4, 3]]), np.array([[0.8, 0.7, 0.1]], dtype=np.float32)),
+    ]
+    positions, scores = merge_shard_results(shard_results, 3)
+    assert positions.tolist() == [[0, 5, 4]]
+    np.testing.assert_allclose(scores, [[0.9, 0.8, 0.7]])
+
+def test_sharded_recommendations_match_single_process():
+    movies_df, signals = sample_catalog()
+    with ShardedRecommender(movies_df, *signals, n_shards=3) as sharded:
+        for title in ("Movie 0 (2000)", "Movie 21 (2000)"):
+            expected = recommend_movies(title, movies_df, *signals, top_n=5, similarity_threshold=0.5)
+            assert sharded.recommend(title, top_n=5, similarity_threshold=0.5).index.tolist() == \
+                expected.index.tolist()
+
+        batch = sharded.recommend_batch([10, 400], top_n=4)
+        expected = recommend_movies_batch([10, 400], movies_df, *signals, top_n=4)
+        pd.testing.assert_frame_equal(batch, expected, check_dtype=False)
+
+        candidate_mask = np.arange(len(movies_df)) % 3 == 0
+        expected = recommend_movies("Movie 5 (2000)", movies_df, *signals, top_n=6, candidate_mask=candidate_mask)
+        assert sharded.recommend("Movie 5 (2000)", top_n=6, candidate_mask=candidate_mask).index.tolist() == \
+            expected.index.tolist()
+
+        assert sharded.recommend("Movie 3 (2000)", similarity_threshold=2.0).empty
+        with pytest.raises(ValueError):
+            sharded.recommend("Invalid Movie")
+
+def test_workers_load_their_own_columns(tmp_path):
+    movies_df, signals = sample_catalog(n_movies=12)
+    for name, signal in zip(("genre", "tag", "ratings"), signals):
+        save_similarity_artifact(str(tmp_path / f"{name}_similarity_matrix"), signal, movies_df["movieId"])
+
+    with ShardedRecommender(movies_df, n_shards=2, data_dir=str(tmp_path)) as sharded:
+        expected = recommend_movies("Movie 4 (2000)", movies_df, *signals, top_n=3)
+        assert sharded.recommend("Movie 4 (2000)", top_n=3).index.tolist() == expected.index.tolist()
+
+    with pytest.raises(FileNotFoundError):
+        ShardedRecommender(movies_df, n_shards=2, data_dir=str(tmp_path / "missing"))
+
+def test_failed_rank_leaves_no_stale_replies():
+    movies_df, signals = sample_catalog()
+    with ShardedRecommender(movies_df, *signals, n_shards=3) as sharded:
+        expected = sharded.rank([0], top_n=5)
+        with pytest.raises(IndexError):
+            sharded.rank([100])
+        with pytest.raises(ValueError):
+            sharded.rank([0], candidate_mask=np.ones(5, dtype=bool))
+        # Every shard fails this request; all their replies must still be read
+        with pytest.raises(TypeError):
+            sharded.rank([0], similarity_threshold="high")
+        for positions, expected_positions in zip(sharded.rank([0], top_n=5), expected):
+            np.testing.assert_array_equal(positions, expected_positions)
@@ -0,0 +1,57 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from similarity_store import save_similarity_artifact, load_similarity_artifact, read_manifest
+from recommender import load_similarity_data
+
+@pytest.fixture
+def matrix():
+    rng = np.random.default_rng(3)
+    return rng.random((5, 5))
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_save_and_load_memory_mapped(matrix, tmp_path, dtype):
+    base_path = str(tmp_path / "genre_similarity_matrix")
+    save_similarity_artifact(base_path, matrix, [10, 20, 30, 40, 50], dtype=dtype,
+                             params={"signal": "genre"}, block_rows=2)
+    loaded, manifest = load_similarity_artifact(base_path)
+    assert isinstance(loaded, np.memmap)
+    assert not loaded.flags.writeable
+    assert loaded.dtype == dtype
+    assert manifest["movie_ids"] == [10, 20, 30, 40, 50]
+    assert manifest["params"] == {"signal": "genre"}
+    np.testing.assert_allclose(loaded, matrix, rtol=1e-3)
+
+def test_load_rejects_misaligned_movie_ids(matrix, tmp_path):
+    base_path = str(tmp_path / "tag_similarity_matrix")
+    save_similarity_artifact(base_path, matrix, [1, 2, 3, 4, 5])
+    with pytest.raises(ValueError, match="not aligned"):
+        load_similarity_artifact(base_path, movie_ids=[5, 4, 3, 2, 1])
+
+def test_save_rejects_unsupported_dtype(matrix, tmp_path):
+    with pytest.raises(ValueError, match="Unsupported artifact dtype"):
+        save_similarity_artifact(str(tmp_path / "x"), matrix, range(5), dtype="int8")
+
+def test_load_similarity_data_prefers_artifacts(matrix, tmp_path):
+    for name in ("genre", "tag", "ratings"):
+        save_similarity_artifact(str(tmp_path / f"{name}_similarity_matrix"), matrix, range(5))
+    signals = load_similarity_data(str(tmp_path), movie_ids=range(5))
+    assert len(signals) == 3
+    assert all(isinstance(signal, np.memmap) for signal in signals)
+    assert read_manifest(str(tmp_path / "ratings_similarity_matrix"))["shape"] == [5, 5]
+
+def test_rebuild_keeps_open_memory_maps_intact(matrix, tmp_path):
+    base_path = str(tmp_path / "genre_similarity_matrix")
+    save_similarity_artifact(base_path, matrix, [1, 2, 3, 4, 5])
+    loaded, _ = load_similarity_artifact(base_path)
+
+    save_similarity_artifact(base_path, np.zeros((2, 2)), [1, 2])
+
+    np.testing.assert_allclose(loaded, matrix, rtol=1e-6)  # Still the old inode
+    assert load_similarity_artifact(base_path)[0].shape == (2, 2)
+    assert sorted(os.listdir(tmp_path)) == ["genre_similarity_matrix.json", "genre_similarity_matrix.npy"]
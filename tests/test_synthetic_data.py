@@ -0,0 +1,31 @@
+import numpy as np
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from synthetic_data import generate_dataset, GENRES
+from data_clean import clean_movies, clean_ratings, clean_tags
+
+def test_generate_dataset_is_readable_by_the_cleaners(tmp_path):
+    paths = generate_dataset(str(tmp_path), n_movies=50, n_ratings=2000, n_tags=300, n_users=40)
+
+    movies = clean_movies(paths["movies"])
+    ratings = clean_ratings(paths["ratings"])
+    tags = clean_tags(paths["tags"])
+
+    assert len(movies) == 50 and movies["movieId"].is_unique
+    assert movies["title"].str.match(r".+ \(\d{4}\)$").all()
+    assert all(set(genres) <= set(GENRES) for genres in movies["genres"])
+    assert len(ratings) == 2000 and len(tags) == 300
+    assert ratings["movieId"].isin(movies["movieId"]).all()
+    assert ratings["userId"].between(1, 40).all()
+    assert set(np.unique(ratings["rating"])) <= set(np.arange(0.5, 5.5, 0.5))
+
+def test_generate_dataset_is_reproducible(tmp_path):
+    first = generate_dataset(str(tmp_path / "a"), n_movies=20, n_ratings=500, seed=3)
+    second = generate_dataset(str(tmp_path / "b"), n_movies=20, n_ratings=500, seed=3)
+    for name in ("movies", "ratings", "tags"):
+        with open(first[name]) as a, open(second[name]) as b:
+            assert a.read() == b.read()
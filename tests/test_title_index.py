@@ -0,0 +1,51 @@
+import pytest
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from title_index import TitleIndex, normalize_title, EXACT_SCORE, PREFIX_SCORE
+
+@pytest.fixture
+def title_index():
+    return TitleIndex([
+        "Toy Story 2 (1999)",
+        "Toy Story (1995)",
+        "Jumanji (1995)",
+        "Grumpier Old Men (1995)",
+        "Story of Us, The (1999)",
+    ])
+
+def test_normalize_title():
+    assert normalize_title("  Toy   Story (1995) ") == "toy story (1995)"
+
+def test_exact_lookup(title_index):
+    assert title_index.lookup("toy story (1995)") == 1
+    assert title_index.search("Toy Story (1995)")[0] == (1, EXACT_SCORE)
+
+def test_prefix_prefers_shorter_title(title_index):
+    results = title_index.search("toy story")
+    assert [position for position, _ in results[:2]] == [1, 0]
+    assert results[0][1] == PREFIX_SCORE
+
+def test_substring_match(title_index):
+    assert title_index.lookup("old men") == 3
+
+def test_typo_tolerant_match(title_index):
+    assert title_index.lookup("jumanjy (1995)") == 2
+
+def test_short_query_uses_prefixes(title_index):
+    assert [position for position, _ in title_index.search("ju")] == [2]
+
+def test_no_match(title_index):
+    assert title_index.lookup("Invalid Movie") is None
+    assert title_index.search("") == []
+
+def test_stop_grams_do_not_change_matches():
+    titles = [f"Film Number {i} ({1950 + i % 60})" for i in range(3000)] + ["Amelie (2001)", "Heat (1995)"]
+    index = TitleIndex(titles, stop_gram_postings=200)
+    reference = TitleIndex(titles, stop_gram_postings=len(titles))
+    assert "(19" in index.postings and len(index.postings["(19"]) > 200
+    for query in ("Heat (1995)", "heat (19", "Amelei (2001)", "number 1234 (1", "Film Numbr 77 (2007)", " (19"):
+        assert index.search(query, limit=5) == reference.search(query, limit=5)
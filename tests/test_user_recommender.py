@@ -0,0 +1,66 @@
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from neighbor_index import top_k_rows, NeighborIndex
+from user_recommender import build_user_history, recommend_for_user, recommend_for_users, score_users
+
+@pytest.fixture
+def movies_df():
+    return pd.DataFrame({
+        "movieId": [10, 20, 30, 40],
+        "title": ["Toy Story (1995)", "Jumanji (1995)", "Heat (1995)", "Casino (1995)"],
+        "genres": ["Animation", "Adventure", "Action", "Crime"]
+    })
+
+@pytest.fixture
+def ratings_df():
+    return pd.DataFrame({
+        "userId": [1, 1, 2, 3],
+        "movieId": [10, 30, 20, 40],
+        "rating": [5.0, 1.0, 4.0, 3.0]
+    })
+
+@pytest.fixture
+def similarity():
+    return np.array([
+        [1.0, 0.8, 0.1, 0.0],
+        [0.8, 1.0, 0.2, 0.0],
+        [0.1, 0.2, 1.0, 0.9],
+        [0.0, 0.0, 0.9, 1.0]
+    ], dtype=np.float32)
+
+def test_recommend_for_user_excludes_seen_movies(movies_df, ratings_df, similarity):
+    history = build_user_history(ratings_df, movies_df)
+
+    recommendations = recommend_for_user(1, history, movies_df, similarity)
+
+    # User 1 rated Toy Story 5 and Heat 1: Jumanji scores 5*0.8 + 1*0.2, Casino 1*0.9
+    assert recommendations["title"].tolist() == ["Jumanji (1995)", "Casino (1995)"]
+    assert recommendations["score"].tolist() == pytest.approx([4.2, 0.9])
+
+def test_recommend_for_users_matches_across_signal_types(movies_df, ratings_df, similarity):
+    history = build_user_history(ratings_df, movies_df)
+    indices, scores, lengths = top_k_rows(similarity, 3)
+    index = NeighborIndex(indices, scores, np.concatenate([[0], np.cumsum(lengths)]), 4)
+
+    dense = recommend_for_users(None, history, movies_df, similarity, top_n=2, batch_size=2)
+    from_index = recommend_for_users(None, history, movies_df, index, top_n=2)
+    from_float64 = recommend_for_users(None, history, movies_df, similarity.astype(np.float64), top_n=2)
+
+    assert dense["userId"].tolist() == [1, 1, 2, 2, 3]
+    pd.testing.assert_frame_equal(dense, from_index)
+    pd.testing.assert_frame_equal(dense, from_float64)
+
+def test_score_users_and_unknown_user(movies_df, ratings_df, similarity):
+    history = build_user_history(ratings_df, movies_df)
+    scores = score_users(history.ratings[history.positions([2])], similarity)
+    np.testing.assert_allclose(scores, [[3.2, 4.0, 0.8, 0.0]], rtol=1e-6)
+
+    with pytest.raises(ValueError, match="User id '99' not found"):
+        recommend_for_user(99, history, movies_df, similarity)